@@ -0,0 +1 @@
+# Benchmarks do scrape-service
@@ -0,0 +1,78 @@
+"""
+Benchmark dos filtros JSONPath (metadata_filters) por requisição.
+
+Compara a implementação anterior (parse + find de cada expressão a cada requisição)
+com as expressões compiladas em cache e avaliadas em uma única passada.
+
+Uso:
+    python -m benchmarks.bench_metadata_filters [--filters 15] [--requests 200]
+"""
+import argparse
+import time
+
+from jsonpath_ng import parse
+
+from src.metadata_filters import apply_filters
+
+FIELDS = ['name', 'sku', 'brand', 'price', 'listPrice', 'stock', 'category', 'description',
+          'ean', 'seller', 'rating', 'reviews', 'weight', 'height', 'width', 'depth']
+
+
+def build_next_data():
+    """nextData sintético de uma página de produto"""
+    product = {field: f'valor de {field}' for field in FIELDS}
+    product['items'] = [{'sku': i, 'price': i * 10.0, 'images': [f'/img/{i}.jpg']} for i in range(30)]
+    return {'props': {'pageProps': {'product': product, 'related': [dict(product) for _ in range(10)]}},
+            'page': '/produto/[slug]', 'buildId': 'abc'}
+
+
+def build_filters(count):
+    filters = [f'$.props.pageProps.product.{field}' for field in FIELDS]
+    filters += ['$.props.pageProps.product.items[*].price', '$.props.pageProps.related[*].name']
+    return filters[:count]
+
+
+def previous_apply(next_data, filters):
+    """Implementação anterior: parse de cada expressão a cada chamada"""
+    filtered = {}
+    for query in filters:
+        try:
+            filtered[query] = [match.value for match in parse(query).find(next_data)]
+        except Exception as e:
+            filtered[query] = f"Error: {str(e)}"
+    return filtered
+
+
+def measure(function, next_data, filters, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        result = function(next_data, filters)
+    return (time.perf_counter() - start) / requests, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--filters', type=int, default=15)
+    arg_parser.add_argument('--requests', type=int, default=200)
+    args = arg_parser.parse_args()
+
+    next_data = build_next_data()
+    filters = build_filters(args.filters)
+    print(f"{len(filters)} filtros, {args.requests} requisições")
+
+    previous, expected = measure(previous_apply, next_data, filters, args.requests)
+    # A primeira chamada compila as expressões (equivale à primeira invocação do container)
+    start = time.perf_counter()
+    apply_filters(next_data, filters)
+    cold = time.perf_counter() - start
+    cached, result = measure(apply_filters, next_data, filters, args.requests)
+    assert result == expected
+
+    print(f"anterior          {previous * 1000:8.3f} ms/requisição")
+    print(f"cache (1ª chamada) {cold * 1000:7.3f} ms")
+    print(f"cache (quente)    {cached * 1000:8.3f} ms/requisição  {previous / cached:6.1f}x  "
+          f"economia de {(previous - cached) * 1000:.3f} ms/requisição")
+
+
+if __name__ == '__main__':
+    main()
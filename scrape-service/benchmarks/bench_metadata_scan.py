@@ -0,0 +1,63 @@
+"""
+Benchmark da extração só de metadados (format "metadata").
+
+Compara o parse completo da página (extract_metadata, BeautifulSoup) com o scanner de
+scripts (scan_metadata) em uma página com __NEXT_DATA__ grande, com e sem a decodificação
+do __NEXT_DATA__ (feita só quando há metadata_filters).
+
+Uso:
+    python -m benchmarks.bench_metadata_scan [--products 2000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+
+from src.metadata_filters import apply_filters
+from src.metadata_scan import scan_metadata
+from src.scrape_lambda import extract_metadata
+
+FILTERS = ['$.props.pageProps.product.name', '$.props.pageProps.product.price']
+
+
+def build_page(products):
+    """Página de produto com JSON-LD e um __NEXT_DATA__ com `products` itens relacionados"""
+    product = {'name': 'Produto', 'price': 99.9, 'sku': '123', 'description': 'x' * 200}
+    next_data = {'props': {'pageProps': {'product': product,
+                                         'related': [dict(product, sku=str(i)) for i in range(products)]}},
+                 'page': '/produto/[slug]', 'buildId': 'abc'}
+    paragraphs = ''.join(f'<p>Parágrafo {i} da descrição</p>' for i in range(products // 4))
+    return (f'<html><head><title>Produto</title>'
+            f'<script type="application/ld+json">{json.dumps({"@type": "Product", **product})}</script>'
+            f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script>'
+            f'</head><body>{paragraphs}</body></html>')
+
+
+def measure(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--products', type=int, default=2000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    page = build_page(args.products)
+    print(f"página de {len(page) / 1024:.0f} KB, {args.repeat} repetições")
+
+    parsed, expected = measure(lambda: extract_metadata(page), args.repeat)
+    scanned, result = measure(lambda: scan_metadata(page)['metadata'], args.repeat)
+    assert result == expected
+    assert apply_filters(result['nextData'], FILTERS) == apply_filters(expected['nextData'], FILTERS)
+    schema_only, _ = measure(lambda: scan_metadata(page, next_data=False)['metadata'], args.repeat)
+
+    print(f"parse do DOM            {parsed * 1000:8.2f} ms")
+    print(f"scanner                 {scanned * 1000:8.2f} ms  {parsed / scanned:6.1f}x")
+    print(f"scanner sem __NEXT_DATA__ {schema_only * 1000:6.2f} ms  {parsed / schema_only:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
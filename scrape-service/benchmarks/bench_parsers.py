@@ -0,0 +1,60 @@
+"""
+Benchmark de throughput dos parsers HTML em páginas grandes.
+
+Uso:
+    python -m benchmarks.bench_parsers [--size-kb 2000] [--repeat 5]
+"""
+import argparse
+import time
+
+from src.extraction import extract_page, get_backend
+
+PARSERS = ['html.parser', 'lxml', 'selectolax']
+
+
+def build_page(size_kb):
+    """Gera uma página sintética de produto com aproximadamente size_kb KB"""
+    block = (
+        '<div class="item"><h3>Produto {i}</h3>'
+        '<p>Descrição do produto {i} com <strong>destaque</strong> e <span>detalhes</span>.</p>'
+        '<a href="/produto/{i}">Ver produto</a><img src="/img/{i}.jpg"></div>\n'
+    )
+    parts = ['<html><head><title>Catálogo</title>',
+             '<script type="application/ld+json">{"@type": "Product", "name": "X"}</script>',
+             '</head><body>']
+    size, i = 0, 0
+    while size < size_kb * 1024:
+        chunk = block.format(i=i)
+        parts.append(chunk)
+        size += len(chunk)
+        i += 1
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--size-kb', type=int, default=2000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    html = build_page(args.size_kb)
+    print(f"Página: {len(html) / 1024:.0f} KB, {args.repeat} repetições")
+    baseline = None
+    for parser in PARSERS:
+        try:
+            get_backend(parser)
+        except ValueError as e:
+            print(f"{parser:12s} indisponível ({e})")
+            continue
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            extract_page(html, 'https://example.com/', 2000, parser=parser)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        baseline = baseline or elapsed
+        mb_per_sec = len(html) / 1024 / 1024 / elapsed
+        print(f"{parser:12s} {elapsed * 1000:8.1f} ms/página  {mb_per_sec:6.2f} MB/s  {baseline / elapsed:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark do tamanho e do tempo de serialização das respostas de um crawl grande.
+
+Monta a resposta de um crawl recursivo sintético (resumo_html, imagens e links em todas
+as páginas filhas) e mede, para cada combinação de serializador, drop_none e formato
+compacto, o tamanho do corpo (puro, gzip e brotli) e o tempo de serialização.
+
+Uso:
+    python -m benchmarks.bench_response [--pages 2000] [--fanout 20] [--repeat 5]
+"""
+import argparse
+import gzip
+import time
+
+from src import response_encoding
+from src.response_encoding import encode
+
+HOSTS = ['https://loja.example', 'https://cdn.loja.example', 'https://blog.loja.example']
+
+
+def build_response(pages, fanout):
+    """Resposta de format html com `pages` páginas em uma árvore com `fanout` links por página"""
+    def node(i):
+        return {
+            "title": f"Produto {i}",
+            "content": ''.join(f"<p>Descrição do produto {i}, parágrafo {p}.</p>\n" for p in range(5)),
+            "images": [f"{HOSTS[1]}/img/{i % 50}/{n}.jpg" for n in range(5)],
+            "links": {},
+            "truncated": None,
+        }
+
+    root = {}
+    level = [root]
+    count = 0
+    while count < pages:
+        next_level = []
+        for tree in level:
+            for _ in range(fanout):
+                if count >= pages:
+                    break
+                url = f"{HOSTS[2] if count % 3 == 2 else HOSTS[0]}/categoria/{count % 7}/produto/{count}"
+                tree[url] = node(count)
+                next_level.append(tree[url]["links"])
+                count += 1
+        level = next_level
+    return {"title": "Loja", "images": [f"{HOSTS[1]}/logo.png"], "resumo_html": "<p>Início</p>",
+            "final_url": f"{HOSTS[0]}/", "metadata": None, "nextData": None, "schemaData": None,
+            "markdown": None, "links": root, "headers": None, "truncated": False}
+
+
+def measure(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--pages', type=int, default=2000)
+    arg_parser.add_argument('--fanout', type=int, default=20)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    data = build_response(args.pages, args.fanout)
+    serializers = ['json'] + (['orjson'] if response_encoding.orjson is not None else [])
+    print(f"{args.pages} páginas, {args.repeat} repetições")
+    print(f"{'serializador':12} {'drop_none':9} {'compact':7} {'ms':>8} {'KB':>9} {'gzip KB':>9} {'br KB':>9}")
+    baseline = None
+    for serializer in serializers:
+        for omit_none in (False, True):
+            for compact_urls in (False, True):
+                seconds, body = measure(lambda: encode(data, omit_none, compact_urls, serializer), args.repeat)
+                raw = body.encode('utf-8')
+                gzip_size = len(gzip.compress(raw, compresslevel=response_encoding.GZIP_LEVEL))
+                brotli_size = (len(response_encoding.brotli.compress(raw, quality=response_encoding.BROTLI_QUALITY))
+                               if response_encoding.brotli is not None else 0)
+                baseline = baseline or seconds
+                print(f"{serializer:12} {str(omit_none):9} {str(compact_urls):7} {seconds * 1000:8.2f} "
+                      f"{len(raw) / 1024:9.1f} {gzip_size / 1024:9.1f} {brotli_size / 1024:9.1f}  "
+                      f"{baseline / seconds:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark ponta a ponta do lambda_handler contra um site sintético local (benchmarks.site).
+
+Para cada modo (metadata, markdown, html, recursive, batch) executa `--requests`
+chamadas e mede páginas/s, latência p50/p99, CPU (usuário + sistema) e pico de RSS do
+processo. Os resultados são gravados em JSON (--output) e podem ser comparados com uma
+execução anterior (--compare): o comando termina com código 1 se algum modo ficar mais
+lento que a tolerância.
+
+Uso:
+    python -m benchmarks.bench_scrape [--requests 20] [--page-kb 50] [--fanout 5] [--depth 2]
+        [--latency-ms 20] [--documents 3] [--modes metadata,recursive] [--output results.json]
+        [--compare baseline.json] [--tolerance 0.2]
+"""
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+
+from benchmarks.site import DEFAULTS, SiteServer
+from src.instrumentation import peak_memory_mb
+from src.scrape_lambda import lambda_handler
+
+MODES = ('metadata', 'markdown', 'html', 'recursive', 'batch')
+
+
+def percentile(values, fraction):
+    """Percentil pelo método nearest-rank"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def count_pages(tree):
+    """Número de páginas/documentos processados em uma árvore de links da recursão"""
+    if not isinstance(tree, dict):
+        return 0
+    pages = 0
+    for node in tree.values():
+        if isinstance(node, dict) and ('content' in node or 'title' in node):
+            pages += 1 + count_pages(node.get('links'))
+    return pages
+
+
+def build_event(mode, site, config, index):
+    """Evento do lambda_handler para o modo; index varia a página usada"""
+    page = f"{site}/p/1/{index % config['fanout']}"
+    body = {'url': page, 'cache': False, 'rate_limit': 0}
+    if mode in ('metadata', 'markdown', 'html'):
+        body['format'] = mode
+        if mode == 'metadata':
+            body['metadata_filters'] = ['$.props.pageProps.product.name', '$.props.pageProps.product.price']
+    elif mode == 'recursive':
+        body.update({'url': f'{site}/', 'format': 'markdown', 'max_level': config['depth'] + 1})
+    elif mode == 'batch':
+        body = {'urls': [f"{site}/p/1/{k}" for k in range(config['fanout'])], 'format': 'markdown',
+                'cache': False, 'rate_limit': 0}
+    return {'body': json.dumps(body)}
+
+
+def pages_in(mode, response):
+    body = json.loads(response['body'])
+    if mode == 'recursive':
+        return 1 + count_pages(body.get('links'))
+    if mode == 'batch':
+        return sum(1 for result in body['results'] if result['status'] == 'ok')
+    return 1
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime + children.ru_utime + children.ru_stime
+
+
+def run_mode(mode, site, config, requests):
+    # Aquecimento: conexões, imports sob demanda e caches de compilação
+    lambda_handler(build_event(mode, site, config, 0), None)
+    latencies = []
+    pages = 0
+    cpu_start = cpu_seconds()
+    started = time.perf_counter()
+    for index in range(requests):
+        call_started = time.perf_counter()
+        response = lambda_handler(build_event(mode, site, config, index), None)
+        latencies.append(time.perf_counter() - call_started)
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"{mode}: HTTP {response['statusCode']}: {response['body'][:200]}")
+        pages += pages_in(mode, response)
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'pages': pages,
+        'pages_per_sec': round(pages / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'cpu_seconds': round(cpu_seconds() - cpu_start, 3),
+        # Pico do processo até o fim deste modo (o RSS máximo nunca diminui)
+        'peak_rss_mb': round(peak_memory_mb(), 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Lista as regressões (páginas/s abaixo de baseline * (1 - tolerance))"""
+    regressions = []
+    for mode, current in results['modes'].items():
+        previous = baseline.get('modes', {}).get(mode)
+        if not previous:
+            continue
+        change = current['pages_per_sec'] / previous['pages_per_sec'] - 1
+        print(f"{mode:10s} {previous['pages_per_sec']:9.2f} -> {current['pages_per_sec']:9.2f} páginas/s "
+              f"({change:+.1%})")
+        if change < -tolerance:
+            regressions.append(mode)
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--requests', type=int, default=20)
+    for name, value in DEFAULTS.items():
+        arg_parser.add_argument('--' + name.replace('_', '-'), type=int, default=value)
+    arg_parser.add_argument('--modes', default=','.join(MODES))
+    arg_parser.add_argument('--output', help='arquivo JSON com os resultados')
+    arg_parser.add_argument('--compare', help='resultados anteriores (JSON) para comparação')
+    arg_parser.add_argument('--tolerance', type=float, default=0.2, help='queda aceita em páginas/s (0.2 = 20%%)')
+    args = arg_parser.parse_args()
+
+    config = {name: getattr(args, name) for name in DEFAULTS}
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {**config, 'requests': args.requests},
+        'modes': {},
+    }
+    with SiteServer(**config) as site:
+        for mode in modes:
+            results['modes'][mode] = stats = run_mode(mode, site.url, config, args.requests)
+            print(f"{mode:10s} {stats['pages_per_sec']:9.2f} páginas/s  p50 {stats['p50_ms']:8.1f} ms  "
+                  f"p99 {stats['p99_ms']:8.1f} ms  CPU {stats['cpu_seconds']:7.2f} s  RSS {stats['peak_rss_mb']:7.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Regressões: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
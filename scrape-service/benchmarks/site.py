@@ -0,0 +1,193 @@
+"""
+Site sintético servido localmente para os benchmarks ponta a ponta.
+
+Cada página /p/<nível>/<id> tem aproximadamente page_kb KB de texto, JSON-LD de produto,
+__NEXT_DATA__, `fanout` links para páginas do nível seguinte (até `depth`) e `documents`
+links para documentos (PDF, DOCX e XLSX, alternados). Cada resposta espera `latency_ms`
+antes de ser enviada. O servidor roda em um processo separado, para que CPU e memória
+medidos no benchmark sejam apenas os do scraper.
+
+Uso isolado:
+    python -m benchmarks.site --port 8800 --page-kb 50 --fanout 5 --depth 2
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import re
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULTS = {'page_kb': 50, 'fanout': 5, 'depth': 2, 'latency_ms': 20, 'documents': 3}
+
+DOCUMENT_TYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+PAGE_PATH = re.compile(r'^/p/(\d+)/(\d+)$')
+DOCUMENT_PATH = re.compile(r'^/d/(\d+)/(\d+)/(\d+)\.(pdf|docx|xlsx)$')
+
+
+def build_page(config, level, page_id):
+    """HTML de uma página do site"""
+    next_data = {'props': {'pageProps': {'product': {'id': page_id, 'name': f'Produto {page_id}',
+                                                     'price': page_id * 1.5, 'level': level}}}}
+    parts = [
+        f'<html><head><title>Produto {level}-{page_id}</title>',
+        '<script type="application/ld+json">',
+        json.dumps({'@type': 'Product', 'name': f'Produto {page_id}', 'sku': str(page_id)}),
+        '</script>',
+        f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script>',
+        '</head><body>',
+    ]
+    if level < config['depth']:
+        for k in range(config['fanout']):
+            parts.append(f'<a href="/p/{level + 1}/{page_id * config["fanout"] + k}">Filho {k}</a>')
+    for k in range(config['documents']):
+        extension = list(DOCUMENT_TYPES)[k % len(DOCUMENT_TYPES)]
+        parts.append(f'<a href="/d/{level}/{page_id}/{k}.{extension}">Documento {k}</a>')
+    size, i = 0, 0
+    while size < config['page_kb'] * 1024:
+        block = (f'<h2>Seção {i}</h2><p>Descrição {i} do produto {page_id} com <strong>destaque</strong> '
+                 f'e detalhes técnicos.</p><img src="/img/{page_id}/{i}.jpg">')
+        parts.append(block)
+        size += len(block)
+        i += 1
+    parts.append('</body></html>')
+    return ''.join(parts).encode('utf-8')
+
+
+def build_pdf(lines):
+    """PDF mínimo com uma linha de texto por página (também usado em test/test_pdf.py)"""
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>",
+               3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    number = 4
+    for text in lines:
+        stream = f"BT /F1 12 Tf 72 712 Td ({text}) Tj ET".encode('latin-1')
+        objects[number] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        objects[number + 1] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                               b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % number)
+        kids.append(number + 1)
+        number += 2
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = {}
+    for key in sorted(objects):
+        offsets[key] = out.tell()
+        out.write(b"%d 0 obj\n" % key + objects[key] + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % number)
+    for key in range(1, number):
+        out.write(b"%010d 00000 n \n" % offsets[key])
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (number, xref))
+    return out.getvalue()
+
+
+def build_docx(paragraphs):
+    """DOCX mínimo (apenas word/document.xml)"""
+    body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in paragraphs)
+    document = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f'<w:body>{body}</w:body></w:document>')
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', '<?xml version="1.0"?><Types/>')
+        archive.writestr('word/document.xml', document)
+    return out.getvalue()
+
+
+def build_xlsx(rows):
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Precos')
+    sheet.append(['codigo', 'produto', 'preco'])
+    for i in range(rows):
+        sheet.append([i, f'Produto {i}', i * 1.5])
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+
+def build_document(level, page_id, index, extension):
+    """Conteúdo do documento; varia com a página para não ser reaproveitado por caches"""
+    if extension == 'pdf':
+        return build_pdf([f'Bula {level}-{page_id}-{index} pagina {n}' for n in range(10)])
+    if extension == 'docx':
+        return build_docx([f'Manual {level}-{page_id}-{index} paragrafo {n}' for n in range(50)])
+    return build_xlsx(200 + level * 7 + page_id % 7)
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(config['latency_ms'] / 1000.0)
+            path = '/p/0/0' if self.path == '/' else self.path
+            page = PAGE_PATH.match(path)
+            document = DOCUMENT_PATH.match(path)
+            if page:
+                body, content_type = build_page(config, int(page.group(1)), int(page.group(2))), 'text/html'
+            elif document:
+                extension = document.group(4)
+                body = build_document(*(int(group) for group in document.groups()[:3]), extension)
+                content_type = DOCUMENT_TYPES[extension]
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(config, port=0, ready=None):
+    """Roda o servidor (bloqueante); envia a porta escolhida por `ready` (Connection) se informado"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler({**DEFAULTS, **config}))
+    server.daemon_threads = True
+    if ready is not None:
+        ready.send(server.server_address[1])
+    server.serve_forever()
+
+
+class SiteServer:
+    """Servidor do site sintético em um processo separado (use com `with`)"""
+
+    def __init__(self, **config):
+        self.config = {**DEFAULTS, **config}
+        self.process = None
+        self.url = None
+
+    def __enter__(self):
+        parent, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve, args=(self.config, 0, child), daemon=True)
+        self.process.start()
+        self.url = f'http://127.0.0.1:{parent.recv()}'
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.join()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--port', type=int, default=8800)
+    for name, value in DEFAULTS.items():
+        arg_parser.add_argument('--' + name.replace('_', '-'), type=int, default=value)
+    args = vars(arg_parser.parse_args())
+    port = args.pop('port')
+    print(f"Servindo em http://127.0.0.1:{port}/")
+    serve(args, port)
+
+
+if __name__ == '__main__':
+    main()
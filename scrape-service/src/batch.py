@@ -0,0 +1,139 @@
+"""
+Modo batch: várias URLs por invocação.
+
+Cada item de "urls" é uma URL ou um objeto com a URL e parâmetros que sobrescrevem os
+do corpo da requisição. Os itens são processados em paralelo (limitado por
+max_batch_concurrency) até um prazo calculado a partir de
+context.get_remaining_time_in_millis(). O prazo também é repassado a cada item, cuja
+recursão para nele: no prazo, os itens em andamento têm até metade de
+BATCH_DEADLINE_MARGIN_MS para terminar, e os que não foram concluídos a tempo são
+devolvidos em "unprocessed" para que o chamador os reenvie. Um único HostRateLimiter
+(rate_limit/rate_limit_burst do corpo) é compartilhado por todos os itens, de modo que
+um batch de URLs do mesmo host respeita o intervalo entre requisições a esse host.
+"""
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .rate_limit import HostRateLimiter
+
+# Número máximo de URLs processadas em paralelo (também é o tamanho do pool de threads)
+BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', 8))
+# Número máximo de URLs aceitas por invocação
+BATCH_MAX_URLS = int(os.environ.get('BATCH_MAX_URLS', 500))
+# Margem (em ms) reservada antes do timeout da Lambda para montar a resposta
+BATCH_DEADLINE_MARGIN_MS = int(os.environ.get('BATCH_DEADLINE_MARGIN_MS', 2000))
+
+# Pool de threads criado uma vez por container (cada thread mantém seu event loop e cliente)
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=BATCH_MAX_CONCURRENCY, thread_name_prefix='batch')
+    return _executor
+
+
+def compute_deadline(context, margin_ms=None):
+    """Instante (time.monotonic) limite para iniciar/aguardar itens; None se não houver contexto"""
+    if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+        return None
+    if margin_ms is None:
+        margin_ms = BATCH_DEADLINE_MARGIN_MS
+    return time.monotonic() + (context.get_remaining_time_in_millis() - margin_ms) / 1000.0
+
+
+def build_items(body):
+    """
+    Monta os parâmetros de cada item a partir de body['urls'].
+    Lança ValueError se 'urls' não for uma lista válida.
+    """
+    urls = body.get('urls')
+    if not isinstance(urls, list) or not urls:
+        raise ValueError("'urls' deve ser uma lista não vazia")
+    if len(urls) > BATCH_MAX_URLS:
+        raise ValueError(f"'urls' aceita no máximo {BATCH_MAX_URLS} itens")
+    base = {k: v for k, v in body.items() if k not in ('urls', 'max_batch_concurrency')}
+    items = []
+    for item in urls:
+        if isinstance(item, str):
+            items.append({**base, 'url': item})
+        elif isinstance(item, dict) and item.get('url'):
+            items.append({**base, **item})
+        else:
+            raise ValueError(f"Item inválido em 'urls': {item!r}")
+    return items
+
+
+def _item_result(item, response):
+    """Converte a resposta do processamento de uma URL no resultado do batch"""
+    result = response.get('body')
+    try:
+        result = json.loads(result)
+    except (TypeError, ValueError):
+        pass
+    return {
+        'url': item['url'],
+        'status': 'ok' if response.get('statusCode') == 200 else 'error',
+        'statusCode': response.get('statusCode'),
+        'result': result
+    }
+
+
+def _collect(done, running, items, results):
+    for future in done:
+        index = running.pop(future)
+        try:
+            results[index] = _item_result(items[index], future.result())
+        except Exception as e:
+            results[index] = {'url': items[index]['url'], 'status': 'error', 'statusCode': 500,
+                              'result': {'error': str(e)}}
+
+
+def run_batch(body, context, scrape_one):
+    """
+    Processa body['urls'] com scrape_one(params, deadline=prazo, rate_limiter=limiter) ->
+    resposta no formato do lambda_handler (scrape_one deve parar o trabalho no prazo e passar
+    todas as requisições, inclusive a inicial, pelo limiter do batch).
+    Retorna o dicionário com "results" (na ordem dos itens), "unprocessed" e "deadline_reached".
+    """
+    items = build_items(body)
+    concurrency = min(int(body.get('max_batch_concurrency') or BATCH_MAX_CONCURRENCY), BATCH_MAX_CONCURRENCY)
+    deadline = compute_deadline(context)
+    rate_limiter = HostRateLimiter.from_params(body)
+    executor = get_executor()
+
+    results = [None] * len(items)
+    running = {}
+    next_index = 0
+    deadline_reached = False
+
+    while next_index < len(items) or running:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            deadline_reached = True
+            break
+        while next_index < len(items) and len(running) < concurrency:
+            future = executor.submit(scrape_one, items[next_index], deadline=deadline, rate_limiter=rate_limiter)
+            running[future] = next_index
+            next_index += 1
+        done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+        _collect(done, running, items, results)
+
+    # Itens em andamento no prazo param a recursão nele; aguarda que terminem (até metade
+    # da margem), para não deixar trabalho rodando no pool na próxima invocação
+    if running:
+        done, _ = wait(running, timeout=BATCH_DEADLINE_MARGIN_MS / 2000.0)
+        _collect(done, running, items, results)
+    # Os que ainda não terminaram são devolvidos para reenvio
+    for future in running:
+        future.cancel()
+    unprocessed = [body['urls'][i] for i, result in enumerate(results) if result is None]
+
+    return {
+        'results': [result for result in results if result is not None],
+        'unprocessed': unprocessed,
+        'deadline_reached': deadline_reached
+    }
@@ -0,0 +1,401 @@
+"""
+Cache de respostas HTTP com revalidação condicional (ETag / Last-Modified).
+
+O cache tem dois níveis: um LRU em memória, que sobrevive entre invocações "quentes"
+da Lambda, e um nível persistente opcional (disco local ou bucket S3-compatível).
+São guardados três tipos de registro:
+
+    http:<hash da URL + headers>   validadores, headers e validade da resposta
+    body:<hash do conteúdo>        corpo da resposta
+    result:<hash>                  resultado extraído (título, markdown, metadados...)
+                                   para uma URL + hash do conteúdo + variante
+
+Uma resposta 304 reaproveita o hash do conteúdo anterior, de modo que o resultado
+já extraído é devolvido sem parsear a página novamente.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import httpx
+
+from . import instrumentation
+from .download import download, download_async, download_info
+
+# Liga o cache por padrão (pode ser desligado por requisição com "cache": false)
+CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Número de registros mantidos no LRU em memória
+CACHE_MEMORY_ENTRIES = int(os.environ.get('CACHE_MEMORY_ENTRIES', 256))
+# Total de bytes (corpos e registros) mantidos no LRU em memória
+CACHE_MEMORY_BYTES = int(os.environ.get('CACHE_MEMORY_BYTES', 64 * 1024 * 1024))
+# Corpos maiores que isso não são guardados
+CACHE_MAX_BODY_BYTES = int(os.environ.get('CACHE_MAX_BODY_BYTES', 5 * 1024 * 1024))
+# Nível persistente opcional: diretório local ou bucket S3
+CACHE_DIR = os.environ.get('CACHE_DIR')
+CACHE_S3_BUCKET = os.environ.get('CACHE_S3_BUCKET')
+CACHE_S3_PREFIX = os.environ.get('CACHE_S3_PREFIX', 'scrape-cache/')
+
+# Headers da resposta guardados junto com o corpo
+STORED_HEADERS = ('content-type', 'etag', 'last-modified', 'cache-control', 'expires', 'date')
+
+_cache = None
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class MemoryStore:
+    """Store LRU em memória, limitado por número de registros e total de bytes dos valores bytes (seguro entre threads)"""
+
+    def __init__(self, max_entries=CACHE_MEMORY_ENTRIES, max_bytes=CACHE_MEMORY_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.data = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+            if value is not None:
+                self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self._pop(key)
+            size = _size(value)
+            # Valor maior que o limite inteiro não é guardado (esvaziaria o cache sem caber)
+            if size > self.max_bytes:
+                return
+            self.data[key] = value
+            self.size += size
+            while len(self.data) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.data.popitem(last=False)
+                self.size -= _size(evicted)
+
+    def delete(self, key):
+        with self.lock:
+            self._pop(key)
+
+    def _pop(self, key):
+        value = self.data.pop(key, None)
+        if value is not None:
+            self.size -= _size(value)
+
+
+def _size(value):
+    # Só corpos e registros serializados contam bytes; objetos (ex.: robots.txt interpretado)
+    # ficam limitados apenas pelo número de registros
+    return len(value) if isinstance(value, (bytes, bytearray)) else 0
+
+
+class DiskStore:
+    """Store em disco local (um arquivo por chave)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hash_bytes(key.encode('utf-8')))
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value):
+        # Escrita atômica: grava em arquivo temporário e renomeia
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_path, self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3Store:
+    """Store em bucket S3 (ou compatível); client é um cliente boto3 s3"""
+
+    def __init__(self, bucket, prefix=CACHE_S3_PREFIX, client=None):
+        if client is None:
+            import boto3
+            client = boto3.client('s3')
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = client
+
+    def _key(self, key):
+        return self.prefix + hash_bytes(key.encode('utf-8'))
+
+    def get(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body'].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def set(self, key, value):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=value)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+class TieredStore:
+    """Combina o LRU em memória com um store persistente opcional"""
+
+    def __init__(self, memory, persistent=None):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.persistent is not None:
+            self.persistent.delete(key)
+
+
+def parse_cache_control(value):
+    """Converte o header Cache-Control em dicionário ({'max-age': '60', 'no-store': True, ...})"""
+    directives = {}
+    for part in (value or '').split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, _, arg = part.partition('=')
+        directives[name.strip()] = arg.strip().strip('"') if arg else True
+    return directives
+
+
+def freshness_lifetime(headers):
+    """Tempo (em segundos) em que a resposta pode ser usada sem revalidar"""
+    directives = parse_cache_control(headers.get('cache-control'))
+    if 'no-cache' in directives:
+        return 0
+    for name in ('s-maxage', 'max-age'):
+        value = directives.get(name)
+        if value is not None and re.fullmatch(r'\d+', str(value)):
+            return int(value)
+    return 0
+
+
+class ResponseCache:
+    """Cache de respostas e de resultados extraídos sobre um store de bytes"""
+
+    def __init__(self, store):
+        self.store = store
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'result_hits': 0}
+
+    @staticmethod
+    def http_key(url, headers=None):
+        vary = json.dumps(sorted((k.lower(), str(v)) for k, v in (headers or {}).items()))
+        return 'http:' + hash_bytes(f"{url}\n{vary}".encode('utf-8'))
+
+    def _get_json(self, key):
+        value = self.store.get(key)
+        return json.loads(value) if value is not None else None
+
+    def _set_json(self, key, value):
+        self.store.set(key, json.dumps(value).encode('utf-8'))
+
+    def lookup(self, url, headers=None):
+        """Retorna (entry, fresh) para a URL; entry é None se não houver registro"""
+        entry = self._get_json(self.http_key(url, headers))
+        if not entry:
+            return None, False
+        return entry, entry.get('expires_at', 0) > time.time()
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def to_response(self, entry, method='GET'):
+        """Reconstrói a resposta a partir do cache (None se o corpo não estiver mais guardado)"""
+        body = self.store.get('body:' + entry['content_hash'])
+        if body is None:
+            return None
+        response = httpx.Response(
+            entry['status_code'], headers=entry['headers'], content=body,
+            request=httpx.Request(method, entry['final_url'])
+        )
+        return response
+
+    def save(self, url, headers, response):
+        """Guarda a resposta (se permitido pelo Cache-Control) e retorna o hash do conteúdo"""
+        content = response.content
+        content_hash = hash_bytes(content)
+        directives = parse_cache_control(response.headers.get('cache-control'))
+        if response.status_code != 200 or 'no-store' in directives or len(content) > CACHE_MAX_BODY_BYTES:
+            return content_hash
+        info = download_info(response)
+        if info.get('truncated') or info.get('skipped'):
+            # Corpo incompleto: não pode ser reaproveitado por outra requisição
+            return content_hash
+        self.store.set('body:' + content_hash, content)
+        self._set_json(self.http_key(url, headers), {
+            'final_url': str(response.url),
+            'status_code': response.status_code,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() in STORED_HEADERS},
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+            'content_hash': content_hash,
+            'expires_at': time.time() + freshness_lifetime(response.headers)
+        })
+        return content_hash
+
+    def refresh(self, url, headers, entry, not_modified):
+        """Atualiza a validade do registro após uma resposta 304"""
+        for name in ('cache-control', 'expires', 'date', 'etag', 'last-modified'):
+            if name in not_modified.headers:
+                entry['headers'][name] = not_modified.headers[name]
+        entry['etag'] = entry['headers'].get('etag', entry.get('etag'))
+        entry['last_modified'] = entry['headers'].get('last-modified', entry.get('last_modified'))
+        entry['expires_at'] = time.time() + freshness_lifetime(not_modified.headers)
+        self._set_json(self.http_key(url, headers), entry)
+
+    @staticmethod
+    def result_key(url, content_hash, variant):
+        return 'result:' + hash_bytes(f"{url}\n{content_hash}\n{variant}".encode('utf-8'))
+
+    def get_result(self, url, content_hash, variant):
+        result = self._get_json(self.result_key(url, content_hash, variant))
+        if result is not None:
+            self.stats['result_hits'] += 1
+            instrumentation.count('result_cache_hits')
+        return result
+
+    def set_result(self, url, content_hash, variant, result):
+        self._set_json(self.result_key(url, content_hash, variant), result)
+
+
+def get_cache():
+    """Retorna o cache do container, criado na primeira chamada a partir das variáveis de ambiente"""
+    global _cache
+    if _cache is None:
+        persistent = None
+        if CACHE_S3_BUCKET:
+            persistent = S3Store(CACHE_S3_BUCKET, CACHE_S3_PREFIX)
+        elif CACHE_DIR:
+            persistent = DiskStore(CACHE_DIR)
+        _cache = ResponseCache(TieredStore(MemoryStore(CACHE_MEMORY_ENTRIES, CACHE_MEMORY_BYTES), persistent))
+    return _cache
+
+
+def _mark(response, status, content_hash):
+    response.extensions['cache'] = {'status': status, 'content_hash': content_hash}
+    return response
+
+
+def content_hash_of(response):
+    """Hash do conteúdo registrado por fetch/fetch_async (None se a resposta não passou pelo cache)"""
+    return response.extensions.get('cache', {}).get('content_hash')
+
+
+def _before(cache, method, url, headers):
+    """Consulta o cache antes da requisição: (entry, resposta em cache ou None, headers a enviar)"""
+    headers = dict(headers or {})
+    if cache is None or method != 'GET':
+        return None, None, headers
+    entry, fresh = cache.lookup(url, headers)
+    if entry is None:
+        return None, None, headers
+    if fresh:
+        cached = cache.to_response(entry, method)
+        if cached is not None:
+            cache.stats['hits'] += 1
+            instrumentation.count('cache_hits')
+            return entry, _mark(cached, 'hit', entry['content_hash']), headers
+    return entry, None, {**headers, **cache.conditional_headers(entry)}
+
+
+def _after(cache, method, url, headers, entry, response):
+    """Trata a resposta: 304 reaproveita o registro; demais respostas são guardadas"""
+    if cache is None or method != 'GET':
+        return response
+    if response.status_code == 304 and entry is not None:
+        cached = cache.to_response(entry, method)
+        if cached is not None:
+            cache.stats['revalidated'] += 1
+            instrumentation.count('cache_revalidated')
+            cache.refresh(url, headers, entry, response)
+            return _mark(cached, 'revalidated', entry['content_hash'])
+        return None
+    cache.stats['misses'] += 1
+    instrumentation.count('cache_misses')
+    return _mark(response, 'miss', cache.save(url, headers, response))
+
+
+def fetch(client, method, url, headers=None, timeout=None, cache=None, budget=None):
+    """
+    Executa a requisição com o httpx.Client passando pelo cache (se informado).
+    Com budget (DownloadBudget), o corpo é lido em streaming dentro dos limites de download.
+    """
+    entry, cached, request_headers = _before(cache, method, url, headers)
+    if cached is not None:
+        return cached
+    response = download(client, method, url, headers=request_headers, timeout=timeout, budget=budget)
+    result = _after(cache, method, url, headers, entry, response)
+    if result is None:
+        # 304 sem o corpo em cache: repete a requisição sem os headers condicionais
+        response = download(client, method, url, headers=headers, timeout=timeout, budget=budget)
+        result = _after(cache, method, url, headers, None, response)
+    return result
+
+
+async def fetch_async(client, method, url, headers=None, timeout=None, cache=None, budget=None):
+    """Versão assíncrona de fetch, para o httpx.AsyncClient"""
+    entry, cached, request_headers = _before(cache, method, url, headers)
+    if cached is not None:
+        return cached
+    response = await download_async(client, method, url, headers=request_headers, timeout=timeout,
+                                    budget=budget)
+    result = _after(cache, method, url, headers, entry, response)
+    if result is None:
+        response = await download_async(client, method, url, headers=headers, timeout=timeout, budget=budget)
+        result = _after(cache, method, url, headers, None, response)
+    return result
+
+
+def cached_result(cache, url, content_hash, variant, compute):
+    """
+    Retorna o resultado extraído em cache para URL + hash do conteúdo + variante,
+    calculando-o com compute() (e guardando) quando não existir.
+    """
+    if cache is None or content_hash is None:
+        return compute()
+    result = cache.get_result(url, content_hash, variant)
+    if result is None:
+        result = compute()
+        if result is not None:
+            cache.set_result(url, content_hash, variant, result)
+    return result
@@ -0,0 +1,107 @@
+"""
+Checkpoints da recursão para crawls que não cabem no tempo de uma invocação.
+
+Quando o prazo da Lambda (context.get_remaining_time_in_millis() menos
+CHECKPOINT_MARGIN_MS) chega durante a recursão, o crawler para, descarta as requisições
+em andamento e devolve seu estado: fronteira, URLs visitadas, árvore já montada e
+contadores. Esse estado vira um token de continuação (JSON comprimido com zlib, em
+base64 url-safe); uma nova chamada com o mesmo corpo e "continuation_token" retoma o
+crawl exatamente de onde parou. Os links interrompidos aparecem na resposta como
+{"status": "pending"}.
+
+O token é assinado com HMAC-SHA256 (CHECKPOINT_SECRET) e a assinatura é conferida antes
+de qualquer decodificação, de modo que o estado (árvore, visitados, store) não pode ser
+forjado pelo chamador. Sem segredo configurado, não há checkpoints.
+
+Com "checkpoint_store" (nome de um estado dentro de INCREMENTAL_STATE_BASE), o estado é
+gravado no store e o token só aponta para ele, o que mantém a resposta pequena em crawls
+grandes.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import zlib
+
+from .incremental import open_state_store
+
+# Liga os checkpoints por padrão (pode ser desligado por requisição com "checkpoint": false)
+CHECKPOINT_ENABLED = os.environ.get('CHECKPOINT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Margem (em ms) antes do timeout da Lambda para parar o crawl e montar a resposta
+CHECKPOINT_MARGIN_MS = int(os.environ.get('CHECKPOINT_MARGIN_MS', 3000))
+# Segredo da assinatura dos tokens de continuação (vazio = checkpoints desligados)
+CHECKPOINT_SECRET = os.environ.get('CHECKPOINT_SECRET', '')
+
+TOKEN_VERSION = 2
+STORE_SUFFIX = '.checkpoint'
+
+
+def _encode(data):
+    raw = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), 9)
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode(token):
+    padded = token + '=' * (-len(token) % 4)
+    return json.loads(zlib.decompress(base64.urlsafe_b64decode(padded.encode('ascii'))))
+
+
+def _signature(payload):
+    digest = hmac.new(CHECKPOINT_SECRET.encode('utf-8'), payload.encode('ascii'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')
+
+
+def signing_enabled():
+    """True se há segredo para assinar tokens (condição para os checkpoints)"""
+    return bool(CHECKPOINT_SECRET)
+
+
+def open_checkpoint_store(name):
+    """Store do parâmetro checkpoint_store (nome dentro de INCREMENTAL_STATE_BASE); lança ValueError"""
+    return open_state_store(name, suffix=STORE_SUFFIX)
+
+
+def make_token(url, state, store_name=None):
+    """Token assinado de continuação do crawl de `url` (estado inline ou gravado no store)"""
+    if not signing_enabled():
+        raise ValueError("CHECKPOINT_SECRET não configurado")
+    data = {'v': TOKEN_VERSION, 'url': url, 'state': state}
+    if store_name:
+        open_checkpoint_store(store_name).write(zlib.compress(json.dumps(data).encode('utf-8')))
+        data = {'v': TOKEN_VERSION, 'url': url, 'store': store_name}
+    payload = _encode(data)
+    return f"{payload}.{_signature(payload)}"
+
+
+def load_token(token, url):
+    """Estado salvo no token; lança ValueError se o token for inválido, não assinado ou de outra URL"""
+    if not signing_enabled():
+        raise ValueError("checkpoints desligados no servidor")
+    payload, _, signature = token.partition('.') if isinstance(token, str) else ('', '', '')
+    if not payload or not hmac.compare_digest(signature, _signature(payload)):
+        raise ValueError("token de continuação inválido: assinatura não confere")
+    try:
+        data = _decode(payload)
+        if 'store' in data:
+            stored = open_checkpoint_store(data['store']).read()
+            if stored is None:
+                raise ValueError("checkpoint não encontrado no store")
+            data = json.loads(zlib.decompress(stored))
+    except (TypeError, ValueError, zlib.error) as e:
+        raise ValueError(f"token de continuação inválido: {e}")
+    if data.get('v') != TOKEN_VERSION or 'state' not in data:
+        raise ValueError("token de continuação inválido")
+    if data.get('url') != url:
+        raise ValueError("token de continuação pertence a outra URL")
+    return data['state']
+
+
+def checkpoint_summary(state):
+    """Resumo do estado interrompido, para a resposta"""
+    return {
+        'depth': state['depth'],
+        'pending': len(state['pending']),
+        'frontier': sum(len(links) for _, _, links in state['frontier']),
+        'visited': state['count'],
+    }
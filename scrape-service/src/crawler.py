@@ -0,0 +1,233 @@
+"""
+Motor de crawl assíncrono usado pela recursão de process_html.
+
+A recursão é feita em largura (BFS): todos os links de um nível são buscados
+de forma concorrente (limitada por max_concurrency e pelo rate limit de cada
+host) antes de passar ao nível seguinte, de modo que o tempo total cresce com a
+profundidade e não com a quantidade de links.
+"""
+import asyncio
+import os
+import time
+
+from . import instrumentation
+from .cache import fetch_async
+from .http_client import get_async_client, run
+from .link_rules import compile_link_filter
+from .rate_limit import HostRateLimiter
+from .urls import DEFAULT_CANONICALIZER, dump_seen_set, load_seen_set
+
+# Número máximo de requisições simultâneas durante a recursão
+CRAWL_MAX_CONCURRENCY = int(os.environ.get('CRAWL_MAX_CONCURRENCY', 10))
+
+
+def filter_links(links, link_exp_filter=None):
+    """
+    Aplica o filtro (regex de link_exp_filter ou LinkRules) a uma lista de links já
+    absolutos, preservando a ordem original.
+    """
+    rules = compile_link_filter(link_exp_filter)
+    if rules is None:
+        return list(links)
+    return rules.filter(links)
+
+
+def frontier_links(links, canonicalizer, rules=None):
+    """Links sem repetições (pela chave canônica) e filtrados: lista de (URL original, chave de visitados)"""
+    pairs = canonicalizer.dedupe(links)
+    if rules is None:
+        return pairs
+    return [(link, key) for link, key in pairs if rules.match(link)]
+
+
+async def _fetch(client, semaphore, url, process_response, rate_limiter, timeout, cache, budget, headers=None):
+    """
+    Busca uma URL respeitando o rate limit do host e o limite de concorrência,
+    repetindo a requisição após 429/503 conforme o Retry-After.
+    Retorna (node, child_links) conforme devolvido por process_response.
+    """
+    try:
+        attempt = 0
+        while True:
+            # Aguarda a vez do host antes de ocupar uma vaga de concorrência
+            with instrumentation.stage('rate_limit_wait'):
+                await rate_limiter.acquire(url)
+            async with semaphore:
+                response = await fetch_async(client, 'GET', url, headers=headers, timeout=timeout, cache=cache,
+                                             budget=budget)
+            if rate_limiter.retry_delay(url, response, attempt) is None:
+                break
+            attempt += 1
+        if response.status_code == 429:
+            return {"error": f"HTTP 429 após {attempt + 1} tentativa(s)", "status": "rate_limited"}, None
+        instrumentation.count('pages_crawled')
+        return process_response(response, url)
+    except Exception as e:
+        return {"error": str(e)}, None
+
+
+async def crawl_async(root_links, process_response, level=0, max_level=0, processed_urls=None,
+                      max_recursion_links=None, link_exp_filter=None, current_recursion_count=None,
+                      max_concurrency=None, rate_limiter=None, timeout=10.0, cache=None,
+                      root_url=None, on_result=None, keep_tree=True, budget=None, canonicalizer=None,
+                      request_headers=None, deadline=None, resume=None, checkpoint=None, near_duplicates=None):
+    """
+    Percorre os links a partir de uma página já processada e monta a árvore de resultados.
+
+    root_links: links absolutos encontrados na página raiz (em ordem)
+    process_response: função (response, url) -> (node, child_links); node é o dicionário
+        do resultado (ou None para ignorar o link) e child_links a lista de links da página
+        filha, quando ela deve ser expandida (node precisa então conter a chave "links")
+    level / max_level: nível da página raiz e profundidade máxima
+    processed_urls: chaves das URLs já processadas (compartilhado para evitar loops); um set
+        ou um BloomFilter
+    max_recursion_links: número máximo de links buscados em todo o crawl
+    link_exp_filter: LinkRules (ou expressão regular) que decide quais links são seguidos
+    current_recursion_count: contador de links buscados ({'count': n})
+    max_concurrency: número máximo de requisições simultâneas
+    rate_limiter: HostRateLimiter da requisição (padrão: sem limite, apenas backoff em 429/503)
+    timeout: timeout de cada requisição (segundos ou httpx.Timeout)
+    cache: ResponseCache usado nas requisições (None = sem cache)
+    root_url: URL da página raiz (informada como "parent" dos links do primeiro nível)
+    on_result: função chamada com (url, depth, parent, node) assim que cada link é processado
+    keep_tree: se False, os resultados não são mantidos na árvore (útil quando on_result
+        já entrega cada página, evitando manter o crawl inteiro em memória)
+    budget: DownloadBudget compartilhado com a página raiz (None = corpo lido sem limites)
+    canonicalizer: UrlCanonicalizer usado só na comparação com processed_urls; as URLs são
+        buscadas e usadas como chave da árvore como foram encontradas (padrão: regras das
+        variáveis de ambiente)
+    request_headers: função url -> headers adicionais da requisição (ex.: headers condicionais
+        do modo incremental)
+
+    deadline: instante (time.monotonic) em que o crawl deve parar; os links ainda não
+        concluídos ficam na árvore como {"status": "pending"} e são devolvidos em checkpoint
+        para uma invocação seguinte
+    resume: estado salvo em checkpoint por um crawl interrompido; o crawl continua dele
+        (root_links, processed_urls e o contador são substituídos pelos do estado)
+    checkpoint: dicionário preenchido com o estado do crawl quando ele para no deadline
+    near_duplicates: NearDuplicateDetector da requisição; links cujo padrão de URL só tem
+        produzido páginas quase duplicadas não são buscados
+
+    Retorna o dicionário de links da página raiz.
+    """
+    if processed_urls is None:
+        processed_urls = set()
+    if current_recursion_count is None:
+        current_recursion_count = {'count': 0}
+    if rate_limiter is None:
+        rate_limiter = HostRateLimiter()
+    if canonicalizer is None:
+        canonicalizer = DEFAULT_CANONICALIZER
+    # Compilado uma única vez para todo o crawl
+    link_rules = compile_link_filter(link_exp_filter)
+    semaphore = asyncio.Semaphore(max_concurrency or CRAWL_MAX_CONCURRENCY)
+
+    if resume is not None:
+        root_tree = resume['tree']
+        processed_urls = load_seen_set(resume['processed'])
+        current_recursion_count['count'] = resume['count']
+        depth = resume['depth']
+        # Links do nível atual que não terminaram: (caminho na árvore, página de origem, link)
+        pending = [(_subtree(root_tree, path), path, parent, link) for path, parent, link in resume['pending']]
+        # Fronteira: (dicionário de links da página, caminho, URL da página, links encontrados nela)
+        frontier = []
+        next_frontier = [(_subtree(root_tree, path), path, parent, [tuple(pair) for pair in links])
+                         for path, parent, links in resume['frontier']]
+    else:
+        root_tree = {}
+        depth = level
+        pending = []
+        frontier = [(root_tree, [], root_url, frontier_links(root_links, canonicalizer, link_rules))]
+        next_frontier = []
+
+    async def fetch_and_emit(parent, link):
+        headers = request_headers(link) if request_headers is not None else None
+        result = await _fetch(client, semaphore, link, process_response, rate_limiter, timeout, cache, budget,
+                              headers)
+        if on_result is not None and result[0] is not None:
+            on_result(link, depth + 1, parent, result[0])
+        return result
+
+    client = get_async_client()
+    while frontier or pending:
+        for tree, path, parent, page_links in frontier:
+            for link, key in page_links:
+                if depth < max_level and key not in processed_urls:
+                    if near_duplicates is not None and near_duplicates.blocked(link):
+                        if link not in tree:
+                            tree[link] = {"status": "near_duplicate_pattern"}
+                    elif max_recursion_links is None or current_recursion_count['count'] < max_recursion_links:
+                        current_recursion_count['count'] += 1
+                        processed_urls.add(key)
+                        # Reserva a posição para manter a ordem dos links na saída
+                        tree[link] = None
+                        pending.append((tree, path, parent, link))
+                    elif link not in tree:
+                        tree[link] = {"status": "max_recursion_links_reached"}
+                elif link not in tree:
+                    tree[link] = {"status": "max_level_reached"}
+
+        # Prazo já esgotado: o nível inteiro fica para a próxima invocação
+        if deadline is not None and time.monotonic() >= deadline:
+            tasks = [None] * len(pending)
+        else:
+            tasks = [asyncio.ensure_future(fetch_and_emit(parent, link)) for _, _, parent, link in pending]
+        if deadline is None:
+            await asyncio.gather(*tasks)
+        elif any(tasks):
+            await asyncio.wait(tasks, timeout=max(0.0, deadline - time.monotonic()))
+
+        unfinished, cancelled = [], []
+        for entry, task in zip(pending, tasks):
+            tree, path, _, link = entry
+            if task is None or not task.done():
+                # Interrompido no deadline: será buscado de novo ao retomar o crawl
+                if task is not None:
+                    task.cancel()
+                    cancelled.append(task)
+                tree[link] = {"status": "pending"}
+                unfinished.append(entry)
+                continue
+            node, child_links = task.result()
+            if node is None or not keep_tree:
+                del tree[link]
+            else:
+                tree[link] = node
+            if node is not None and child_links is not None:
+                next_frontier.append((node["links"], path + [link], link,
+                                      frontier_links(child_links, canonicalizer, link_rules)))
+
+        if unfinished:
+            await asyncio.gather(*cancelled, return_exceptions=True)
+            if checkpoint is not None:
+                checkpoint.update({
+                    'tree': root_tree,
+                    'processed': dump_seen_set(processed_urls),
+                    'count': current_recursion_count['count'],
+                    'depth': depth,
+                    'pending': [[path, parent, link] for _, path, parent, link in unfinished],
+                    'frontier': [[path, parent, [list(pair) for pair in links]]
+                                 for _, path, parent, links in next_frontier],
+                })
+            break
+        pending = []
+        frontier, next_frontier = next_frontier, []
+        depth += 1
+
+    return root_tree
+
+
+def _subtree(root_tree, path):
+    """Dicionário de links da página no caminho informado (destacado se não está na árvore)"""
+    tree = root_tree
+    for url in path:
+        node = tree.get(url)
+        if not isinstance(node, dict) or not isinstance(node.get('links'), dict):
+            return {}
+        tree = node['links']
+    return tree
+
+
+def crawl(root_links, process_response, **kwargs):
+    """Versão síncrona de crawl_async, executada no event loop persistente do container."""
+    return run(crawl_async(root_links, process_response, **kwargs))
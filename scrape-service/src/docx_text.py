@@ -0,0 +1,144 @@
+"""
+Extração de texto de documentos DOCX em streaming, limitada por caracteres.
+
+word/document.xml é lido direto do ZIP (descompressão incremental) por um parser XML
+incremental (iterparse); cada bloco do corpo é descartado assim que processado, e a leitura
+para quando o limite de caracteres é atingido. As demais partes do pacote (imagens e outras
+mídias, estilos, numeração...) não são abertas, de modo que memória e CPU acompanham o
+texto devolvido e não o tamanho do arquivo.
+
+O texto segue as regras do docx2txt: parágrafos separados por linha em branco, <w:tab> vira
+tabulação e <w:br>/<w:cr> quebra de linha. Opcionalmente, cabeçalhos e rodapés
+(word/header*.xml, word/footer*.xml) e as tabelas do corpo (linhas e células) são
+devolvidos como dados estruturados.
+"""
+import io
+import os
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+# Limite padrão de caracteres do texto (0 = sem limite)
+DOCX_MAX_CHARS = int(os.environ.get('DOCX_MAX_CHARS', 0))
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+PARAGRAPH, TEXT, TAB = W + 'p', W + 't', W + 'tab'
+BREAKS = (W + 'br', W + 'cr')
+TABLE, ROW, CELL = W + 'tbl', W + 'tr', W + 'tc'
+
+DOCUMENT_PART = 'word/document.xml'
+_HEADER_PART = re.compile(r'word/header[0-9]*\.xml$')
+_FOOTER_PART = re.compile(r'word/footer[0-9]*\.xml$')
+
+
+class _Text:
+    """Texto extraído de uma parte, com o limite de caracteres e as tabelas encontradas"""
+
+    def __init__(self, max_chars=None, tables=False):
+        self.pieces = []
+        self.size = 0
+        self.max_chars = max_chars
+        self.paragraphs = 0
+        self.truncated = False
+        self.tables = [] if tables else None
+        # Tabelas e células abertas (tabelas dentro de células são devolvidas separadamente)
+        self.open_tables = []
+        self.cells = []
+
+    @property
+    def full(self):
+        # Os dois primeiros caracteres ("\n\n" do primeiro parágrafo) são removidos no fim
+        return bool(self.max_chars) and self.size >= self.max_chars + 2
+
+    def add(self, text):
+        self.pieces.append(text)
+        self.size += len(text)
+        for cell in self.cells:
+            cell.append(text)
+
+    def start(self, tag):
+        if tag == PARAGRAPH:
+            self.paragraphs += 1
+            self.add('\n\n')
+        elif tag == TAB:
+            self.add('\t')
+        elif tag in BREAKS:
+            self.add('\n')
+        elif self.tables is not None:
+            if tag == TABLE:
+                self.open_tables.append([])
+            elif tag == ROW and self.open_tables:
+                self.open_tables[-1].append([])
+            elif tag == CELL and self.open_tables and self.open_tables[-1]:
+                self.cells.append([])
+
+    def end(self, element):
+        tag = element.tag
+        if tag == TEXT:
+            if element.text:
+                self.add(element.text)
+        elif self.tables is not None:
+            if tag == CELL and self.cells and self.open_tables and self.open_tables[-1]:
+                self.open_tables[-1][-1].append(''.join(self.cells.pop()).strip())
+            elif tag == TABLE and self.open_tables:
+                self.tables.append(self.open_tables.pop())
+
+    def text(self):
+        text = ''.join(self.pieces).strip()
+        if self.max_chars and len(text) > self.max_chars:
+            self.truncated = True
+            text = text[:self.max_chars]
+        return text
+
+
+def _read_part(archive, name, max_chars=None, tables=False):
+    """Lê uma parte XML do pacote em streaming até o limite de caracteres"""
+    result = _Text(max_chars, tables)
+    depth = 0
+    body = None
+    with archive.open(name) as stream:
+        for event, element in iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if depth == 2:
+                    body = element
+                result.start(element.tag)
+                continue
+            depth -= 1
+            result.end(element)
+            if result.full:
+                result.truncated = True
+                break
+            # Bloco do corpo (parágrafo, tabela...) já processado: sai da árvore em memória
+            if depth == 2 and body is not None:
+                body.clear()
+    # Tabelas interrompidas pelo limite de caracteres são devolvidas parciais
+    if result.tables is not None:
+        result.tables.extend(result.open_tables)
+    return result
+
+
+def extract_docx(content, max_chars=None, headers_footers=False, tables=False):
+    """
+    Extrai o texto de um DOCX.
+
+    max_chars: limite de caracteres do texto do corpo (padrão: DOCX_MAX_CHARS; 0 = sem limite)
+    headers_footers: devolve também os textos de cabeçalhos e rodapés
+    tables: devolve as tabelas do corpo como listas de linhas de células
+
+    Retorna (texto, estatísticas {"paragraphs", "chars", "truncated"[, "headers",
+    "footers"][, "tables"]}).
+    """
+    max_chars = max_chars if max_chars is not None else DOCX_MAX_CHARS
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        result = _read_part(archive, DOCUMENT_PART, max_chars, tables)
+        text = result.text()
+        stats = {"paragraphs": result.paragraphs, "chars": len(text), "truncated": result.truncated}
+        if headers_footers:
+            names = sorted(archive.namelist())
+            for key, pattern in (("headers", _HEADER_PART), ("footers", _FOOTER_PART)):
+                texts = [_read_part(archive, name, max_chars).text() for name in names if pattern.match(name)]
+                stats[key] = [part for part in texts if part]
+        if tables:
+            stats["tables"] = result.tables
+    return text, stats
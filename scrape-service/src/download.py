@@ -0,0 +1,244 @@
+"""
+Download em streaming com limites de tamanho.
+
+Os headers são analisados antes de ler o corpo: tipos não suportados (imagens, vídeos,
+binários...) e documentos maiores que o limite são descartados sem baixar o conteúdo.
+O corpo é lido em blocos respeitando um limite por tipo (HTML/documento) e um limite
+total por requisição (DownloadBudget). Para HTML, o download pode ainda ser encerrado
+assim que houver texto suficiente para o resumo (early_abort). Downloads interrompidos
+são marcados em response.extensions['download'].
+"""
+import os
+from html.parser import HTMLParser
+
+import httpx
+
+from . import instrumentation
+
+# Limite de bytes por resposta HTML
+DOWNLOAD_MAX_HTML_BYTES = int(os.environ.get('DOWNLOAD_MAX_HTML_BYTES', 5 * 1024 * 1024))
+# Limite de bytes por documento (PDF, DOCX, XLSX)
+DOWNLOAD_MAX_DOCUMENT_BYTES = int(os.environ.get('DOWNLOAD_MAX_DOCUMENT_BYTES', 20 * 1024 * 1024))
+# Limite total de bytes baixados por requisição (página raiz + recursão)
+DOWNLOAD_MAX_TOTAL_BYTES = int(os.environ.get('DOWNLOAD_MAX_TOTAL_BYTES', 50 * 1024 * 1024))
+# No early_abort, o HTML é lido até ter EARLY_ABORT_FACTOR x maxsize caracteres de texto
+EARLY_ABORT_FACTOR = int(os.environ.get('EARLY_ABORT_FACTOR', 2))
+
+DOCUMENT_TYPES = ("pdf", "word", "excel", "spreadsheet")
+TEXT_TYPES = ("html", "xml", "json", "text/")
+
+# Headers que não valem para o corpo já decodificado
+_ENCODING_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+def content_kind(content_type):
+    """Classifica o content-type em 'document', 'text' ou None (não suportado)"""
+    content_type = (content_type or '').lower()
+    if not content_type:
+        # Sem content-type o conteúdo é tratado como texto, como antes
+        return 'text'
+    if any(doc_type in content_type for doc_type in DOCUMENT_TYPES):
+        return 'document'
+    if any(text_type in content_type for text_type in TEXT_TYPES):
+        return 'text'
+    return None
+
+
+class TextGauge(HTMLParser):
+    """Mede, de forma incremental, quanto texto visível já foi recebido de um HTML"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.text_size = 0
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.text_size += len(data.strip())
+
+
+class DownloadBudget:
+    """Limites de download de uma requisição (compartilhados entre a raiz e a recursão)"""
+
+    def __init__(self, max_total_bytes=DOWNLOAD_MAX_TOTAL_BYTES, max_html_bytes=DOWNLOAD_MAX_HTML_BYTES,
+                 max_document_bytes=DOWNLOAD_MAX_DOCUMENT_BYTES, text_target=None):
+        self.max_total_bytes = max_total_bytes
+        self.max_html_bytes = max_html_bytes
+        self.max_document_bytes = max_document_bytes
+        # Quantidade de texto (caracteres) após a qual o download de HTML é encerrado
+        self.text_target = text_target
+        self.used_bytes = 0
+        self.truncated = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_params(cls, body, maxsize):
+        """
+        Cria o orçamento a partir do corpo da requisição. Os parâmetros max_total_bytes,
+        max_html_bytes e max_document_bytes só podem reduzir os limites do ambiente;
+        early_abort encerra o download de HTML com EARLY_ABORT_FACTOR x maxsize caracteres.
+        Lança ValueError para valores inválidos.
+        """
+        limits = {}
+        for name, default in (('max_total_bytes', DOWNLOAD_MAX_TOTAL_BYTES),
+                              ('max_html_bytes', DOWNLOAD_MAX_HTML_BYTES),
+                              ('max_document_bytes', DOWNLOAD_MAX_DOCUMENT_BYTES)):
+            value = body.get(name)
+            if value is None:
+                limits[name] = default
+                continue
+            value = int(value)
+            if value <= 0:
+                raise ValueError(f"'{name}' deve ser maior que zero")
+            limits[name] = min(value, default)
+        text_target = maxsize * EARLY_ABORT_FACTOR if body.get('early_abort', False) else None
+        return cls(text_target=text_target, **limits)
+
+    def remaining(self):
+        return max(0, self.max_total_bytes - self.used_bytes)
+
+    def limit_for(self, kind):
+        return self.max_document_bytes if kind == 'document' else self.max_html_bytes
+
+
+class _Reader:
+    """Decide, bloco a bloco, quanto do corpo ler"""
+
+    def __init__(self, response, budget):
+        self.budget = budget
+        self.kind = content_kind(response.headers.get('content-type'))
+        self.limit = budget.limit_for(self.kind)
+        self.chunks = []
+        self.size = 0
+        self.gauge = None
+        if self.kind == 'text' and budget.text_target and 'html' in response.headers.get('content-type', 'html'):
+            self.gauge = TextGauge()
+        self.info = {'bytes': 0, 'truncated': False, 'skipped': None}
+
+    def check_headers(self, response):
+        """Retorna o motivo para não ler o corpo, ou None se o corpo deve ser lido"""
+        if self.kind is None:
+            return 'unsupported_type'
+        if self.budget.remaining() <= 0:
+            return 'total_budget'
+        length = response.headers.get('content-length')
+        # Documentos incompletos não podem ser processados
+        if (self.kind == 'document' and length and length.isdigit()
+                and int(length) > min(self.limit, self.budget.remaining())):
+            return 'too_large'
+        return None
+
+    def feed(self, chunk):
+        """
+        Adiciona um bloco; retorna False quando a leitura deve parar. Os bytes são cobrados do
+        orçamento total à medida que chegam, de modo que downloads simultâneos da recursão
+        param juntos no limite compartilhado.
+        """
+        response_room = self.limit - self.size
+        total_room = self.budget.remaining()
+        room = min(response_room, total_room)
+        # Um corpo com exatamente `limit` bytes é completo: só é truncado se chegar mais
+        if len(chunk) > room:
+            self.chunks.append(chunk[:room])
+            self.size += room
+            self.budget.used_bytes += room
+            self.info['truncated'] = 'max_bytes' if response_room < total_room else 'total_budget'
+            return False
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        self.budget.used_bytes += len(chunk)
+        if self.gauge is not None:
+            self.gauge.feed(chunk.decode('utf-8', errors='ignore'))
+            if self.gauge.text_size >= self.budget.text_target:
+                self.info['truncated'] = 'early_abort'
+                return False
+        return True
+
+    def build(self, response, skipped=None):
+        """Monta a resposta final (com o corpo lido) e atualiza o orçamento"""
+        if skipped:
+            self.info['skipped'] = skipped
+            self.budget.skipped += 1
+        if self.kind == 'document' and self.info['truncated']:
+            # Documento cortado não é processável: descarta o conteúdo
+            self.info['skipped'] = 'too_large'
+            self.chunks = []
+        if self.info['truncated']:
+            self.budget.truncated += 1
+        self.info['bytes'] = self.size
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _ENCODING_HEADERS]
+        result = httpx.Response(response.status_code, headers=headers, content=b''.join(self.chunks),
+                                request=response.request)
+        result.extensions['download'] = self.info
+        return result
+
+
+def _record(trace, response):
+    """Registra no trace da requisição a resposta baixada"""
+    if trace.enabled:
+        trace.count('responses_fetched')
+        trace.count('bytes_downloaded', download_info(response).get('bytes', len(response.content)))
+
+
+def download(client, method, url, headers=None, timeout=None, budget=None):
+    """Requisição com httpx.Client lendo o corpo em streaming dentro do orçamento"""
+    trace = instrumentation.current()
+    extensions = {'trace': trace.http_trace()} if trace.enabled else None
+    with trace.stage('download'):
+        if budget is None:
+            response = client.request(method, url, headers=headers, timeout=timeout, extensions=extensions)
+        else:
+            with client.stream(method, url, headers=headers, timeout=timeout, extensions=extensions) as streamed:
+                reader = _Reader(streamed, budget)
+                skipped = reader.check_headers(streamed)
+                if not skipped:
+                    chunks = streamed.iter_bytes()
+                    try:
+                        for chunk in chunks:
+                            if not reader.feed(chunk):
+                                break
+                    finally:
+                        chunks.close()
+                response = reader.build(streamed, skipped)
+    _record(trace, response)
+    return response
+
+
+async def download_async(client, method, url, headers=None, timeout=None, budget=None):
+    """Versão assíncrona de download, para o httpx.AsyncClient"""
+    trace = instrumentation.current()
+    extensions = {'trace': trace.http_trace(asynchronous=True)} if trace.enabled else None
+    with trace.stage('download'):
+        if budget is None:
+            response = await client.request(method, url, headers=headers, timeout=timeout, extensions=extensions)
+        else:
+            async with client.stream(method, url, headers=headers, timeout=timeout,
+                                     extensions=extensions) as streamed:
+                reader = _Reader(streamed, budget)
+                skipped = reader.check_headers(streamed)
+                if not skipped:
+                    # O gerador é fechado explicitamente ao interromper a leitura (senão o
+                    # asyncio avisa "Task was destroyed but it is pending")
+                    chunks = streamed.aiter_bytes()
+                    try:
+                        async for chunk in chunks:
+                            if not reader.feed(chunk):
+                                break
+                    finally:
+                        await chunks.aclose()
+                response = reader.build(streamed, skipped)
+    _record(trace, response)
+    return response
+
+
+def download_info(response):
+    """Informações do download (bytes, truncated, skipped) ou {} se não passou por download()"""
+    return response.extensions.get('download', {})
@@ -0,0 +1,246 @@
+"""
+Pipeline de extração de páginas HTML em uma única passada.
+
+A página é parseada uma única vez e todos os dados usados pelo lambda_handler
+(título, resumo, imagens, links, JSON-LD e __NEXT_DATA__) são coletados no mesmo
+percurso da árvore. O texto do resumo deixa de ser calculado assim que maxsize é atingido;
+o texto completo (parte 'text', usada nas impressões digitais de near_duplicates) só é
+coletado quando pedido.
+
+O parser é plugável: 'html.parser' (padrão), 'lxml' (via BeautifulSoup) ou
+'selectolax' (engine lexbor), escolhido por requisição ou pela variável HTML_PARSER.
+"""
+import json
+import os
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+# Tags cujo texto compõe o resumo da página
+TEXT_TAGS = frozenset([
+    'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'strong', 'span', 'a'
+])
+# Número máximo de imagens retornadas por página
+MAX_IMAGES = 5
+EMPTY_SUMMARY = "<p>Não foram encontrados textos significativos na página.</p>"
+# Parser usado quando a requisição não informa outro
+HTML_PARSER = os.environ.get('HTML_PARSER', 'html.parser')
+# Partes que extract_page coleta por padrão (ver o parâmetro parts); 'text' só quando pedida
+PAGE_PARTS = frozenset(['title', 'summary', 'images', 'links', 'metadata'])
+
+
+class SoupBackend:
+    """Backend BeautifulSoup ('html.parser' ou 'lxml')"""
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def elements(self, html_content):
+        return BeautifulSoup(html_content, self.parser).find_all(True)
+
+    @staticmethod
+    def name(element):
+        return element.name
+
+    @staticmethod
+    def attr(element, key):
+        return element.get(key)
+
+    @staticmethod
+    def text(element, strip=False):
+        return element.get_text(strip=True) if strip else element.get_text()
+
+    @staticmethod
+    def string(element):
+        return element.string
+
+
+class SelectolaxBackend:
+    """Backend selectolax com a engine lexbor"""
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self.parser_class = LexborHTMLParser
+
+    def elements(self, html_content):
+        root = self.parser_class(html_content).root
+        return root.traverse() if root is not None else []
+
+    @staticmethod
+    def name(element):
+        return element.tag
+
+    @staticmethod
+    def attr(element, key):
+        return element.attributes.get(key)
+
+    @staticmethod
+    def text(element, strip=False):
+        return element.text(strip=strip)
+
+    @staticmethod
+    def string(element):
+        return element.text()
+
+
+def get_backend(parser=None):
+    """
+    Retorna o backend de parsing para o nome informado (ou HTML_PARSER).
+    Lança ValueError para parsers desconhecidos ou não instalados.
+    """
+    parser = (parser or HTML_PARSER).lower()
+    if parser == 'html.parser':
+        return SoupBackend('html.parser')
+    if parser == 'lxml':
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            raise ValueError("Parser 'lxml' não está instalado")
+        return SoupBackend('lxml')
+    if parser in ('selectolax', 'lexbor'):
+        try:
+            return SelectolaxBackend()
+        except ImportError:
+            raise ValueError("Parser 'selectolax' não está instalado")
+    raise ValueError(f"Parser desconhecido: {parser}")
+
+
+def parse_schema(scripts, loads=json.loads):
+    """
+    Interpreta o conteúdo dos scripts application/ld+json e retorna os dados do
+    produto (schema.org) com o breadcrumb, quando houver.
+    loads: função de decodificação do JSON (ex.: orjson)
+    """
+    schema_data = {}
+    for content in scripts:
+        try:
+            if content:
+                data = loads(content)
+                if isinstance(data, list):
+                    for item in data:
+                        if item.get("@type", "").lower() == "product":
+                            schema_data = item
+                        elif item.get("@type", "").lower() == "breadcrumblist":
+                            schema_data["breadcrumb"] = item.get("itemListElement", [])
+                elif isinstance(data, dict):
+                    type_value = data.get("@type", "").lower()
+                    if type_value == "product":
+                        schema_data = data
+                    elif type_value == "breadcrumblist":
+                        schema_data["breadcrumb"] = data.get("itemListElement", [])
+        except Exception:
+            continue
+    return schema_data
+
+
+def parse_next_data(content):
+    """Decodifica o conteúdo do script __NEXT_DATA__ (ou {} se ausente/inválido)"""
+    if not content:
+        return {}
+    try:
+        return json.loads(content)
+    except Exception:
+        return {}
+
+
+def extract_page(html_content, final_url, maxsize=2000, metadata=True, parser=None, parts=None):
+    """
+    Extrai, em uma única passada pela árvore, os dados de uma página HTML.
+
+    metadata: se False, não coleta/decodifica JSON-LD e __NEXT_DATA__
+    parser: nome do parser ('html.parser', 'lxml' ou 'selectolax'); padrão HTML_PARSER
+    parts: partes coletadas ('title', 'summary', 'images', 'links', 'metadata' e 'text');
+        padrão PAGE_PARTS. As partes não pedidas voltam como None e o percurso termina assim
+        que as pedidas estão completas (ex.: só o título)
+
+    Retorna um dicionário com title, resumo_html, images, links (absolutos, na ordem
+    em que aparecem), metadata ({"schema": ..., "nextData": ...} ou None) e text (texto
+    completo das tags do resumo, sem o limite de maxsize).
+    """
+    parts = PAGE_PARTS if parts is None else frozenset(parts)
+    if not metadata:
+        parts = parts - {'metadata'}
+    want_title, want_summary = 'title' in parts, 'summary' in parts
+    want_images, want_links, want_metadata = 'images' in parts, 'links' in parts, 'metadata' in parts
+    want_text = 'text' in parts
+    # Só título e/ou resumo: dá para parar no meio do documento
+    stops_early = not (want_images or want_links or want_metadata or want_text)
+
+    backend = get_backend(parser)
+    name_of, attr, text_of = backend.name, backend.attr, backend.text
+
+    title = "Sem Título"
+    title_found = False
+    resumo_html = []
+    resumo_size = 0
+    resumo_full = not want_summary
+    texto_completo = []
+    ultimo_texto = None
+    images = []
+    links = []
+    ld_json_scripts = []
+    next_data_content = None
+
+    for tag in backend.elements(html_content):
+        name = name_of(tag)
+
+        # Título: apenas a primeira tag <title> é considerada
+        if name == 'title' and not title_found:
+            title_found = True
+            string = backend.string(tag)
+            if string:
+                title = string.strip()
+            if stops_early and resumo_full:
+                break
+
+        # Resumo: textos consecutivos repetidos são descartados
+        elif name in TEXT_TAGS and (want_text or not resumo_full):
+            texto_atual = text_of(tag, strip=True)
+            if name == 'a':
+                texto_atual = f"[{texto_atual}]({attr(tag, 'href')})"
+            if texto_atual and texto_atual != ultimo_texto:
+                ultimo_texto = texto_atual
+                text = text_of(tag).strip()
+                if text and want_text:
+                    texto_completo.append(text)
+                if text and not resumo_full:
+                    paragraph = f"<p>{text}</p>\n"
+                    resumo_html.append(paragraph)
+                    resumo_size += len(paragraph)
+                if resumo_size > maxsize and not resumo_full:
+                    resumo_full = True
+                    if stops_early and (title_found or not want_title):
+                        break
+
+        elif name == 'img' and want_images and len(images) < MAX_IMAGES:
+            src = attr(tag, 'src')
+            if src:
+                full_src = urljoin(final_url, src)
+                if full_src not in images:
+                    images.append(full_src)
+
+        elif name == 'script' and want_metadata:
+            script_type = attr(tag, 'type')
+            if script_type == 'application/ld+json':
+                ld_json_scripts.append(text_of(tag, strip=True))
+            elif (script_type == 'application/json' and attr(tag, 'id') == '__NEXT_DATA__'
+                  and next_data_content is None):
+                next_data_content = backend.string(tag) or ''
+
+        if name == 'a' and want_links:
+            href = attr(tag, 'href')
+            if href:
+                links.append(urljoin(final_url, href))
+
+    return {
+        "title": title if want_title else None,
+        "resumo_html": (''.join(resumo_html) or EMPTY_SUMMARY) if want_summary else None,
+        "images": images if want_images else None,
+        "links": links if want_links else None,
+        "metadata": {
+            "schema": parse_schema(ld_json_scripts),
+            "nextData": parse_next_data(next_data_content)
+        } if want_metadata else None,
+        "text": '\n'.join(texto_completo) if want_text else None
+    }
@@ -0,0 +1,106 @@
+"""
+Clientes HTTP compartilhados (um por container), reutilizados entre invocações "quentes" da Lambda.
+
+Manter o mesmo pool de conexões evita um novo handshake TCP/TLS a cada URL quando os
+links apontam para o mesmo host. O cliente assíncrono fica preso a um event loop
+também persistente, já que conexões do httpx não podem trocar de loop; cada thread
+(ex.: as do modo batch) tem seu próprio loop e cliente assíncrono. Como os clientes
+atendem chamadores diferentes, nenhum cookie recebido é guardado entre requisições.
+"""
+import asyncio
+import http.cookiejar
+import importlib.util
+import os
+import threading
+
+import httpx
+
+# Limites do pool de conexões
+HTTP_MAX_CONNECTIONS = int(os.environ.get('HTTP_MAX_CONNECTIONS', 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('HTTP_MAX_KEEPALIVE_CONNECTIONS', 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('HTTP_KEEPALIVE_EXPIRY', 30.0))
+# HTTP/2 só é habilitado se o pacote h2 estiver instalado
+HTTP_HTTP2 = os.environ.get('HTTP_HTTP2', 'false').lower() in ('1', 'true', 'yes')
+# Timeout padrão (em segundos) quando o corpo da requisição não informa outro
+HTTP_DEFAULT_TIMEOUT = float(os.environ.get('HTTP_DEFAULT_TIMEOUT', 10.0))
+
+_client = None
+# Event loop e cliente assíncrono de cada thread
+_local = threading.local()
+
+
+class _RejectCookies(http.cookiejar.DefaultCookiePolicy):
+    """Política que recusa todo Set-Cookie: o jar do cliente compartilhado fica sempre vazio"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+def http2_enabled():
+    """Indica se o HTTP/2 foi solicitado e está disponível"""
+    return HTTP_HTTP2 and importlib.util.find_spec('h2') is not None
+
+
+def _client_options():
+    return {
+        'follow_redirects': True,
+        'cookies': http.cookiejar.CookieJar(policy=_RejectCookies()),
+        'http2': http2_enabled(),
+        'limits': httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        'timeout': HTTP_DEFAULT_TIMEOUT
+    }
+
+
+def get_client():
+    """Retorna o httpx.Client compartilhado, criando-o na primeira chamada"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.Client(**_client_options())
+    return _client
+
+
+def get_async_client():
+    """Retorna o httpx.AsyncClient compartilhado da thread; deve ser usado dentro de run()"""
+    client = getattr(_local, 'async_client', None)
+    if client is None or client.is_closed:
+        client = _local.async_client = httpx.AsyncClient(**_client_options())
+    return client
+
+
+def run(coro):
+    """Executa uma coroutine no event loop persistente da thread atual"""
+    loop = getattr(_local, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coro)
+
+
+def close_clients():
+    """Fecha os clientes compartilhados (usado em testes e no encerramento do container)"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+    client = getattr(_local, 'async_client', None)
+    if client is not None:
+        run(client.aclose())
+        _local.async_client = None
+
+
+def build_timeout(value=None):
+    """
+    Monta o httpx.Timeout a partir do parâmetro 'timeout' do corpo da requisição.
+    Aceita um número (segundos) ou um objeto com as chaves connect/read/write/pool.
+    """
+    if value is None:
+        return httpx.Timeout(HTTP_DEFAULT_TIMEOUT)
+    if isinstance(value, dict):
+        return httpx.Timeout(
+            float(value.get('default', HTTP_DEFAULT_TIMEOUT)),
+            **{k: float(value[k]) for k in ('connect', 'read', 'write', 'pool') if k in value}
+        )
+    return httpx.Timeout(float(value))
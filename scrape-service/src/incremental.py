@@ -0,0 +1,198 @@
+"""
+Modo incremental: re-crawl que só devolve páginas novas ou alteradas.
+
+O estado da execução anterior (URL -> ETag, Last-Modified, hash do conteúdo e links da
+página) fica em um arquivo local ou em um objeto S3 (ou compatível) dentro da base
+configurada em INCREMENTAL_STATE_BASE; o chamador só informa o nome do estado. Cada URL
+com estado é buscada com If-None-Match / If-Modified-Since; uma resposta 304, ou 200 com
+o mesmo hash, marca a página como inalterada: a extração não é refeita e os links
+guardados continuam sendo seguidos, para alcançar páginas alteradas mais abaixo. No fim
+da execução, o estado atualizado é gravado de volta.
+
+    INCREMENTAL_STATE_BASE=/tmp/estados          "incremental": "catalogo" -> /tmp/estados/catalogo.json
+    INCREMENTAL_STATE_BASE=s3://bucket/crawl/    "incremental": "catalogo" -> s3://bucket/crawl/catalogo.json
+                                                 (INCREMENTAL_S3_ENDPOINT_URL para serviços compatíveis)
+
+Sem base configurada o modo incremental é recusado: o estado é lido e gravado com as
+permissões da própria Lambda, então o chamador nunca escolhe caminhos ou objetos.
+"""
+import json
+import os
+import re
+import tempfile
+
+from .cache import hash_bytes
+
+# Endpoint de um serviço compatível com S3 (MinIO, R2...); vazio = AWS S3
+INCREMENTAL_S3_ENDPOINT_URL = os.environ.get('INCREMENTAL_S3_ENDPOINT_URL') or None
+# Base dos estados: diretório local ou s3://bucket/prefixo (vazio = modo incremental desligado)
+INCREMENTAL_STATE_BASE = os.environ.get('INCREMENTAL_STATE_BASE', '').strip()
+
+STATE_VERSION = 1
+
+_STATE_NAME = re.compile(r'[A-Za-z0-9_-]+')
+
+
+class FileStateStore:
+    """Estado em arquivo local (escrita atômica)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, data):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+class S3StateStore:
+    """Estado em um objeto S3; client é um cliente boto3 s3 (ou com a mesma interface)"""
+
+    def __init__(self, bucket, key, client=None):
+        self.bucket = bucket
+        self.key = key
+        self._client = client
+
+    @property
+    def client(self):
+        # Criado no primeiro uso (abrir o store só para validar o nome não custa um cliente boto3)
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('s3', endpoint_url=INCREMENTAL_S3_ENDPOINT_URL)
+        return self._client
+
+    def read(self):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.key)['Body'].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def write(self, data):
+        self.client.put_object(Bucket=self.bucket, Key=self.key, Body=data, ContentType='application/json')
+
+
+def open_state_store(name, base=None, suffix='.json'):
+    """
+    Store do estado `name` dentro da base (padrão: INCREMENTAL_STATE_BASE), que é um
+    diretório local (ou file://) ou s3://bucket/prefixo. O nome só aceita letras, números,
+    '_' e '-'; lança ValueError para nomes inválidos ou sem base configurada.
+    """
+    base = INCREMENTAL_STATE_BASE if base is None else base.strip()
+    if not base:
+        raise ValueError("store de estado não configurado no servidor")
+    if not isinstance(name, str) or not _STATE_NAME.fullmatch(name):
+        raise ValueError("nome do estado deve conter apenas letras, números, '_' e '-'")
+    if base.startswith('s3://'):
+        bucket, _, prefix = base[5:].partition('/')
+        if not bucket:
+            raise ValueError("base S3 deve ter o formato s3://bucket/prefixo")
+        if prefix and not prefix.endswith('/'):
+            prefix += '/'
+        return S3StateStore(bucket, prefix + name + suffix)
+    if base.startswith('file://'):
+        base = base[7:]
+    return FileStateStore(os.path.join(base, name + suffix))
+
+
+class IncrementalState:
+    """Estado das URLs entre execuções e o resumo das diferenças desta execução"""
+
+    def __init__(self, store, pages=None):
+        self.store = store
+        self.previous = pages or {}
+        self.pages = dict(self.previous)
+        self.new = []
+        self.changed = []
+        self.unchanged = 0
+        # URLs da execução anterior buscadas nesta execução
+        self.seen = set()
+
+    @classmethod
+    def load(cls, store):
+        data = store.read()
+        pages = json.loads(data).get('pages', {}) if data else {}
+        return cls(store, pages)
+
+    def conditional_headers(self, url):
+        """Headers condicionais a partir dos validadores guardados para a URL"""
+        entry = self.previous.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def is_unchanged(self, url, response):
+        """True (e contabiliza) se a resposta é 304 ou tem o mesmo hash da execução anterior"""
+        entry = self.previous.get(url)
+        if entry is None:
+            return False
+        self.seen.add(url)
+        if response.status_code == 304 or (response.status_code == 200 and
+                                           hash_bytes(response.content) == entry.get('hash')):
+            self.unchanged += 1
+            # Validadores novos (ex.: ETag trocado com o mesmo conteúdo) valem para a próxima execução
+            if response.status_code == 200:
+                self.pages[url] = {**entry, **self._validators(response)}
+            return True
+        return False
+
+    def links(self, url):
+        """Links guardados da página (para seguir a recursão sem reprocessá-la)"""
+        return self.previous.get(url, {}).get('links')
+
+    @staticmethod
+    def _validators(response):
+        return {'etag': response.headers.get('etag'), 'last_modified': response.headers.get('last-modified')}
+
+    def record(self, url, response, links=None):
+        """Registra uma página nova ou alterada (só respostas 200 completas)"""
+        if response.status_code != 200 or response.extensions.get('download', {}).get('truncated'):
+            return
+        if url in self.previous:
+            self.seen.add(url)
+            self.changed.append(url)
+        else:
+            self.new.append(url)
+        self.pages[url] = {**self._validators(response), 'hash': hash_bytes(response.content),
+                           'links': list(links) if links else None}
+
+    def summary(self):
+        """Resumo das diferenças em relação à execução anterior"""
+        return {
+            'new': self.new,
+            'changed': self.changed,
+            'unchanged': self.unchanged,
+            # URLs da execução anterior que não foram alcançadas nesta (removidas ou fora dos limites)
+            'not_visited': len(self.previous) - len(self.seen),
+        }
+
+    def save(self):
+        data = {'version': STATE_VERSION, 'pages': self.pages}
+        self.store.write(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+def prune_unchanged(tree):
+    """Remove da árvore de links as páginas inalteradas sem descendentes novos ou alterados"""
+    if not isinstance(tree, dict):
+        return tree
+    for url in list(tree):
+        node = tree[url]
+        if isinstance(node, dict) and isinstance(node.get('links'), dict):
+            prune_unchanged(node['links'])
+        if isinstance(node, dict) and node.get('status') == 'unchanged' and not node.get('links'):
+            del tree[url]
+    return tree
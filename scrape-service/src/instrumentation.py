@@ -0,0 +1,181 @@
+"""
+Instrumentação por etapa (tempos, bytes, páginas, cache e memória) de cada requisição.
+
+O Trace da requisição fica em uma ContextVar, então as etapas de process_html,
+process_document, do crawler e do download são medidas sem passar o trace como
+parâmetro (as tasks do asyncio herdam o contexto). Sem instrumentação ligada, o trace
+corrente é NULL_TRACE, cujas operações não fazem nada.
+
+    with stage('extract'):
+        ...
+    count('bytes_downloaded', len(content))
+
+O resultado é devolvido no bloco "debug_timings" (parâmetro debug_timings) e/ou escrito
+no log como uma linha JSON no formato EMF (Embedded Metric Format) do CloudWatch, quando
+INSTRUMENTATION_LOGS está ligado.
+"""
+import contextvars
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+# Escreve as métricas de cada requisição no log (EMF)
+INSTRUMENTATION_LOGS = os.environ.get('INSTRUMENTATION_LOGS', 'false').lower() in ('1', 'true', 'yes')
+# Namespace das métricas no CloudWatch
+INSTRUMENTATION_NAMESPACE = os.environ.get('INSTRUMENTATION_NAMESPACE', 'ScrapeService')
+
+# Eventos do httpcore (extensão "trace" do httpx) medidos como etapas
+HTTP_TRACE_STAGES = {
+    'connection.connect_tcp': 'connect',  # resolução DNS + conexão TCP
+    'connection.start_tls': 'tls',
+    'http11.receive_response_headers': 'wait_headers',  # tempo até o primeiro byte
+    'http2.receive_response_headers': 'wait_headers',
+}
+
+COUNTER_UNITS = {'bytes_downloaded': 'Bytes'}
+
+
+class NullTrace:
+    """Trace desligado: todas as operações são no-ops"""
+    enabled = False
+
+    def stage(self, name):
+        return nullcontext()
+
+    def count(self, name, value=1):
+        pass
+
+    def http_trace(self, asynchronous=False):
+        return None
+
+    def report(self):
+        return None
+
+
+NULL_TRACE = NullTrace()
+
+_current = contextvars.ContextVar('trace', default=NULL_TRACE)
+
+
+class Trace:
+    """Tempos acumulados por etapa e contadores de uma requisição"""
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+
+    def add_time(self, name, seconds):
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def http_trace(self, asynchronous=False):
+        """Callback para a extensão "trace" do httpx (DNS/TCP, TLS e espera pelos headers)"""
+        started = {}
+
+        def on_event(event, info):
+            prefix, _, phase = event.rpartition('.')
+            name = HTTP_TRACE_STAGES.get(prefix)
+            if name is None:
+                return
+            if phase == 'started':
+                started[prefix] = time.perf_counter()
+            elif prefix in started:
+                self.add_time(name, time.perf_counter() - started.pop(prefix))
+
+        if not asynchronous:
+            return on_event
+
+        async def on_event_async(event, info):
+            on_event(event, info)
+        return on_event_async
+
+    def report(self):
+        """
+        Resumo da requisição. Etapas executadas em paralelo (recursão) têm os tempos somados,
+        por isso podem passar de total_ms.
+        """
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'stages': {name: {'ms': round(seconds * 1000, 2), 'count': calls}
+                       for name, (seconds, calls) in self.stages.items()},
+            'counters': dict(self.counters),
+            'peak_memory_mb': round(peak_memory_mb(), 1),
+        }
+
+
+def peak_memory_mb():
+    """Pico de memória (RSS) do processo"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def current():
+    return _current.get()
+
+
+def stage(name):
+    """Context manager que mede a etapa no trace corrente"""
+    return _current.get().stage(name)
+
+
+def count(name, value=1):
+    _current.get().count(name, value)
+
+
+def start(enabled):
+    """Ativa um Trace (ou NULL_TRACE) no contexto atual; retorna (trace, token para finish)"""
+    trace = Trace() if enabled else NULL_TRACE
+    return trace, _current.set(trace)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def emf_record(report, dimensions, properties=None):
+    """Monta a linha de log EMF com as métricas do relatório"""
+    metrics = {'total_ms': (report['total_ms'], 'Milliseconds'),
+               'peak_memory_mb': (report['peak_memory_mb'], 'Megabytes')}
+    for name, values in report['stages'].items():
+        metrics[f'{name}_ms'] = (values['ms'], 'Milliseconds')
+    for name, value in report['counters'].items():
+        metrics[name] = (value, COUNTER_UNITS.get(name, 'Count'))
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': INSTRUMENTATION_NAMESPACE,
+                'Dimensions': [list(dimensions)],
+                'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in metrics.items()],
+            }],
+        },
+        **dimensions,
+        **(properties or {}),
+    }
+    record.update({name: value for name, (value, _) in metrics.items()})
+    return record
+
+
+def log_emf(report, dimensions, properties=None):
+    """Escreve a linha EMF no stdout (capturado pelo CloudWatch Logs)"""
+    print(json.dumps(emf_record(report, dimensions, properties), default=str))
@@ -0,0 +1,221 @@
+"""
+Regras de filtragem dos links seguidos na recursão.
+
+As regras são compiladas uma única vez por requisição (e as expressões compiladas são
+reaproveitadas entre requisições do mesmo container). Cada link é avaliado por um único
+LinkRules.match: um urlsplit, uma busca na alternância das regex de exclusão, uma na das
+regex de inclusão e consultas em conjuntos para domínios e extensões.
+
+Um link é seguido quando:
+    - não casa com nenhuma regra de exclusão (exclude, exclude_path_prefixes, exclude_extensions)
+    - está no escopo de domínios (domains / same_domain; subdomínios incluídos por padrão)
+    - casa com ao menos uma regra de cada grupo de inclusão informado
+      (include, path_prefixes, extensions)
+
+O parâmetro antigo link_exp_filter equivale a uma regra include.
+"""
+import os
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# Expressões compiladas mantidas em cache no container
+LINK_RULES_CACHE_SIZE = int(os.environ.get('LINK_RULES_CACHE_SIZE', 128))
+
+RULE_LISTS = ('include', 'exclude', 'path_prefixes', 'exclude_path_prefixes', 'extensions',
+              'exclude_extensions', 'domains')
+
+
+@lru_cache(maxsize=LINK_RULES_CACHE_SIZE)
+def compile_alternation(patterns, prefix=False):
+    """
+    Compila as expressões em uma única regex com um grupo nomeado por regra (r0, r1...),
+    de modo que match.lastgroup identifica a regra. Com prefix=True, os padrões são
+    prefixos literais ancorados no início. Expressões que não podem ser combinadas
+    (ex.: referências numéricas a grupos) são compiladas separadamente.
+    """
+    if prefix:
+        return [re.compile('|'.join(f'(?P<r{i}>{re.escape(p)})' for i, p in enumerate(patterns)))]
+    compiled = [re.compile(pattern) for pattern in patterns]
+    if any(regex.groups and re.search(r'\\\d|\(\?P=', regex.pattern) for regex in compiled):
+        return compiled
+    try:
+        return [re.compile('|'.join(f'(?P<r{i}>{p})' for i, p in enumerate(patterns)))]
+    except re.error:
+        return compiled
+
+
+def _search(matchers, text, prefix=False):
+    """Índice da primeira regra que casa com o texto (ou None)"""
+    if len(matchers) == 1 and matchers[0].groupindex.get('r0') == 1:
+        match = matchers[0].match(text) if prefix else matchers[0].search(text)
+        return int(match.lastgroup[1:]) if match else None
+    for i, regex in enumerate(matchers):
+        if regex.search(text):
+            return i
+    return None
+
+
+def _as_list(value, name):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, (list, tuple)):
+        raise ValueError(f"{name} deve ser uma lista")
+    return [str(item) for item in value if str(item)]
+
+
+def _extension_of(path):
+    name = path.rsplit('/', 1)[-1]
+    return name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+
+
+class LinkRules:
+    """Regras compiladas de uma requisição, com contadores de casamento por regra"""
+
+    def __init__(self, include=None, exclude=None, path_prefixes=None, exclude_path_prefixes=None,
+                 extensions=None, exclude_extensions=None, domains=None, same_domain=False, subdomains=True):
+        self.include = _as_list(include, 'include')
+        self.exclude = _as_list(exclude, 'exclude')
+        self.path_prefixes = _as_list(path_prefixes, 'path_prefixes')
+        self.exclude_path_prefixes = _as_list(exclude_path_prefixes, 'exclude_path_prefixes')
+        self.extensions = [e.lower().lstrip('.') for e in _as_list(extensions, 'extensions')]
+        self.exclude_extensions = [e.lower().lstrip('.') for e in _as_list(exclude_extensions, 'exclude_extensions')]
+        self.domains = [d.lower().lstrip('.') for d in _as_list(domains, 'domains')]
+        self.same_domain = bool(same_domain)
+        self.subdomains = bool(subdomains)
+        try:
+            self._include = compile_alternation(tuple(self.include)) if self.include else None
+            self._exclude = compile_alternation(tuple(self.exclude)) if self.exclude else None
+        except re.error as e:
+            raise ValueError(f"expressão regular inválida: {e}")
+        self._path_prefixes = (compile_alternation(tuple(self.path_prefixes), prefix=True)
+                               if self.path_prefixes else None)
+        self._exclude_path_prefixes = (compile_alternation(tuple(self.exclude_path_prefixes), prefix=True)
+                                       if self.exclude_path_prefixes else None)
+        self._extensions = {e: i for i, e in enumerate(self.extensions)}
+        self._exclude_extensions = {e: i for i, e in enumerate(self.exclude_extensions)}
+        self._domains = set(self.domains)
+        self.needs_parts = bool(self.path_prefixes or self.exclude_path_prefixes or self.extensions
+                                or self.exclude_extensions or self.domains or self.same_domain)
+        self.counts = {}
+        self.accepted = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_params(cls, body):
+        """
+        Regras a partir de "link_rules" (objeto) e de "link_exp_filter" (regex de inclusão).
+        Retorna None se nenhuma regra foi informada; lança ValueError se forem inválidas.
+        """
+        params = body.get('link_rules') or {}
+        if not isinstance(params, dict):
+            raise ValueError("link_rules deve ser um objeto")
+        unknown = set(params) - set(RULE_LISTS) - {'same_domain', 'subdomains'}
+        if unknown:
+            raise ValueError(f"regras desconhecidas: {', '.join(sorted(unknown))}")
+        include = _as_list(params.get('include'), 'include')
+        if body.get('link_exp_filter'):
+            include.insert(0, body['link_exp_filter'])
+        if not include and not params:
+            return None
+        return cls(include=include, **{k: v for k, v in params.items() if k != 'include'})
+
+    def scoped_to(self, url):
+        """Com same_domain, inclui o host da URL (página raiz) nos domínios permitidos"""
+        if self.same_domain:
+            host = (urlsplit(url).hostname or '').lower()
+            if self.subdomains and host.startswith('www.'):
+                host = host[4:]
+            if host:
+                self._domains.add(host)
+                self.domains.append(host)
+            self.same_domain = False
+        return self
+
+    def _count(self, kind, index):
+        key = (kind, index)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _in_scope(self, host):
+        if host in self._domains:
+            return True
+        if self.subdomains:
+            parts = host.split('.')
+            return any('.'.join(parts[i:]) in self._domains for i in range(1, len(parts) - 1))
+        return False
+
+    def match(self, url):
+        """True se o link deve ser seguido; atualiza os contadores da regra que decidiu"""
+        accepted = self._evaluate(url)
+        if accepted:
+            self.accepted += 1
+        else:
+            self.rejected += 1
+        return accepted
+
+    def _evaluate(self, url):
+        path = host = None
+        if self.needs_parts:
+            parts = urlsplit(url)
+            path, host = parts.path or '/', (parts.hostname or '').lower()
+        if self._exclude is not None:
+            index = _search(self._exclude, url)
+            if index is not None:
+                self._count('exclude', index)
+                return False
+        if self._exclude_path_prefixes is not None:
+            index = _search(self._exclude_path_prefixes, path, prefix=True)
+            if index is not None:
+                self._count('exclude_path_prefixes', index)
+                return False
+        if self._exclude_extensions:
+            index = self._exclude_extensions.get(_extension_of(path))
+            if index is not None:
+                self._count('exclude_extensions', index)
+                return False
+        if self._domains and not self._in_scope(host):
+            self._count('domains', None)
+            return False
+        if self._include is not None:
+            index = _search(self._include, url)
+            if index is None:
+                return False
+            self._count('include', index)
+        if self._path_prefixes is not None:
+            index = _search(self._path_prefixes, path, prefix=True)
+            if index is None:
+                return False
+            self._count('path_prefixes', index)
+        if self._extensions:
+            index = self._extensions.get(_extension_of(path))
+            if index is None:
+                return False
+            self._count('extensions', index)
+        return True
+
+    def filter(self, links):
+        """Links que passam pelas regras, na ordem original"""
+        return [link for link in links if self.match(link)]
+
+    def report(self):
+        """Contadores por regra, para a resposta"""
+        rules = []
+        for kind in RULE_LISTS:
+            for index, pattern in enumerate(getattr(self, kind)):
+                if kind == 'domains':
+                    # Domínios são avaliados em conjunto: conta os links fora do escopo
+                    if index == 0:
+                        rules.append({'rule': 'domains', 'pattern': list(self.domains),
+                                      'matches': self.counts.get(('domains', None), 0)})
+                    continue
+                rules.append({'rule': kind, 'pattern': pattern, 'matches': self.counts.get((kind, index), 0)})
+        return {'accepted': self.accepted, 'rejected': self.rejected, 'rules': rules}
+
+
+def compile_link_filter(link_filter):
+    """Aceita LinkRules, uma regex (link_exp_filter) ou None"""
+    if link_filter is None or isinstance(link_filter, LinkRules):
+        return link_filter
+    return LinkRules(include=[link_filter])
@@ -0,0 +1,114 @@
+"""
+Avaliação dos filtros JSONPath (metadata_filters) sobre o nextData e o schema.org.
+
+O parse de uma expressão pelo jsonpath_ng é caro (gramática PLY), então as expressões
+compiladas ficam em um LRU do processo, reaproveitado entre invocações "quentes".
+Os filtros de uma requisição são avaliados juntos: cada expressão é decomposta em
+passos (campo, índice, wildcard...) e os passos são organizados em uma árvore de
+prefixos, de modo que um prefixo comum (ex.: $.props.pageProps) é percorrido uma única
+vez para todas as expressões que o compartilham. O jsonpath_ng só é importado quando
+há filtros a aplicar.
+"""
+import os
+from functools import lru_cache
+
+# Número de expressões (e de conjuntos de filtros) compiladas mantidas em memória
+METADATA_FILTER_CACHE_SIZE = int(os.environ.get('METADATA_FILTER_CACHE_SIZE', 256))
+
+
+@lru_cache(maxsize=METADATA_FILTER_CACHE_SIZE)
+def compile_query(query):
+    """Compila a expressão JSONPath (com cache); lança exceção se a expressão for inválida"""
+    from jsonpath_ng import parse
+    return parse(query)
+
+
+def _steps(expr):
+    """Decompõe uma cadeia de Child(left, right) na lista de passos, da raiz para as folhas"""
+    from jsonpath_ng import Child
+    if isinstance(expr, Child):
+        return _steps(expr.left) + _steps(expr.right)
+    return [expr]
+
+
+class _Node:
+    __slots__ = ('step', 'children', 'queries')
+
+    def __init__(self, step=None):
+        self.step = step
+        self.children = {}
+        # Expressões que terminam neste nó
+        self.queries = []
+
+
+class FilterPlan:
+    """Conjunto de filtros compilados em uma árvore de prefixos"""
+
+    def __init__(self, queries):
+        self.queries = list(queries)
+        self.errors = {}
+        self.root = _Node()
+        for query in self.queries:
+            try:
+                steps = _steps(compile_query(query))
+            except Exception as e:
+                self.errors[query] = f"Error: {str(e)}"
+                continue
+            node = self.root
+            for step in steps:
+                key = repr(step)
+                if key not in node.children:
+                    node.children[key] = _Node(step)
+                node = node.children[key]
+            node.queries.append(query)
+
+    def evaluate(self, data):
+        """Retorna {query: [valores encontrados]} (ou "Error: ..." para expressões inválidas)"""
+        from jsonpath_ng import DatumInContext
+
+        results = dict(self.errors)
+        self._visit(self.root, [DatumInContext.wrap(data)], results)
+        return {query: results[query] for query in self.queries}
+
+    def _visit(self, node, matches, results):
+        for query in node.queries:
+            results[query] = [match.value for match in matches]
+        for child in node.children.values():
+            try:
+                child_matches = [found for match in matches for found in child.step.find(match)]
+            except Exception as e:
+                for query in _queries_below(child):
+                    results[query] = f"Error: {str(e)}"
+                continue
+            self._visit(child, child_matches, results)
+
+
+def _queries_below(node):
+    queries = list(node.queries)
+    for child in node.children.values():
+        queries.extend(_queries_below(child))
+    return queries
+
+
+@lru_cache(maxsize=METADATA_FILTER_CACHE_SIZE)
+def compile_filters(queries):
+    """FilterPlan para a tupla de expressões (com cache, já que os clientes repetem os mesmos filtros)"""
+    return FilterPlan(queries)
+
+
+def apply_filters(data, filters):
+    """
+    Aplica a lista de expressões JSONPath a data; retorna {query: valores}. Itens que não são
+    strings (números, objetos...) não chegam ao cache de compilação e recebem "Error: ...".
+    """
+    queries = tuple(query for query in filters if isinstance(query, str))
+    results = compile_filters(queries).evaluate(data)
+    if len(queries) == len(filters):
+        return results
+    filtered = {}
+    for query in filters:
+        if isinstance(query, str):
+            filtered[query] = results[query]
+        else:
+            filtered[str(query)] = "Error: a expressão JSONPath deve ser uma string"
+    return filtered
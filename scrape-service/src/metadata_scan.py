@@ -0,0 +1,114 @@
+"""
+Extração só de metadados (format "metadata") sem montar a árvore do documento.
+
+Um scanner percorre o HTML bruto pulando de tag em tag com expressões regulares: só
+<title>, os scripts application/ld+json e o script __NEXT_DATA__ são lidos; comentários
+e o conteúdo dos demais scripts são ignorados, como faria o parser HTML. Os blocos JSON
+são decodificados com orjson quando instalado (com fallback para o json da biblioteca
+padrão nos casos que o orjson rejeita, como NaN e Infinity).
+
+O __NEXT_DATA__ (muitas vezes com vários MB) só é decodificado quando pedido, em uma única
+passada do orjson: pular os campos que os filtros não usam exigiria percorrer o texto em
+Python, o que sai mais caro que decodificar o documento inteiro em C.
+"""
+import html
+import json
+import re
+
+from .extraction import parse_schema
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+# Próxima construção relevante: comentário, <title> ou <script>
+_TOKEN = re.compile(r'<!--|<(title|script)(?=[\s/>])([^>]*)>', re.IGNORECASE)
+_COMMENT_END = re.compile(r'--!?>')
+_SCRIPT_END = re.compile(r'</script\s*>', re.IGNORECASE)
+_TITLE_END = re.compile(r'</title\s*>', re.IGNORECASE)
+_ATTRIBUTE = re.compile(r'''([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?''')
+
+
+def loads(content):
+    """json.loads rápido: orjson quando disponível, com fallback para a biblioteca padrão"""
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(content)
+
+
+def _attributes(raw):
+    attributes = {}
+    for match in _ATTRIBUTE.finditer(raw):
+        name = match.group(1).lower()
+        if name not in attributes:
+            value = next((group for group in match.groups()[1:] if group is not None), '')
+            attributes[name] = html.unescape(value)
+    return attributes
+
+
+def iter_tags(html_content):
+    """Gera (nome, atributos, conteúdo) das tags <title> e <script>, na ordem do documento"""
+    pos = 0
+    while True:
+        match = _TOKEN.search(html_content, pos)
+        if match is None:
+            return
+        if match.group(0) == '<!--':
+            end = _COMMENT_END.search(html_content, match.end())
+            if end is None:
+                return
+            pos = end.end()
+            continue
+        name = match.group(1).lower()
+        end = (_SCRIPT_END if name == 'script' else _TITLE_END).search(html_content, match.end())
+        content_end = end.start() if end else len(html_content)
+        yield name, _attributes(match.group(2)), html_content[match.end():content_end]
+        if end is None:
+            return
+        pos = end.end()
+
+
+def decode_next_data(content):
+    """Decodifica o __NEXT_DATA__ ({} se vazio ou inválido)"""
+    if not content:
+        return {}
+    try:
+        return loads(content)
+    except ValueError:
+        return {}
+
+
+def scan_metadata(html_content, next_data=True):
+    """
+    Título e metadados da página sem parse do DOM, no formato de extract_page
+    (resumo, imagens e links voltam como None).
+    next_data: se False, o __NEXT_DATA__ não é decodificado (nextData = {})
+    """
+    title = None
+    ld_json_scripts = []
+    next_data_content = None
+    for name, attributes, content in iter_tags(html_content):
+        if name == 'title':
+            if title is None:
+                title = html.unescape(content).strip()
+            continue
+        script_type = attributes.get('type')
+        if script_type == 'application/ld+json':
+            ld_json_scripts.append(content.strip())
+        elif (script_type == 'application/json' and attributes.get('id') == '__NEXT_DATA__'
+              and next_data_content is None):
+            next_data_content = content
+    return {
+        "title": title or "Sem Título",
+        "resumo_html": None,
+        "images": None,
+        "links": None,
+        "metadata": {
+            "schema": parse_schema(ld_json_scripts, loads),
+            "nextData": decode_next_data(next_data_content) if next_data else {}
+        }
+    }
@@ -0,0 +1,172 @@
+"""
+Detecção de páginas quase duplicadas na recursão (SimHash).
+
+Muitos sites servem o mesmo conteúdo de template em URLs diferentes: paginação, ordenações,
+versões para impressão. Cada página HTML buscada recebe um SimHash de 64 bits calculado
+sobre os trigramas de palavras do texto completo da página (não do resumo cortado em
+maxsize, que em sites reais é quase só o menu e o cabeçalho em comum); uma página cuja
+similaridade com uma página já vista (cosseno estimado pela distância de Hamming) atinge
+o limiar vira uma referência a ela ({"status": "near_duplicate", "duplicate_of": url}) e
+seus links não são seguidos.
+
+As duplicatas são contadas por padrão de URL (host + caminho com números trocados por {n}
++ nomes dos parâmetros da query). Quando um padrão acumula pattern_limit duplicatas, e
+mais duplicatas que páginas únicas, os próximos links com esse padrão não são buscados
+({"status": "near_duplicate_pattern"}), o que devolve o orçamento do crawl para conteúdo único.
+"""
+import hashlib
+import html
+import math
+import os
+import re
+from urllib.parse import parse_qsl, urlsplit
+
+# Liga a detecção em todos os crawls (padrão: desligada; cada requisição pode ligá-la com "near_duplicates": true)
+NEAR_DUPLICATES_ENABLED = os.environ.get('NEAR_DUPLICATES_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# Similaridade mínima (0 a 1) para considerar duas páginas quase duplicadas
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.9))
+# Duplicatas de um mesmo padrão de URL a partir das quais o padrão deixa de ser seguido (0 = nunca)
+NEAR_DUPLICATE_PATTERN_LIMIT = int(os.environ.get('NEAR_DUPLICATE_PATTERN_LIMIT', 3))
+# Páginas com menos palavras não recebem fingerprint (textos curtos demais para comparar)
+NEAR_DUPLICATE_MIN_WORDS = int(os.environ.get('NEAR_DUPLICATE_MIN_WORDS', 15))
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+
+_TAG = re.compile(r'<[^>]+>')
+_WORD = re.compile(r'\w+')
+_NUMBER = re.compile(r'\d+')
+
+
+def words(text):
+    """Palavras (em minúsculas) do texto extraído, sem as tags HTML"""
+    return _WORD.findall(html.unescape(_TAG.sub(' ', text or '')).lower())
+
+
+def simhash(tokens):
+    """SimHash de 64 bits dos trigramas de `tokens`"""
+    shingles = {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+              for shingle in shingles]
+    half = len(hashes) / 2
+    fingerprint = 0
+    for bit in range(FINGERPRINT_BITS):
+        if sum((value >> bit) & 1 for value in hashes) > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def signature(text):
+    """Assinatura do texto para NearDuplicateDetector.check: [SimHash em hexadecimal, palavras]"""
+    tokens = words(text)
+    return [f'{simhash(tokens):016x}', len(tokens)] if tokens else None
+
+
+def similarity(first, second):
+    """Similaridade de cosseno estimada pela distância de Hamming entre dois SimHashes"""
+    return math.cos(math.pi * (first ^ second).bit_count() / FINGERPRINT_BITS)
+
+
+def url_pattern(url):
+    """Padrão da URL: host + caminho com números trocados por {n} + nomes dos parâmetros"""
+    parts = urlsplit(url)
+    names = sorted({name for name, _ in parse_qsl(parts.query, keep_blank_values=True)})
+    pattern = parts.netloc.lower() + _NUMBER.sub('{n}', parts.path or '/')
+    return f"{pattern}?{'&'.join(names)}" if names else pattern
+
+
+class NearDuplicateDetector:
+    """Fingerprints das páginas de um crawl e contadores de duplicatas por padrão de URL"""
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD, pattern_limit=NEAR_DUPLICATE_PATTERN_LIMIT,
+                 min_words=NEAR_DUPLICATE_MIN_WORDS):
+        threshold = float(threshold)
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold deve estar entre 0 e 1")
+        self.threshold = threshold
+        self.pattern_limit = int(pattern_limit)
+        self.min_words = int(min_words)
+        # (fingerprint, URL) das páginas únicas, na ordem em que foram vistas
+        self.fingerprints = []
+        # padrão -> [páginas únicas, duplicatas]
+        self.patterns = {}
+        self.duplicates = 0
+        self.blocked_links = 0
+
+    @classmethod
+    def from_params(cls, body):
+        """
+        Detector a partir do parâmetro "near_duplicates" (true, limiar de similaridade ou
+        objeto com threshold, pattern_limit e min_words); None se desligado. Lança ValueError.
+        """
+        params = body.get('near_duplicates', NEAR_DUPLICATES_ENABLED)
+        if params is None or params is False:
+            return None
+        if params is True:
+            return cls()
+        if isinstance(params, (int, float)):
+            return cls(threshold=params)
+        if not isinstance(params, dict):
+            raise ValueError("near_duplicates deve ser booleano, número ou objeto")
+        return cls(
+            threshold=params.get('threshold', NEAR_DUPLICATE_THRESHOLD),
+            pattern_limit=params.get('pattern_limit', NEAR_DUPLICATE_PATTERN_LIMIT),
+            min_words=params.get('min_words', NEAR_DUPLICATE_MIN_WORDS),
+        )
+
+    def check(self, url, page_signature):
+        """
+        Registra a página pela assinatura do seu texto (ver signature); se ela é quase
+        duplicada de uma página já vista, retorna (URL dessa página, similaridade), senão None.
+        """
+        if page_signature is None or page_signature[1] < self.min_words:
+            return None
+        fingerprint = int(page_signature[0], 16)
+        counts = self.patterns.setdefault(url_pattern(url), [0, 0])
+        for seen, canonical in self.fingerprints:
+            score = similarity(fingerprint, seen)
+            if score >= self.threshold:
+                counts[1] += 1
+                self.duplicates += 1
+                return canonical, round(score, 3)
+        counts[0] += 1
+        self.fingerprints.append((fingerprint, url))
+        return None
+
+    def blocked(self, url):
+        """True (e contabiliza) se o padrão da URL só tem produzido duplicatas"""
+        if self.pattern_limit <= 0:
+            return False
+        unique, duplicates = self.patterns.get(url_pattern(url), (0, 0))
+        if duplicates >= self.pattern_limit and duplicates > unique:
+            self.blocked_links += 1
+            return True
+        return False
+
+    def report(self):
+        """Resumo para a resposta"""
+        return {
+            'duplicates': self.duplicates,
+            'blocked_links': self.blocked_links,
+            'blocked_patterns': sorted(pattern for pattern, (unique, duplicates) in self.patterns.items()
+                                       if self.pattern_limit > 0 and duplicates >= self.pattern_limit
+                                       and duplicates > unique),
+        }
+
+    def dump(self):
+        """Estado serializável em JSON (checkpoint de um crawl interrompido)"""
+        return {
+            'fingerprints': [[f'{fingerprint:016x}', url] for fingerprint, url in self.fingerprints],
+            'patterns': self.patterns,
+            'duplicates': self.duplicates,
+            'blocked_links': self.blocked_links,
+        }
+
+    def load(self, data):
+        """Restaura o estado de dump()"""
+        if not data:
+            return
+        self.fingerprints = [(int(fingerprint, 16), url) for fingerprint, url in data['fingerprints']]
+        self.patterns = {pattern: list(counts) for pattern, counts in data['patterns'].items()}
+        self.duplicates = data['duplicates']
+        self.blocked_links = data['blocked_links']
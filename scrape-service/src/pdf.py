@@ -0,0 +1,156 @@
+"""
+Extração de texto de PDFs com intervalo de páginas e limite de caracteres.
+
+As páginas são lidas sob demanda (PyPDF2 só interpreta a página quando ela é acessada)
+e a extração para assim que o limite de caracteres é atingido. Quando o documento
+precisa ser extraído por inteiro, as páginas são divididas entre os processos de um
+pool (cada processo abre o PDF e extrai o seu bloco de páginas). O texto extraído fica
+em um LRU em memória, indexado pelo hash do documento, junto com as estatísticas de
+cada página (tempo e tamanho).
+"""
+import hashlib
+import io
+import os
+import time
+
+from .cache import MemoryStore
+
+# Número de processos usados na extração paralela (cada um abre sua cópia do documento)
+PDF_MAX_WORKERS = int(os.environ.get('PDF_MAX_WORKERS', min(os.cpu_count() or 1, 4)))
+# Documentos com menos páginas que isso são extraídos no próprio processo
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 8))
+# Número de textos extraídos mantidos em memória
+PDF_TEXT_CACHE_ENTRIES = int(os.environ.get('PDF_TEXT_CACHE_ENTRIES', 32))
+
+_executor = None
+# O pool não pôde ser criado (ou quebrou) neste container: extração sequencial daqui em diante
+_executor_failed = False
+_text_cache = MemoryStore(PDF_TEXT_CACHE_ENTRIES)
+
+
+def get_executor():
+    """
+    Pool de processos criado uma vez por container. Retorna None se o ambiente não suportar
+    multiprocessing com filas (ex.: Lambda sem /dev/shm); nesse caso a extração é sequencial
+    e a criação não é tentada de novo.
+    """
+    global _executor, _executor_failed
+    if _executor is None and not _executor_failed and PDF_MAX_WORKERS > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            _executor = ProcessPoolExecutor(max_workers=PDF_MAX_WORKERS)
+        except (OSError, NotImplementedError):
+            _executor_failed = True
+    return _executor
+
+
+def _disable_executor():
+    """Descarta um pool que quebrou (ex.: processo morto por falta de memória)"""
+    global _executor, _executor_failed
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _executor_failed = True
+
+
+def parse_page_range(value, page_count):
+    """
+    Converte o intervalo de páginas (1-based) em índices 0-based.
+    Aceita "1-5,8", [1, 5] (início e fim) ou um número; None = todas as páginas.
+    Lança ValueError para valores inválidos.
+    """
+    if value is None:
+        return list(range(page_count))
+    if isinstance(value, int):
+        value = str(value)
+    if isinstance(value, (list, tuple)):
+        if len(value) != 2:
+            raise ValueError("pdf_pages deve ser [início, fim]")
+        value = f"{int(value[0])}-{int(value[1])}"
+    indices = []
+    for part in str(value).split(','):
+        start, _, end = part.strip().partition('-')
+        start = int(start)
+        end = int(end) if end else start
+        if start < 1 or end < start:
+            raise ValueError(f"Intervalo de páginas inválido: {part.strip()}")
+        for index in range(start - 1, min(end, page_count)):
+            if index not in indices:
+                indices.append(index)
+    return indices
+
+
+def _extract_pages(content, indices):
+    """Extrai as páginas indicadas; executado no pool de processos"""
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(content))
+    results = []
+    for index in indices:
+        started = time.perf_counter()
+        text = reader.pages[index].extract_text() or ''
+        results.append((index, text, time.perf_counter() - started))
+    return results
+
+
+def _extract_parallel(content, indices, executor):
+    chunk_size = -(-len(indices) // PDF_MAX_WORKERS)
+    chunks = [indices[i:i + chunk_size] for i in range(0, len(indices), chunk_size)]
+    results = []
+    for chunk_results in executor.map(_extract_pages, [content] * len(chunks), chunks):
+        results.extend(chunk_results)
+    return results
+
+
+def extract_pdf(content, pages=None, max_chars=None):
+    """
+    Extrai o texto do PDF.
+
+    pages: intervalo de páginas (ver parse_page_range); None = todas
+    max_chars: limite de caracteres; a extração para ao atingi-lo (None = sem limite)
+
+    Retorna {"text", "page_count", "truncated", "pages": [{"page", "chars", "seconds"}]}.
+    """
+    key = f"{hashlib.sha256(content).hexdigest()}:{pages}:{max_chars}"
+    cached = _text_cache.get(key)
+    if cached is not None:
+        return cached
+
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(io.BytesIO(content))
+    page_count = len(reader.pages)
+    indices = parse_page_range(pages, page_count)
+
+    executor = get_executor() if max_chars is None and len(indices) >= PDF_PARALLEL_MIN_PAGES else None
+    results = None
+    if executor is not None:
+        from concurrent.futures.process import BrokenProcessPool
+        try:
+            results = _extract_parallel(content, indices, executor)
+        except (BrokenProcessPool, OSError):
+            _disable_executor()
+    if results is None:
+        # Leitura página a página, parando quando houver texto suficiente
+        results = []
+        size = 0
+        for index in indices:
+            started = time.perf_counter()
+            text = reader.pages[index].extract_text() or ''
+            results.append((index, text, time.perf_counter() - started))
+            size += len(text) + 2
+            if max_chars is not None and size >= max_chars:
+                break
+
+    text = "\n\n".join(page_text for _, page_text, _ in results)
+    truncated = len(results) < len(indices) or (max_chars is not None and len(text) > max_chars)
+    if max_chars is not None:
+        text = text[:max_chars]
+    result = {
+        "text": text,
+        "page_count": page_count,
+        "truncated": truncated,
+        "pages": [{"page": index + 1, "chars": len(page_text), "seconds": round(seconds, 4)}
+                  for index, page_text, seconds in results]
+    }
+    _text_cache.set(key, result)
+    return result
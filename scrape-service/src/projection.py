@@ -0,0 +1,95 @@
+"""
+Projeção da resposta: cada campo é calculado sob demanda por um produtor próprio.
+
+O formato escolhe os campos preenchidos (ex.: "metadata" não precisa de markdown, links
+nem imagens) e o parâmetro "fields" restringe a resposta a uma lista de campos. Só os
+produtores dos campos selecionados rodam, e a extração da página coleta apenas as partes
+de que eles dependem, de modo que conversões e percursos não pedidos nunca acontecem.
+
+Sem "fields", a resposta mantém todas as chaves (as não selecionadas com null); com
+"fields", só as chaves pedidas aparecem.
+"""
+
+# Campos da resposta, na ordem em que aparecem
+FIELDS = ('title', 'images', 'resumo_html', 'final_url', 'metadata', 'nextData', 'schemaData',
+          'markdown', 'links', 'headers', 'truncated')
+
+# Campos preenchidos por formato (outros formatos, como text, usam DEFAULT_FIELDS)
+DEFAULT_FIELDS = frozenset(['title', 'final_url', 'truncated'])
+FORMAT_FIELDS = {
+    'metadata': DEFAULT_FIELDS | {'metadata', 'nextData', 'schemaData'},
+    'markdown': DEFAULT_FIELDS | {'images', 'markdown', 'links'},
+    'html': DEFAULT_FIELDS | {'images', 'resumo_html', 'links'},
+}
+
+# Formatos conhecidos (os demais são aceitos e usam DEFAULT_FIELDS)
+FORMATS = ('metadata', 'markdown', 'html', 'json', 'text', 'proxy')
+
+# Partes da extração da página (extract_page) de que cada campo depende
+FIELD_PARTS = {
+    'title': {'title'},
+    'images': {'images'},
+    'resumo_html': {'summary'},
+    'markdown': {'title', 'summary'},
+    'links': {'links'},
+    'metadata': {'metadata'},
+    'nextData': {'metadata'},
+    'schemaData': {'metadata'},
+}
+
+
+def parse_fields(value):
+    """Lista de campos do parâmetro "fields" (None = campos do formato)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [item.strip() for item in value.split(',') if item.strip()]
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError("fields deve ser uma lista de nomes de campos")
+    unknown = [item for item in value if item not in FIELDS]
+    if unknown:
+        raise ValueError(f"campos desconhecidos: {', '.join(unknown)} (disponíveis: {', '.join(FIELDS)})")
+    return frozenset(value)
+
+
+def select_fields(format_type, fields=None, output_headers=False):
+    """Campos calculados para o formato, ou a projeção pedida em "fields" """
+    if fields is not None:
+        return frozenset(fields)
+    selected = FORMAT_FIELDS.get(format_type, DEFAULT_FIELDS)
+    return selected | {'headers'} if output_headers else selected
+
+
+def metric_format(format_type):
+    """Formato usado como dimensão das métricas: um dos FORMATS ou 'other' (cardinalidade fixa)"""
+    return format_type if format_type in FORMATS else 'other'
+
+
+def page_parts(selected):
+    """Partes da página que a extração precisa coletar para os campos selecionados"""
+    parts = set()
+    for field in selected:
+        parts |= FIELD_PARTS.get(field, set())
+    return parts
+
+
+class LazyResponse:
+    """Campos da resposta calculados sob demanda (cada produtor roda no máximo uma vez)"""
+
+    def __init__(self, producers):
+        self.producers = producers
+        self.values = {}
+
+    def __getitem__(self, field):
+        if field not in self.values:
+            self.values[field] = self.producers[field]()
+        return self.values[field]
+
+    def build(self, selected, projected=False):
+        """
+        Dicionário da resposta com os campos selecionados.
+        projected: só as chaves selecionadas; senão todas, com None nas demais
+        """
+        if projected:
+            return {field: self[field] for field in FIELDS if field in selected}
+        return {field: self[field] if field in selected else None for field in FIELDS}
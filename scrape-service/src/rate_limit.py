@@ -0,0 +1,160 @@
+"""
+Rate limit por host (token bucket) usado na recursão.
+
+Cada host tem seu próprio bucket, de modo que um crawl espalhado por vários domínios
+roda em velocidade total enquanto cada domínio continua protegido. As configurações
+valem apenas para a requisição que criou o HostRateLimiter (nada é global); no modo batch,
+um único HostRateLimiter é compartilhado pelos itens, que rodam em threads diferentes.
+"""
+import asyncio
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# Intervalo padrão (em segundos) entre requisições ao mesmo host
+RATE_LIMIT_SECONDS = float(os.environ.get('RATE_LIMIT_SECONDS', 0.5))
+# Número de requisições que podem ser feitas em rajada ao mesmo host
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 1))
+# Número de novas tentativas após 429/503
+RATE_LIMIT_MAX_RETRIES = int(os.environ.get('RATE_LIMIT_MAX_RETRIES', 2))
+# Maior Retry-After (em segundos) que ainda vale a pena aguardar
+RATE_LIMIT_MAX_RETRY_AFTER = float(os.environ.get('RATE_LIMIT_MAX_RETRY_AFTER', 30))
+# Espera inicial quando a resposta 429/503 não traz Retry-After (dobra a cada tentativa)
+RATE_LIMIT_BACKOFF_SECONDS = float(os.environ.get('RATE_LIMIT_BACKOFF_SECONDS', 1.0))
+
+RETRY_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value):
+    """Converte o header Retry-After (segundos ou data HTTP) em segundos; None se inválido"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket com reserva antecipada: cada chamada a reserve() consome um token
+    (o saldo pode ficar negativo) e devolve quanto tempo esperar pela vez.
+    rate: tokens por segundo (None = sem limite); burst: capacidade do bucket
+    """
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = 0.0
+            if self.rate:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                self.tokens -= 1
+                if self.tokens < 0:
+                    delay = -self.tokens / self.rate
+            return max(delay, self.blocked_until - now)
+
+    async def acquire(self):
+        delay = self.reserve()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            # Um backoff (Retry-After) pode ter chegado enquanto aguardava
+            delay = self.blocked_until - time.monotonic()
+
+    def wait(self):
+        """Versão síncrona de acquire (requisições feitas fora de um event loop)"""
+        delay = self.reserve()
+        while delay > 0:
+            time.sleep(delay)
+            delay = self.blocked_until - time.monotonic()
+
+    def backoff(self, seconds):
+        """Bloqueia o bucket por `seconds` segundos (429/Retry-After)"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class HostRateLimiter:
+    """Mantém um TokenBucket por host"""
+
+    def __init__(self, rate=None, burst=RATE_LIMIT_BURST, max_retries=RATE_LIMIT_MAX_RETRIES):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_interval(cls, seconds=RATE_LIMIT_SECONDS, burst=RATE_LIMIT_BURST,
+                      max_retries=RATE_LIMIT_MAX_RETRIES):
+        """Cria o limiter a partir do intervalo (em segundos) entre requisições ao mesmo host"""
+        return cls(1.0 / seconds if seconds and seconds > 0 else None, burst, max_retries)
+
+    @classmethod
+    def from_params(cls, body):
+        """
+        Cria o limiter a partir dos parâmetros da requisição: 'rate_limit' é o intervalo (em
+        segundos) entre requisições ao mesmo host e 'rate_limit_burst' o número de requisições
+        permitidas em rajada; valores inválidos são ignorados.
+        """
+        rate_limit = RATE_LIMIT_SECONDS
+        if body.get("rate_limit") is not None:
+            try:
+                rate_limit = float(body.get("rate_limit"))
+            except Exception as e:
+                pass
+        rate_limit_burst = RATE_LIMIT_BURST
+        if body.get("rate_limit_burst") is not None:
+            try:
+                rate_limit_burst = int(body.get("rate_limit_burst"))
+            except Exception as e:
+                pass
+        return cls.from_interval(rate_limit, rate_limit_burst)
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def consume(self, url):
+        """Registra uma requisição já feita ao host (sem aguardar)"""
+        self.bucket(url).reserve()
+
+    async def acquire(self, url):
+        await self.bucket(url).acquire()
+
+    def wait(self, url):
+        """Aguarda a vez do host fora do event loop (requisição inicial de cada URL)"""
+        self.bucket(url).wait()
+
+    def retry_delay(self, url, response, attempt):
+        """
+        Para respostas 429/503, aplica o backoff ao host e retorna quanto aguardar antes da
+        nova tentativa; retorna None se a resposta não deve ser repetida.
+        """
+        if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+            return None
+        delay = parse_retry_after(response.headers.get('retry-after'))
+        if delay is None:
+            delay = RATE_LIMIT_BACKOFF_SECONDS * 2 ** attempt
+        if delay > RATE_LIMIT_MAX_RETRY_AFTER:
+            return None
+        self.bucket(url).backoff(delay)
+        return delay
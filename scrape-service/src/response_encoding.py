@@ -0,0 +1,220 @@
+"""
+Serialização e compressão das respostas.
+
+    - serializador: json da biblioteca padrão ou orjson (RESPONSE_SERIALIZER), bem mais
+      rápido em árvores de crawl grandes
+    - "drop_none": true remove os campos null da resposta (em todos os níveis)
+    - "compact": true troca as URLs repetidas na árvore de links (chaves, imagens,
+      duplicate_of) por índices de uma tabela de URLs, cujos hosts também ficam em tabela
+      própria; expand() reconstrói a resposta original
+    - Accept-Encoding: respostas a partir de RESPONSE_COMPRESSION_MIN_BYTES são comprimidas
+      com brotli (se instalado) ou gzip e devolvidas em base64 (isBase64Encoded)
+
+Formato compacto:
+
+    {"compact": {"hosts": ["https://loja.example"], "urls": [[0, "/p1"], [0, "/img.png"]]},
+     "links": {"0": {"title": "P1", "images": [1], "links": {...}}}, ...}
+"""
+import base64
+import gzip
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli é opcional
+    brotli = None
+
+# Serializador das respostas: 'json' (biblioteca padrão), 'orjson' ou 'auto' (orjson se instalado)
+RESPONSE_SERIALIZER = os.environ.get('RESPONSE_SERIALIZER', 'json').lower()
+# Comprime as respostas conforme o Accept-Encoding da requisição
+RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', 'true').lower() in ('1', 'true', 'yes')
+# Respostas menores não são comprimidas (o base64 e os headers anulariam o ganho)
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024))
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _use_orjson(serializer=None):
+    serializer = (serializer or RESPONSE_SERIALIZER).lower()
+    if serializer == 'orjson' and orjson is None:
+        raise ValueError("Serializador 'orjson' não está instalado")
+    return orjson is not None and serializer in ('orjson', 'auto')
+
+
+def dumps(data, serializer=None):
+    """JSON da resposta como str (orjson quando configurado, com fallback para json)"""
+    if _use_orjson(serializer):
+        try:
+            return orjson.dumps(data).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(data)
+
+
+def drop_none(value):
+    """Cópia de value sem as chaves com valor None (em todos os níveis)"""
+    if isinstance(value, dict):
+        return {key: drop_none(item) for key, item in value.items() if item is not None}
+    if isinstance(value, list):
+        return [drop_none(item) for item in value]
+    return value
+
+
+class _UrlTable:
+    def __init__(self):
+        self.hosts = []
+        self.urls = []
+        self._hosts = {}
+        self._urls = {}
+
+    def ref(self, url):
+        if not isinstance(url, str):
+            return url
+        index = self._urls.get(url)
+        if index is None:
+            host = ''
+            start = url.find('://')
+            if start > 0:
+                end = url.find('/', start + 3)
+                host = url if end < 0 else url[:end]
+            if host not in self._hosts:
+                self._hosts[host] = len(self.hosts)
+                self.hosts.append(host)
+            index = self._urls[url] = len(self.urls)
+            self.urls.append([self._hosts[host], url[len(host):]])
+        return index
+
+    def url(self, index):
+        if not isinstance(index, int):
+            return index
+        host, rest = self.urls[index]
+        return self.hosts[host] + rest
+
+
+def _compact_links(links, table):
+    if isinstance(links, dict):
+        return {str(table.ref(url)): _compact_node(node, table) for url, node in links.items()}
+    if isinstance(links, list):
+        return [table.ref(url) for url in links]
+    return links
+
+
+def _compact_node(node, table):
+    if not isinstance(node, dict):
+        return node
+    node = dict(node)
+    if isinstance(node.get('images'), list):
+        node['images'] = [table.ref(url) for url in node['images']]
+    if 'duplicate_of' in node:
+        node['duplicate_of'] = table.ref(node['duplicate_of'])
+    if 'links' in node:
+        node['links'] = _compact_links(node['links'], table)
+    return node
+
+
+def compact(data):
+    """Resposta no formato compacto (URLs da árvore de links trocadas por índices)"""
+    table = _UrlTable()
+    result = _compact_node(data, table)
+    return {'compact': {'hosts': table.hosts, 'urls': table.urls}, **result}
+
+
+def _expand_links(links, table):
+    if isinstance(links, dict):
+        return {table.url(int(ref)): _expand_node(node, table) for ref, node in links.items()}
+    if isinstance(links, list):
+        return [table.url(ref) for ref in links]
+    return links
+
+
+def _expand_node(node, table):
+    if not isinstance(node, dict):
+        return node
+    node = dict(node)
+    if isinstance(node.get('images'), list):
+        node['images'] = [table.url(ref) for ref in node['images']]
+    if 'duplicate_of' in node:
+        node['duplicate_of'] = table.url(node['duplicate_of'])
+    if 'links' in node:
+        node['links'] = _expand_links(node['links'], table)
+    return node
+
+
+def expand(data):
+    """Reconstrói a resposta original a partir do formato compacto"""
+    data = dict(data)
+    tables = data.pop('compact')
+    table = _UrlTable()
+    table.hosts, table.urls = tables['hosts'], tables['urls']
+    return _expand_node(data, table)
+
+
+def encode(data, omit_none=False, compact_urls=False, serializer=None):
+    """Corpo da resposta: drop_none, formato compacto e serialização"""
+    if omit_none:
+        data = drop_none(data)
+    if compact_urls:
+        data = compact(data)
+    return dumps(data, serializer)
+
+
+def negotiate(accept_encoding):
+    """Codificação escolhida para o Accept-Encoding ('br', 'gzip' ou None)"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+    wildcard = weights.get('*', 0.0)
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    best, best_quality = None, 0.0
+    for name in candidates:
+        quality = weights.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def header(headers, name):
+    """Valor de um header do evento (API Gateway/Function URL), sem diferenciar maiúsculas"""
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def compress_response(response, accept_encoding):
+    """Comprime o corpo da resposta do lambda_handler conforme o Accept-Encoding"""
+    body = response.get('body')
+    if (not RESPONSE_COMPRESSION or not isinstance(body, str) or response.get('isBase64Encoded')
+            or len(body) < RESPONSE_COMPRESSION_MIN_BYTES):
+        return response
+    encoding = negotiate(accept_encoding)
+    if encoding is None:
+        return response
+    raw = body.encode('utf-8')
+    if encoding == 'br':
+        compressed = brotli.compress(raw, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    return {
+        **response,
+        'headers': {**(response.get('headers') or {}), 'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'},
+        'body': base64.b64encode(compressed).decode('ascii'),
+        'isBase64Encoded': True
+    }
@@ -1,173 +1,202 @@
+# Profiling do cold start (STARTUP_PROFILE=true): precisa vir antes dos demais imports
+from . import startup
+startup.begin()
+
 import json
-import httpx
-import time  # Importado para implementar o rate limit
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-import html2text
-import re
-from jsonpath_ng import parse
-import io
-import PyPDF2
-import docx2txt
-from openpyxl import load_workbook
-import csv
-from io import StringIO
+
+from . import instrumentation
+from .batch import compute_deadline, run_batch
+from .cache import CACHE_ENABLED, cached_result, content_hash_of, fetch, get_cache
+from .checkpoint import (CHECKPOINT_ENABLED, CHECKPOINT_MARGIN_MS, checkpoint_summary, load_token, make_token,
+                         open_checkpoint_store, signing_enabled)
+from .crawler import crawl, filter_links
+from .docx_text import extract_docx
+from .download import DownloadBudget, download_info
+from .extraction import HTML_PARSER, PAGE_PARTS, extract_page, get_backend
+from .http_client import build_timeout, get_client
+from .incremental import IncrementalState, open_state_store, prune_unchanged
+from .instrumentation import INSTRUMENTATION_LOGS, log_emf, stage
+from .link_rules import LinkRules
+from .metadata_filters import apply_filters
+from .metadata_scan import scan_metadata
+from .near_duplicates import NearDuplicateDetector, signature as text_signature
+from .pdf import extract_pdf, parse_page_range
+from .projection import LazyResponse, metric_format, page_parts, parse_fields, select_fields
+from .rate_limit import RATE_LIMIT_SECONDS, HostRateLimiter
+from .response_encoding import compress_response, encode, header
+from .sitemaps import SITEMAP_MAX_URLS, discover_seeds, parse_since
+from .streaming import NDJSON_CONTENT_TYPE, iter_ndjson
+from .urls import DEFAULT_CANONICALIZER, UrlCanonicalizer, make_seen_set
+from .xlsx import OUTPUT_FORMATS as XLSX_FORMATS, convert_xlsx
 
 def process_html(html_content, final_url, maxsize=2000, level=0, max_level=0, processed_urls=None,
-                 max_recursion_links=None, link_exp_filter=None, current_recursion_count=None, format_type='html'):
+                 max_recursion_links=None, link_exp_filter=None, current_recursion_count=None, format_type='html',
+                 max_concurrency=None, timeout=10.0, page=None, parser=None, rate_limiter=None, cache=None,
+                 on_result=None, budget=None, document_options=None, canonicalizer=None, seed_links=None,
+                 incremental=None, deadline=None, resume=None, checkpoint=None, near_duplicates=None):
     """
-    Processa o HTML de forma recursiva até max_level
-    processed_urls: conjunto de URLs já processadas para evitar loops
+    Processa o HTML e, se max_level > 0, percorre os links até max_level
+    processed_urls: chaves das URLs já processadas para evitar loops (set ou BloomFilter)
     max_recursion_links: número máximo de links para processar recursivamente
-    link_exp_filter: expressão regular para filtrar links
-    current_recursion_count: contador de links processados no nível atual
+    link_exp_filter: LinkRules ou expressão regular para filtrar links
+    current_recursion_count: contador de links processados na recursão
+    max_concurrency: número máximo de requisições simultâneas na recursão
+    timeout: timeout das requisições da recursão (segundos ou httpx.Timeout)
+    page: resultado de extract_page já calculado para este HTML (evita um novo parse)
+    parser: parser HTML usado ('html.parser', 'lxml' ou 'selectolax')
+    rate_limiter: HostRateLimiter da requisição, pelo qual a página atual já passou
+        (padrão: RATE_LIMIT_SECONDS por host)
+    cache: ResponseCache usado nas requisições e nos resultados da recursão (None = sem cache)
+    on_result: função (url, depth, parent, node) chamada para esta página e para cada link
+        processado assim que termina; nesse caso a árvore de links não é mantida em memória
+    budget: DownloadBudget da requisição (limites de bytes por resposta e total)
+    document_options: opções de extração dos documentos encontrados (ver parse_document_options)
+    canonicalizer: UrlCanonicalizer usado para comparar URLs na recursão (#fragmentos,
+        parâmetros de rastreamento, barra final...)
+    seed_links: URLs buscadas no primeiro nível da recursão antes dos links da página
+        (ex.: as URLs dos sitemaps)
+    incremental: IncrementalState do modo incremental; páginas inalteradas não são
+        reprocessadas (nó {"status": "unchanged"}) e seus links guardados são seguidos
+    deadline / resume / checkpoint: prazo da recursão (time.monotonic), estado de um crawl
+        interrompido a retomar e dicionário que recebe o estado se o prazo for atingido
+    near_duplicates: NearDuplicateDetector; páginas quase duplicadas de outra já vista viram
+        {"status": "near_duplicate", "duplicate_of": url} e seus links não são seguidos
     """
     if processed_urls is None:
         processed_urls = set()
     if current_recursion_count is None:
         current_recursion_count = {'count': 0}
+    if canonicalizer is None:
+        canonicalizer = DEFAULT_CANONICALIZER
 
-    if final_url in processed_urls:
+    url_key = canonicalizer.key(final_url)
+    if url_key in processed_urls:
         return None, None, None, None
 
-    processed_urls.add(final_url)
-
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    # Extração do título
-    title = soup.title.string.strip() if soup.title and soup.title.string else "Sem Título"
-
-    # Extração de parágrafos
-    elementos = soup.find_all([
-        'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-        'strong', 'span', 'a'
-    ])
-    paragraphs = []
-    ultimo_texto = None
-    for elemento in elementos:
-        texto_atual = elemento.get_text(strip=True)
-        if elemento.name == 'a':
-            texto_atual = f"[{elemento.get_text(strip=True)}]({elemento.get('href')})"
-        if texto_atual and texto_atual != ultimo_texto:
-            paragraphs.append(elemento)
-            ultimo_texto = texto_atual
-
-    resumo_html = ""
-    for p in paragraphs:
-        text = p.get_text().strip()
-        if text:
-            resumo_html += f"<p>{text}</p>\n"
-        if len(resumo_html) > maxsize:
-            break
-    if not resumo_html:
-        resumo_html = "<p>Não foram encontrados textos significativos na página.</p>"
-
-    # Extração de imagens
-    images = []
-    for img in soup.find_all('img'):
-        src = img.get('src')
-        if src:
-            full_src = urljoin(final_url, src)
-            if full_src not in images:
-                images.append(full_src)
-        if len(images) >= 5:
-            break
-
-    # Extração de links contidos nas tags <a>
-    links = {} if max_level > 0 else []
-    for a in soup.find_all('a'):
-        href = a.get('href')
-        if href:
-            full_link = urljoin(final_url, href)
-            # Se não houver filtro ou o link passar pelo filtro
-            if not link_exp_filter or re.search(link_exp_filter, full_link):
-                if max_level > 0:
-                    if level < max_level and full_link not in processed_urls:
-                        if max_recursion_links is None or current_recursion_count['count'] < max_recursion_links:
-                            current_recursion_count['count'] += 1
-                            try:
-                                # Aguarda conforme o rate limit antes de executar a requisição
-                                time.sleep(RATE_LIMIT_SECONDS)
-                                with httpx.Client(follow_redirects=True) as client:
-                                    response = client.get(full_link, timeout=10.0)
-                                    ctype = response.headers.get("content-type", "").lower()
-
-                                    # Processa documentos especiais
-                                    if any(doc_type in ctype for doc_type in ["pdf", "word", "excel", "spreadsheet"]):
-                                        content = process_document(response.content, ctype, format_type)
-                                        if content:
-                                            links[full_link] = {"content": content, "type": ctype}
-                                    # Processa HTML recursivamente
-                                    elif "html" in ctype:
-                                        sub_title, sub_html, sub_images, sub_links = process_html(
-                                            response.text, full_link, maxsize,
-                                            level + 1, max_level, processed_urls,
-                                            max_recursion_links, link_exp_filter, current_recursion_count, format_type
-                                        )
-                                        if sub_title:  # se processamento foi bem sucedido
-                                            links[full_link] = {
-                                                "title": sub_title,
-                                                "content": sub_html,
-                                                "images": sub_images,
-                                                "links": sub_links
-                                            }
-                            except Exception as e:
-                                links[full_link] = {"error": str(e)}
-                        else:
-                            links[full_link] = {"status": "max_recursion_links_reached"}
-                    else:
-                        links[full_link] = {"status": "max_level_reached"}
-                elif max_level == 0:
-                    if full_link not in links:
-                        links.append(full_link)
+    processed_urls.add(url_key)
+
+    # Com near_duplicates, o texto completo da página (e não o resumo) compõe a impressão digital
+    text_parts = PAGE_PARTS | {'text'} if near_duplicates is not None else None
+    if page is None:
+        with stage('extract'):
+            page = extract_page(html_content, final_url, maxsize, metadata=False, parser=parser, parts=text_parts)
+    title, resumo_html, images, page_links = page["title"], page["resumo_html"], page["images"], page["links"]
+    if near_duplicates is not None and page.get("text") is not None:
+        near_duplicates.check(final_url, text_signature(page["text"]))
+    if on_result is not None and not page.get("unchanged"):
+        on_result(final_url, level, None, {"title": title, "content": resumo_html, "images": images})
+
+    if max_level == 0:
+        links = []
+        for full_link in filter_links(page_links, link_exp_filter):
+            if full_link not in links:
+                links.append(full_link)
+        return title, resumo_html, images, links
+
+    options = document_options or parse_document_options({})
+
+    def process_content(response, url):
+        ctype = response.headers.get("content-type", "").lower()
+        info = download_info(response)
+
+        # Conteúdo descartado pelos limites de download (tipos não suportados são ignorados)
+        if info.get('skipped') == 'unsupported_type':
+            return None, None
+        if info.get('skipped'):
+            return {"status": info['skipped'], "type": ctype}, None
+        # PDFs: extração sob demanda, limitada ao intervalo de páginas e de caracteres
+        if "application/pdf" in ctype:
+            content, stats = process_pdf(response.content, format_type,
+                                         options['pdf_pages'], options['pdf_max_chars'])
+            return ({"content": content, "type": ctype, "pdf": stats} if content else None), None
+        # DOCX: texto lido em streaming do word/document.xml, limitado por caracteres
+        if "wordprocessingml.document" in ctype:
+            content, stats = process_docx(response.content, format_type, options)
+            return ({"content": content, "type": ctype, "docx": stats} if content else None), None
+        # Planilhas: conversão em streaming, limitada por abas, linhas, colunas e caracteres
+        if "spreadsheetml.sheet" in ctype:
+            content, stats = process_spreadsheet(response.content, format_type, options)
+            return ({"content": content, "type": ctype, "xlsx": stats} if content else None), None
+        # Processa documentos especiais
+        if any(doc_type in ctype for doc_type in ["pdf", "word", "excel", "spreadsheet"]):
+            content = process_document(response.content, ctype, format_type)
+            return ({"content": content, "type": ctype} if content else None), None
+        # Processa HTML, cujos links serão percorridos no próximo nível
+        elif "html" in ctype:
+            with stage('extract'):
+                sub_page = extract_page(response.text, url, maxsize, metadata=False, parser=parser,
+                                        parts=text_parts)
+            node = {
+                "title": sub_page["title"],
+                "content": sub_page["resumo_html"],
+                "images": sub_page["images"],
+                "links": {}
+            }
+            if info.get('truncated'):
+                node["truncated"] = info['truncated']
+            if near_duplicates is not None:
+                # Assinatura do texto completo, guardada no cache junto com o resultado
+                return node, sub_page["links"], text_signature(sub_page["text"])
+            return node, sub_page["links"]
+        return None, None
+
+    def process_response(response, url):
+        # Modo incremental: página inalterada (304 ou mesmo hash) não é processada de novo
+        if incremental is not None and incremental.is_unchanged(url, response):
+            child_links = incremental.links(url)
+            return ({"status": "unchanged", "links": {}} if child_links else {"status": "unchanged"}), child_links
+        # Conteúdo já processado (mesma URL e mesmo hash) é reaproveitado do cache
+        variant = f"crawl:{maxsize}:{format_type}:{parser or HTML_PARSER}:{json.dumps(options, sort_keys=True)}"
+        if near_duplicates is not None:
+            variant += ":signature"
+        result = cached_result(cache, url, content_hash_of(response), variant,
+                               lambda: process_content(response, url))
+        node, child_links = result[0], result[1]
+        if incremental is not None and node is not None:
+            incremental.record(url, response, child_links)
+        # Página HTML quase duplicada de outra já vista: vira uma referência e não é expandida
+        if near_duplicates is not None and len(result) > 2:
+            duplicate = near_duplicates.check(url, result[2])
+            if duplicate is not None:
+                return {"status": "near_duplicate", "duplicate_of": duplicate[0], "similarity": duplicate[1]}, None
+        return node, child_links
+
+    if rate_limiter is None:
+        rate_limiter = HostRateLimiter.from_interval(RATE_LIMIT_SECONDS)
+        # A página atual acabou de ser buscada: conta para o rate limit do seu host
+        rate_limiter.consume(final_url)
+
+    with stage('crawl'):
+        links = crawl(
+            list(seed_links or []) + list(page_links), process_response,
+            level=level, max_level=max_level,
+            processed_urls=processed_urls,
+            max_recursion_links=max_recursion_links,
+            link_exp_filter=link_exp_filter,
+            current_recursion_count=current_recursion_count,
+            max_concurrency=max_concurrency,
+            rate_limiter=rate_limiter,
+            timeout=timeout,
+            cache=cache,
+            root_url=final_url,
+            on_result=on_result,
+            keep_tree=on_result is None,
+            budget=budget,
+            canonicalizer=canonicalizer,
+            request_headers=incremental.conditional_headers if incremental is not None else None,
+            deadline=deadline,
+            resume=resume,
+            checkpoint=checkpoint,
+            near_duplicates=near_duplicates
+        )
 
     return title, resumo_html, images, links
 
-def extract_metadata(html_content):
+def extract_metadata(html_content, parser=None):
     """
     Extrai os metadados do schema.org e dados do Next.js a partir do HTML.
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    schema_data = {}
-    next_data = {}
-
-    # Extração dos dados do schema.org (JSON-LD)
-    for script in soup.find_all("script", type="application/ld+json"):
-        try:
-            # Use get_text() para obter o conteúdo mesmo se não for um nó de string simples
-            content = script.get_text(strip=True)
-            if content:
-                data = json.loads(content)
-                if isinstance(data, list):
-                    for item in data:
-                        if item.get("@type", "").lower() == "product":
-                            schema_data = item
-                        elif item.get("@type", "").lower() == "breadcrumblist":
-                            schema_data["breadcrumb"] = item.get("itemListElement", [])
-                elif isinstance(data, dict):
-                    type_value = data.get("@type", "").lower()
-                    if type_value == "product":
-                        schema_data = data
-                    elif type_value == "breadcrumblist":
-                        schema_data["breadcrumb"] = data.get("itemListElement", [])
-        except Exception:
-            continue
-
-    # Extração dos dados do Next.js a partir da tag <script id="__NEXT_DATA__" type="application/json">
-    tag = soup.find("script", id="__NEXT_DATA__", type="application/json")
-    if tag and tag.string:
-        try:
-            next_data = json.loads(tag.string)
-        except Exception:
-            next_data = {}
-    else:
-        next_data = {}
-
-    return {
-        "schema": schema_data,
-        "nextData": next_data
-    }
+    return extract_page(html_content, '', maxsize=0, parser=parser)["metadata"]
 
 def filter_next_data(next_data):
     """
@@ -181,16 +210,20 @@ def apply_metadata_filters(next_data, filters):
     Aplica filtros JSONPath ao next_data.
     `filters` deve ser um array de expressões JSONPath.
     Retorna um dicionário com cada query como chave e os dados extraídos como valor.
+    As expressões compiladas ficam em cache e todas são avaliadas em uma única passada.
     """
-    filtered = {}
-    for query in filters:
-        try:
-            jsonpath_expr = parse(query)
-            matches = [match.value for match in jsonpath_expr.find(next_data)]
-            filtered[query] = matches
-        except Exception as e:
-            filtered[query] = f"Error: {str(e)}"
-    return filtered
+    return apply_filters(next_data, filters)
+
+def to_markdown(title, final_url, resumo_html):
+    """Markdown da página (o html2text só é importado quando o campo é pedido)"""
+    if resumo_html is None:
+        return None
+    with stage('markdown'):
+        import html2text
+        converter = html2text.HTML2Text()
+        converter.ignore_links = False
+        markdown_text = converter.handle(resumo_html)
+        return f"# {title}\n\nFinal URL: [Link]({final_url})\n\n{markdown_text}"
 
 def get_cors_headers():
     """Retorna os headers padrão para CORS"""
@@ -204,74 +237,122 @@ def process_document(content, content_type, format_type='html'):
     """Processa documentos PDF, DOCX e XLSX retornando texto/html"""
     try:
         if "application/pdf" in content_type:
-            pdf_file = io.BytesIO(content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = "\n\n".join(page.extract_text() for page in pdf_reader.pages)
+            with stage('document.pdf'):
+                text = extract_pdf(content)["text"]
             return f"<pre>{text}</pre>" if "html" in format_type else text
 
         elif "application/vnd.openxmlformats-officedocument.wordprocessingml.document" in content_type:
-            docx_file = io.BytesIO(content)
-            text = docx2txt.process(docx_file)
+            with stage('document.docx'):
+                text = extract_docx(content)[0]
             return f"<pre>{text}</pre>" if "html" in format_type else text
 
         elif "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet" in content_type:
-            xlsx_file = io.BytesIO(content)
-            wb = load_workbook(xlsx_file, read_only=True)
-            output = []
-            for sheet in wb:
-                rows = sheet.values
-                header = next(rows)
-                for row in rows:
-                    output.append(dict(zip(header, row)))
-            if "html" in format_type:
-                html = ['<table border="1"><tr>']
-                if output:
-                    # Headers
-                    html.extend(f'<th>{k}</th>' for k in output[0].keys())
-                    html.append('</tr>')
-                    # Rows
-                    for row in output:
-                        html.append('<tr>')
-                        html.extend(f'<td>{v}</td>' for v in row.values())
-                        html.append('</tr>')
-                html.append('</table>')
-                return ''.join(html)
-            # Markdown table
-            if not output:
-                return "Empty spreadsheet"
-            md = []
-            headers = list(output[0].keys())
-            md.append('| ' + ' | '.join(headers) + ' |')
-            md.append('| ' + ' | '.join(['---'] * len(headers)) + ' |')
-            for row in output:
-                md.append('| ' + ' | '.join(str(row[h]) for h in headers) + ' |')
-            return '\n'.join(md)
+            with stage('document.xlsx'):
+                return convert_xlsx(content, 'html' if "html" in format_type else 'markdown')[0]
 
     except Exception as e:
         return f"Error processing document: {str(e)}"
 
     return None
 
-def lambda_handler(event, context):
+def process_pdf(content, format_type='html', pages=None, max_chars=None):
+    """
+    Extrai o texto de um PDF respeitando o intervalo de páginas e o limite de caracteres.
+    Retorna (texto/html, estatísticas por página) ou (mensagem de erro, None).
+    """
     try:
-        # Se for uma requisição OPTIONS (preflight), retorna os headers CORS
-        if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
-            return {
-                'statusCode': 200,
-                'headers': get_cors_headers(),
-                'body': ''
-            }
+        with stage('document.pdf'):
+            result = extract_pdf(content, pages=pages, max_chars=max_chars)
+    except Exception as e:
+        return f"Error processing document: {str(e)}", None
+    text = result["text"]
+    stats = {"page_count": result["page_count"], "truncated": result["truncated"], "pages": result["pages"]}
+    return (f"<pre>{text}</pre>" if "html" in format_type else text), stats
 
-        # Parse do corpo da requisição
-        body = json.loads(event.get('body', '{}'))
-        # Se 'rate_limit' for informado nos parâmetros, atualiza o tempo de espera (em segundos)
-        if body.get("rate_limit") is not None:
-            try:
-                rate = float(body.get("rate_limit"))
-                global RATE_LIMIT_SECONDS
-                RATE_LIMIT_SECONDS = rate
-            except Exception as e:
-                pass
+def process_docx(content, format_type='html', options=None):
+    """
+    Extrai o texto de um DOCX em streaming, limitado por caracteres, com cabeçalhos/rodapés
+    e tabelas estruturados quando pedidos. Retorna (texto/html, estatísticas) ou (mensagem de erro, None).
+    """
+    options = options or {}
+    try:
+        with stage('document.docx'):
+            text, stats = extract_docx(content, max_chars=options.get('docx_max_chars'),
+                                       headers_footers=bool(options.get('docx_headers')),
+                                       tables=bool(options.get('docx_tables')))
+    except Exception as e:
+        return f"Error processing document: {str(e)}", None
+    return (f"<pre>{text}</pre>" if "html" in format_type else text), stats
+
+def process_spreadsheet(content, format_type='html', options=None):
+    """
+    Converte uma planilha XLSX em tabela (html, markdown, csv ou ndjson) sem materializar as linhas.
+    Retorna (texto, estatísticas) ou (mensagem de erro, None).
+    """
+    options = options or {}
+    output_format = options.get('xlsx_format') or ('html' if "html" in format_type else 'markdown')
+    try:
+        with stage('document.xlsx'):
+            return convert_xlsx(content, output_format, sheets=options.get('xlsx_sheets'),
+                                max_rows=options.get('xlsx_max_rows'), max_cols=options.get('xlsx_max_cols'),
+                                max_chars=options.get('xlsx_max_chars'))
+    except Exception as e:
+        return f"Error processing document: {str(e)}", None
+
+def parse_document_options(body):
+    """
+    Lê do corpo da requisição as opções de extração de documentos:
+    pdf_pages, pdf_max_chars, xlsx_sheets, xlsx_max_rows, xlsx_max_cols, xlsx_max_chars, xlsx_format,
+    docx_max_chars, docx_headers e docx_tables.
+    Lança ValueError para valores inválidos.
+    """
+    options = {'pdf_pages': body.get('pdf_pages'), 'xlsx_sheets': body.get('xlsx_sheets'),
+               'docx_headers': bool(body.get('docx_headers', False)),
+               'docx_tables': bool(body.get('docx_tables', False))}
+    parse_page_range(options['pdf_pages'], 0)
+    for name in ('pdf_max_chars', 'xlsx_max_rows', 'xlsx_max_cols', 'xlsx_max_chars', 'docx_max_chars'):
+        value = body.get(name)
+        if value is not None:
+            value = int(value)
+            if value <= 0:
+                raise ValueError(f"{name} deve ser maior que zero")
+        options[name] = value
+    options['xlsx_format'] = body.get('xlsx_format')
+    if options['xlsx_format'] is not None and options['xlsx_format'] not in XLSX_FORMATS:
+        raise ValueError(f"xlsx_format deve ser um de: {', '.join(XLSX_FORMATS)}")
+    return options
+
+def scrape(body, on_result=None, context=None, deadline=None, rate_limiter=None):
+    """
+    Processa uma única URL a partir dos parâmetros do corpo da requisição.
+    Retorna a resposta no formato do lambda_handler.
+    on_result: repassado a process_html para entregar cada página assim que termina
+    context: contexto da Lambda; a recursão para antes do timeout e devolve um token de continuação
+    deadline: prazo (time.monotonic) do item de um batch; a recursão para nele mesmo sem checkpoints
+    rate_limiter: HostRateLimiter compartilhado pelos itens de um batch (padrão: um por requisição)
+    Com "debug_timings": true, a resposta inclui os tempos por etapa, bytes, páginas,
+    cache e pico de memória; com INSTRUMENTATION_LOGS, os mesmos dados vão para o log (EMF).
+    """
+    debug_timings = bool(body.get('debug_timings', False))
+    trace, token = instrumentation.start(debug_timings or INSTRUMENTATION_LOGS)
+    try:
+        result = _scrape(body, on_result, trace if debug_timings else None, context, deadline, rate_limiter)
+        if INSTRUMENTATION_LOGS:
+            # Dimensão limitada aos formatos conhecidos: o valor do cliente não cria séries novas
+            format_type = body.get('format', 'metadata')
+            format_type = format_type.lower() if isinstance(format_type, str) else None
+            log_emf(trace.report(), {'Format': metric_format(format_type)},
+                    {'url': body.get('url'), 'statusCode': result['statusCode']})
+        return result
+    finally:
+        instrumentation.finish(token)
+
+def _scrape(body, on_result=None, debug_trace=None, context=None, stop_at=None, rate_limiter=None):
+    """Implementação de scrape; debug_trace é o Trace devolvido em "debug_timings" (ou None)"""
+    try:
+        # Rate limit por host, válido apenas para esta requisição (ou para o batch)
+        if rate_limiter is None:
+            rate_limiter = HostRateLimiter.from_params(body)
         return_headers = body.get('output_headers', False)
         original_url = body.get('url')
         format_type = body.get('format', 'metadata').lower()  # Formato padrão: metadata
@@ -300,15 +381,180 @@ def lambda_handler(event, context):
                     'body': json.dumps({'error': f"Formato inválido para headers: {str(header_err)}"})
                 }
 
-        # Requisição HTTP
-        with httpx.Client(follow_redirects=True) as client:
-            response = client.request(method, original_url, headers=custom_headers, timeout=10.0)
-            final_url = str(response.url)
-            html_content = response.text
+        # Timeout das requisições (segundos ou objeto com connect/read/write/pool)
+        try:
+            timeout = build_timeout(body.get('timeout'))
+        except (TypeError, ValueError) as timeout_err:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f"Formato inválido para timeout: {str(timeout_err)}"})
+            }
+
+        # Parser HTML ('html.parser', 'lxml' ou 'selectolax'; padrão: HTML_PARSER)
+        parser = body.get('parser')
+        try:
+            get_backend(parser)
+        except ValueError as parser_err:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': str(parser_err)})
+            }
+
+        # Opções de extração dos documentos encontrados na recursão (PDF e planilhas)
+        try:
+            document_options = parse_document_options(body)
+        except (TypeError, ValueError) as document_err:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f"Parâmetro de documento inválido: {str(document_err)}"})
+            }
+
+        # Campos da resposta: os do formato ou a projeção pedida em "fields"
+        try:
+            fields = parse_fields(body.get('fields'))
+        except ValueError as fields_err:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f"Parâmetro fields inválido: {str(fields_err)}"})
+            }
+        selected = select_fields(format_type, fields, return_headers)
+
+        # Canonicalização das URLs da recursão e conjunto de URLs visitadas (set ou Bloom filter)
+        try:
+            canonicalizer = UrlCanonicalizer.from_params(body)
+            # Regras dos links seguidos (link_rules + link_exp_filter), compiladas uma única vez
+            link_rules = LinkRules.from_params(body)
+            max_links = body.get('max_recursion_links')
+            processed_urls = make_seen_set(body.get('seen_set'), int(max_links) + 1 if max_links else None)
+        except (TypeError, ValueError) as url_err:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f"Parâmetro de URL inválido: {str(url_err)}"})
+            }
+
+        # Detecção de páginas quase duplicadas na recursão (parâmetro near_duplicates)
+        try:
+            near_duplicates = NearDuplicateDetector.from_params(body)
+        except (TypeError, ValueError) as duplicates_err:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f"Parâmetro near_duplicates inválido: {str(duplicates_err)}"})
+            }
+
+        # Sementes do crawl a partir de robots.txt/sitemaps: true (sitemaps do robots.txt ou
+        # /sitemap.xml) ou URL/lista de URLs de sitemaps; sitemap_since filtra por <lastmod>
+        sitemaps = body.get('sitemap')
+        try:
+            sitemap_since = parse_since(body.get('sitemap_since'))
+            sitemap_max_urls = int(body.get('sitemap_max_urls') or SITEMAP_MAX_URLS)
+            if isinstance(sitemaps, str):
+                sitemaps = [sitemaps]
+            if sitemaps not in (None, False, True) and not (
+                    isinstance(sitemaps, list) and all(isinstance(item, str) for item in sitemaps)):
+                raise ValueError("sitemap deve ser booleano, URL ou lista de URLs")
+        except (TypeError, ValueError) as sitemap_err:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f"Parâmetro de sitemap inválido: {str(sitemap_err)}"})
+            }
+
+        # Continuação de um crawl interrompido no prazo da Lambda (mesmo corpo + continuation_token)
+        resume = None
+        if body.get('continuation_token'):
+            try:
+                resume = load_token(body['continuation_token'], original_url)
+            except ValueError as token_err:
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': str(token_err)})
+                }
+            if near_duplicates is not None:
+                near_duplicates.load(resume.get('near_duplicates'))
+        if body.get('checkpoint_store') is not None:
+            try:
+                open_checkpoint_store(body['checkpoint_store'])
+            except ValueError as store_err:
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': f"Parâmetro checkpoint_store inválido: {str(store_err)}"})
+                }
+        # Prazo da recursão: antes do timeout da Lambda, o estado vira um checkpoint
+        # (só com CHECKPOINT_SECRET configurado, que assina os tokens de continuação)
+        deadline = None
+        if body.get('checkpoint', CHECKPOINT_ENABLED) and signing_enabled():
+            deadline = compute_deadline(context, CHECKPOINT_MARGIN_MS)
+        # Item de um batch: o trabalho para no prazo do batch (não fica rodando no pool)
+        if stop_at is not None:
+            deadline = stop_at if deadline is None else min(deadline, stop_at)
+        checkpoint = {}
+
+        # Modo incremental: estado da execução anterior (nome dentro de INCREMENTAL_STATE_BASE)
+        incremental = None
+        if body.get('incremental'):
+            try:
+                incremental = IncrementalState.load(open_state_store(body['incremental']))
+            except ValueError as incremental_err:
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': f"Estado incremental inválido: {str(incremental_err)}"})
+                }
+            # Entregas em streaming (NDJSON) omitem as páginas inalteradas
+            if on_result is not None:
+                emit = on_result
+
+                def on_result(url, depth, parent, node):
+                    if node.get('status') != 'unchanged':
+                        emit(url, depth, parent, node)
+
+        # Cache de respostas (LRU em memória + store persistente opcional); "cache": false desliga.
+        # No modo incremental o estado faz esse papel (requisições condicionais próprias)
+        cache = get_cache() if body.get('cache', CACHE_ENABLED) and incremental is None else None
+
+        # Limites de download da requisição (por resposta e total, incluindo a recursão)
+        maxsize_param = int(body.get('maxsize', 300))
+        try:
+            budget = DownloadBudget.from_params(body, maxsize_param)
+        except (TypeError, ValueError) as budget_err:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f"Limite de download inválido: {str(budget_err)}"})
+            }
+
+        # Requisição HTTP (cliente compartilhado entre invocações); o corpo é lido em streaming
+        client = get_client()
+        if incremental is not None:
+            custom_headers = {**custom_headers, **incremental.conditional_headers(original_url)}
+        # A requisição inicial também aguarda a vez do host (itens de um batch no mesmo host)
+        with stage('rate_limit_wait'):
+            rate_limiter.wait(original_url)
+        with stage('fetch'):
+            response = fetch(client, method, original_url, headers=custom_headers, timeout=timeout, cache=cache,
+                             budget=budget)
+        final_url = str(response.url)
+        download_status = download_info(response)
+        if download_status.get('skipped'):
+            return {
+                'statusCode': 415 if download_status['skipped'] == 'unsupported_type' else 413,
+                'headers': get_cors_headers(),
+                'body': json.dumps({
+                    'error': f"Conteúdo não processado ({download_status['skipped']}): "
+                             f"{response.headers.get('content-type', '')}",
+                    'final_url': final_url
+                })
+            }
+        html_content = response.text
 
         # Se a resposta for JSON (content-type application/json), processa de forma diferenciada
         ctype = response.headers.get("content-type", "").lower()
         if "application/json" in ctype:
+            # Formato json: o corpo original é repassado sem parse nem nova serialização
+            # (um corpo cortado pelos limites de download não é JSON válido e segue o fluxo normal)
+            if format_type == 'json' and not download_status.get('truncated'):
+                return {
+                    'statusCode': 200,
+                    'headers': {**get_cors_headers(), 'Content-Type': 'application/json'},
+                    'body': html_content
+                }
             try:
                 data = response.json()
                 if format_type == 'json':
@@ -337,62 +583,203 @@ def lambda_handler(event, context):
                 pass
 
         # Processamento do conteúdo
-        maxsize_param = int(body.get('maxsize', 300))
         max_level = int(body.get('max_level', 0))  # Níveis de recursão (default: 0)
         max_recursion_links = body.get('max_recursion_links')  # Limite de links recursivos (default: None = sem limite)
-        link_exp_filter = body.get('link_exp_filter')  # Regex para filtrar links (default: None = sem filtro)
+        max_concurrency = body.get('max_concurrency')  # Requisições simultâneas na recursão (default: CRAWL_MAX_CONCURRENCY)
+
+        # Sementes dos sitemaps (primeiro nível da recursão), filtradas pelo robots.txt
+        seed_links, sitemap_stats = None, None
+        if sitemaps:
+            with stage('sitemap'):
+                seed_links, sitemap_stats = discover_seeds(
+                    client, final_url, sitemaps=sitemaps if isinstance(sitemaps, list) else None,
+                    since=sitemap_since, max_urls=sitemap_max_urls, timeout=timeout
+                )
+            max_level = max(max_level, 1)
 
         # Converte max_recursion_links para int se for string
         if isinstance(max_recursion_links, str):
             max_recursion_links = int(max_recursion_links)
-
-        title, resumo_html, images, links = process_html(
-            html_content, final_url, maxsize_param,
-            level=0, max_level=max_level,
-            max_recursion_links=max_recursion_links,
-            link_exp_filter=link_exp_filter,
-            format_type=format_type
-        )
-        # Controle da extração de imagens a partir do parâmetro "images" na requisição (default: true)
-        respond_images = body.get('images', True)
-        if not respond_images:
-            images = []
-
-        # Conversão para Markdown
-        converter = html2text.HTML2Text()
-        converter.ignore_links = False
-        markdown_text = converter.handle(resumo_html)
-        markdown_full = f"# {title}\n\nFinal URL: [Link]({final_url})\n\n{markdown_text}"
-
-        # Extrai os metadados (schema e nextData)
-        metadata_data = extract_metadata(html_content)
-
-        # Verifica se foram passados filtros para os metadados; se não houver, não retorna nextData
+        if max_concurrency is not None:
+            max_concurrency = int(max_concurrency)
+
+        # A recursão só roda se a resposta tem links, se as páginas são entregues uma a uma
+        # (on_result) ou no modo incremental, cujo estado é atualizado pelo crawl
+        crawls = 'links' in selected or on_result is not None or incremental is not None
+        # Parse único da página, coletando só as partes de que os campos selecionados dependem
+        parts = page_parts(selected)
+        if crawls:
+            parts |= {'title', 'summary', 'images', 'links'} if on_result is not None else {'links'}
+            if near_duplicates is not None:
+                parts |= {'text'}
+        # Metadados (schema e nextData). Sem filtros, nextData não é retornado;
+        # os mesmos filtros valem para o schema.org (schemaData)
         filters = body.get('metadata_filters', None)
-        if filters and isinstance(filters, list):
-            next_data_value = apply_metadata_filters(metadata_data.get("nextData", {}), filters)
+        if not (filters and isinstance(filters, list)):
+            filters = None
+
+        # (uma resposta 304 ou com o mesmo conteúdo reaproveita o resultado em cache)
+        if incremental is not None and incremental.is_unchanged(original_url, response):
+            # Página inalterada: sem extração; a recursão segue os links da execução anterior
+            page = {"title": None, "resumo_html": None, "images": [], "metadata": {},
+                    "links": incremental.links(original_url) or [], "unchanged": True}
+        elif 'metadata' in parts and parts <= {'title', 'metadata'}:
+            # Só título e metadados: scanner dos scripts, sem parse do DOM; o __NEXT_DATA__
+            # só é decodificado se há filtros
+            decode_next_data = filters is not None and 'nextData' in selected
+            with stage('extract'):
+                page = cached_result(
+                    cache, final_url, content_hash_of(response),
+                    'metadata:nextData' if decode_next_data else 'metadata',
+                    lambda: scan_metadata(html_content, next_data=decode_next_data)
+                )
         else:
-            next_data_value = None
-
-        # Estrutura a resposta combinada
-        data = {
-            "title": title,
-            "images": images if (format_type == 'markdown' or format_type == 'html') and respond_images else None,
-            "resumo_html": resumo_html if format_type == 'html' else None,
-            "final_url": final_url,
-            "metadata": metadata_data.get("schema", {}) if format_type == 'metadata' else None,
-            "nextData": next_data_value if format_type == 'metadata' else None,
-            "markdown": markdown_full if format_type == 'markdown' else None,
-            "links": links if format_type == 'markdown' or format_type == 'html' else None,
-            "headers": dict(response.headers) if return_headers else None
-        }
+            with stage('extract'):
+                page = cached_result(
+                    cache, final_url, content_hash_of(response),
+                    f"page:{maxsize_param}:{parser or HTML_PARSER}:{','.join(sorted(parts))}",
+                    lambda: extract_page(html_content, final_url, maxsize_param, parser=parser, parts=parts)
+                )
+            if incremental is not None:
+                incremental.record(original_url, response, page["links"])
+
+        title, resumo_html, images, links = page["title"], page["resumo_html"], page["images"], None
+        if crawls:
+            title, resumo_html, images, links = process_html(
+                html_content, final_url, maxsize_param,
+                level=0, max_level=max_level,
+                processed_urls=processed_urls,
+                max_recursion_links=max_recursion_links,
+                link_exp_filter=link_rules.scoped_to(final_url) if link_rules else None,
+                format_type=format_type,
+                max_concurrency=max_concurrency,
+                timeout=timeout,
+                page=page,
+                parser=parser,
+                rate_limiter=rate_limiter,
+                cache=cache,
+                on_result=on_result,
+                budget=budget,
+                document_options=document_options,
+                canonicalizer=canonicalizer,
+                seed_links=seed_links,
+                incremental=incremental,
+                deadline=deadline,
+                resume=resume,
+                checkpoint=checkpoint,
+                near_duplicates=near_duplicates
+            )
+        # Modo incremental: só páginas novas/alteradas na árvore; o estado atualizado é gravado
+        if incremental is not None:
+            links = prune_unchanged(links)
+            incremental.save()
+        # Controle da extração de imagens a partir do parâmetro "images" na requisição (default: true)
+        respond_images = body.get('images', True)
 
+        def filtered_metadata(key):
+            if filters is None:
+                return None
+            with stage('metadata_filters'):
+                return apply_metadata_filters(page["metadata"].get(key, {}), filters)
+
+        # Estrutura a resposta: só os produtores dos campos selecionados rodam
+        response_fields = LazyResponse({
+            "title": lambda: title,
+            "images": lambda: images if respond_images else None,
+            "resumo_html": lambda: resumo_html,
+            "final_url": lambda: final_url,
+            "metadata": lambda: page["metadata"].get("schema", {}),
+            "nextData": lambda: filtered_metadata("nextData"),
+            "schemaData": lambda: filtered_metadata("schema"),
+            "markdown": lambda: to_markdown(title, final_url, resumo_html),
+            "links": lambda: links,
+            "headers": lambda: dict(response.headers),
+            # Motivo do corte do download da página ('max_bytes', 'total_budget', 'early_abort') ou False
+            "truncated": lambda: download_status.get('truncated', False)
+        })
+        data = response_fields.build(selected, projected=fields is not None)
+        # Crawl interrompido no prazo: token para retomar em uma nova invocação
+        if checkpoint:
+            if near_duplicates is not None:
+                checkpoint["near_duplicates"] = near_duplicates.dump()
+            if signing_enabled():
+                data["continuation_token"] = make_token(original_url, checkpoint, body.get('checkpoint_store'))
+            data["checkpoint"] = checkpoint_summary(checkpoint)
+        # Páginas novas, alteradas e inalteradas em relação à execução anterior
+        if incremental is not None:
+            data["incremental"] = incremental.summary()
+        # Resumo da leitura dos sitemaps (parâmetro sitemap)
+        if sitemap_stats is not None:
+            data["sitemap"] = sitemap_stats
+        # Páginas quase duplicadas e padrões de URL descartados (parâmetro near_duplicates)
+        if near_duplicates is not None:
+            data["near_duplicates"] = near_duplicates.report()
+        # Contadores das regras de links (parâmetro link_rules)
+        if body.get('link_rules'):
+            data["link_rules"] = link_rules.report()
+        # Tempos por etapa e contadores da requisição (parâmetro debug_timings)
+        if debug_trace is not None:
+            data["debug_timings"] = debug_trace.report()
+
+        # Serialização (RESPONSE_SERIALIZER), sem campos null ("drop_none") e/ou com as URLs
+        # da árvore de links em tabela ("compact")
+        with stage('serialize'):
+            response_body = encode(data, bool(body.get('drop_none')), bool(body.get('compact')))
         return {
             'statusCode': 200,
             'headers': {**get_cors_headers(), 'Content-Type': 'application/json'},
-            'body': json.dumps(data)
+            'body': response_body
+        }
+
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': get_cors_headers(),
+            'body': json.dumps({'error': str(e)})
         }
 
+def lambda_handler(event, context):
+    """Handler da Lambda; o corpo é comprimido (gzip/brotli, em base64) conforme o Accept-Encoding"""
+    response = _handle(event, context)
+    return compress_response(response, header(event.get('headers'), 'accept-encoding'))
+
+def _handle(event, context):
+    try:
+        # Se for uma requisição OPTIONS (preflight), retorna os headers CORS
+        if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
+            return {
+                'statusCode': 200,
+                'headers': get_cors_headers(),
+                'body': ''
+            }
+
+        # Parse do corpo da requisição
+        body = json.loads(event.get('body', '{}'))
+        # Modo batch: várias URLs por invocação
+        if 'urls' in body:
+            try:
+                data = run_batch(body, context, scrape)
+            except ValueError as batch_err:
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'error': str(batch_err)})
+                }
+            return {
+                'statusCode': 200,
+                'headers': {**get_cors_headers(), 'Content-Type': 'application/json'},
+                'body': encode(data, bool(body.get('drop_none')))
+            }
+
+        # Saída NDJSON: um registro por página, na ordem em que terminam
+        if body.get('output') == 'ndjson':
+            return {
+                'statusCode': 200,
+                'headers': {**get_cors_headers(), 'Content-Type': NDJSON_CONTENT_TYPE},
+                'body': ''.join(iter_ndjson(body, scrape, context))
+            }
+
+        return scrape(body, context=context)
+
     except Exception as e:
         return {
             'statusCode': 500,
@@ -400,5 +787,16 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': str(e)})
         }
 
-# Define o tempo de espera (em segundos) entre as requisições da recursão para evitar bloqueios
-RATE_LIMIT_SECONDS = 0.5
\ No newline at end of file
+def stream_handler(event, response_stream, context):
+    """
+    Handler para Function URLs com response streaming (InvokeMode RESPONSE_STREAM), para
+    runtimes que entregam um stream gravável (ex.: custom runtime ou Lambda Web Adapter).
+    Cada página é escrita como uma linha NDJSON assim que termina.
+    """
+    body = json.loads(event.get('body', '{}'))
+    for line in iter_ndjson(body, scrape, context):
+        response_stream.write(line.encode('utf-8'))
+    response_stream.close()
+
+# Fim da inicialização do módulo: com STARTUP_PROFILE, registra os tempos de import no log
+startup.finish()
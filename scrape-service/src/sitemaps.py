@@ -0,0 +1,211 @@
+"""
+Sementes do crawl a partir do robots.txt e dos sitemaps do site.
+
+As URLs dos sitemaps vêm do robots.txt (linhas "Sitemap:"), de uma lista informada na
+requisição ou, na falta de ambas, de /sitemap.xml. Cada sitemap é lido em streaming
+(XMLPullParser alimentado pelos blocos da resposta, com descompressão incremental dos
+arquivos .gz), de modo que sitemaps grandes nunca ficam inteiros na memória. Índices de
+sitemaps são seguidos até SITEMAP_MAX_FILES arquivos.
+
+As URLs podem ser filtradas por <lastmod> (since) e as regras Disallow do robots.txt são
+respeitadas. Como na RFC 9309, robots.txt ausente (4xx) libera tudo e robots.txt
+inacessível (5xx ou erro de rede) bloqueia tudo. O robots.txt interpretado (por host) e as
+entradas de cada sitemap ficam em cache no container por SITEMAP_CACHE_TTL segundos.
+Um sitemap que falha (erro de rede ou XML inválido) é registrado em "errors" e os demais
+continuam sendo lidos.
+"""
+import os
+import time
+import zlib
+from datetime import datetime, timezone
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import httpx
+
+from .cache import MemoryStore
+
+# Número máximo de URLs usadas como sementes
+SITEMAP_MAX_URLS = int(os.environ.get('SITEMAP_MAX_URLS', 5000))
+# Número máximo de arquivos de sitemap lidos (índices incluídos)
+SITEMAP_MAX_FILES = int(os.environ.get('SITEMAP_MAX_FILES', 20))
+# Bytes (descomprimidos) lidos de cada sitemap; o protocolo limita a 50 MB
+SITEMAP_MAX_BYTES = int(os.environ.get('SITEMAP_MAX_BYTES', 50 * 1024 * 1024))
+# Validade (segundos) do robots.txt e dos sitemaps em cache
+SITEMAP_CACHE_TTL = float(os.environ.get('SITEMAP_CACHE_TTL', 3600))
+# Sitemaps com mais entradas que isso não são guardados em cache
+SITEMAP_CACHE_MAX_ENTRIES = int(os.environ.get('SITEMAP_CACHE_MAX_ENTRIES', 10000))
+# User-agent usado na avaliação das regras do robots.txt
+ROBOTS_USER_AGENT = os.environ.get('ROBOTS_USER_AGENT', '*')
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+_robots_cache = MemoryStore(256)
+_sitemap_cache = MemoryStore(64)
+
+
+def parse_since(value):
+    """Converte a data de corte (ISO 8601) em datetime com fuso (UTC se omitido); None se vazio"""
+    if value in (None, ''):
+        return None
+    parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _modified_before(lastmod, since):
+    """True se lastmod é anterior à data de corte (lastmod ausente ou inválido nunca é)"""
+    if since is None or not lastmod:
+        return False
+    try:
+        return parse_since(lastmod) < since
+    except ValueError:
+        return False
+
+
+def _cached(store, key):
+    entry = store.get(key)
+    if entry is not None and entry[0] > time.time():
+        return entry[1]
+    return None
+
+
+def get_robots(client, url, timeout=None):
+    """
+    RobotFileParser do host da URL (em cache). robots.txt ausente (4xx) libera tudo;
+    inacessível (5xx ou erro de rede) bloqueia tudo e não fica em cache.
+    """
+    parts = urlsplit(url)
+    base = f'{parts.scheme}://{parts.netloc}'
+    robots = _cached(_robots_cache, base)
+    if robots is None:
+        robots = RobotFileParser(base + '/robots.txt')
+        try:
+            response = client.get(base + '/robots.txt', timeout=timeout)
+        except httpx.HTTPError:
+            robots.disallow_all = True
+            return robots
+        if response.status_code >= 500:
+            robots.disallow_all = True
+            return robots
+        if response.status_code == 200:
+            robots.parse(response.text.splitlines())
+        else:
+            robots.allow_all = True
+        _robots_cache.set(base, (time.time() + SITEMAP_CACHE_TTL, robots))
+    return robots
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _read_events(parser, root):
+    """Entradas (tipo, loc, lastmod) dos elementos <url>/<sitemap> já fechados"""
+    for event, elem in parser.read_events():
+        if event == 'start':
+            if not root:
+                root.append(elem)
+            continue
+        kind = _local_name(elem.tag)
+        if kind not in ('url', 'sitemap'):
+            continue
+        values = {_local_name(child.tag): (child.text or '').strip() for child in elem}
+        if values.get('loc'):
+            yield kind, values['loc'], values.get('lastmod')
+        # Descarta os elementos já lidos: a árvore não cresce com o tamanho do sitemap
+        root[0].clear()
+
+
+def iter_sitemap(client, url, timeout=None, max_bytes=SITEMAP_MAX_BYTES):
+    """Lê um sitemap (XML ou .gz) em streaming gerando (tipo, loc, lastmod)"""
+    with client.stream('GET', url, timeout=timeout) as response:
+        if response.status_code != 200:
+            return
+        parser = XMLPullParser(events=('start', 'end'))
+        root = []
+        decompressor = None
+        size = 0
+        first = True
+        for chunk in response.iter_bytes():
+            if first:
+                # O conteúdo pode vir gzip mesmo sem Content-Encoding (arquivos .xml.gz)
+                if chunk[:2] == _GZIP_MAGIC:
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                first = False
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk, max(1, max_bytes - size))
+            size += len(chunk)
+            parser.feed(chunk)
+            yield from _read_events(parser, root)
+            if size >= max_bytes:
+                return
+        parser.close()
+        yield from _read_events(parser, root)
+
+
+def sitemap_entries(client, url, timeout=None):
+    """
+    Entradas do sitemap, em cache quando não passam de SITEMAP_CACHE_MAX_ENTRIES.
+    Lança ParseError ou httpx.HTTPError (sitemap lido em parte não fica em cache).
+    """
+    entries = _cached(_sitemap_cache, url)
+    if entries is not None:
+        yield from entries
+        return
+    entries = []
+    for entry in iter_sitemap(client, url, timeout):
+        if entries is not None:
+            entries.append(entry)
+            if len(entries) > SITEMAP_CACHE_MAX_ENTRIES:
+                entries = None
+        yield entry
+    if entries is not None:
+        _sitemap_cache.set(url, (time.time() + SITEMAP_CACHE_TTL, entries))
+
+
+def discover_seeds(client, url, sitemaps=None, since=None, max_urls=SITEMAP_MAX_URLS, timeout=None,
+                   user_agent=ROBOTS_USER_AGENT):
+    """
+    URLs de páginas listadas nos sitemaps do site da URL.
+
+    sitemaps: URLs de sitemaps a ler (padrão: as do robots.txt ou /sitemap.xml)
+    since: datetime de corte; URLs (e sitemaps de um índice) com lastmod anterior são ignoradas
+    Retorna (urls, estatísticas); sitemaps com erro vão para estatísticas["errors"].
+    """
+    robots = get_robots(client, url, timeout)
+    if not sitemaps:
+        sitemaps = robots.site_maps() or [urljoin(url, '/sitemap.xml')]
+    stats = {'sitemaps': 0, 'urls': 0, 'skipped_lastmod': 0, 'disallowed': 0, 'truncated': False}
+    queue = list(sitemaps)
+    queued = set(queue)
+    seen = set()
+    seeds = []
+    while queue and len(seeds) < max_urls:
+        if stats['sitemaps'] >= SITEMAP_MAX_FILES:
+            stats['truncated'] = True
+            break
+        sitemap_url = queue.pop(0)
+        stats['sitemaps'] += 1
+        try:
+            for kind, loc, lastmod in sitemap_entries(client, sitemap_url, timeout):
+                if _modified_before(lastmod, since):
+                    stats['skipped_lastmod'] += 1
+                elif kind == 'sitemap':
+                    if loc not in queued:
+                        queued.add(loc)
+                        queue.append(loc)
+                elif loc not in seen:
+                    seen.add(loc)
+                    if not robots.can_fetch(user_agent, loc):
+                        stats['disallowed'] += 1
+                        continue
+                    seeds.append(loc)
+                    if len(seeds) >= max_urls:
+                        stats['truncated'] = True
+                        break
+        except (ParseError, httpx.HTTPError) as e:
+            # As URLs lidas antes da falha são mantidas; os demais sitemaps continuam
+            stats.setdefault('errors', []).append({'sitemap': sitemap_url, 'error': str(e) or type(e).__name__})
+    stats['urls'] = len(seeds)
+    return seeds, stats
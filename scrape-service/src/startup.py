@@ -0,0 +1,115 @@
+"""
+Modo de profiling da inicialização (cold start), ligado com STARTUP_PROFILE=true.
+
+begin() instala um finder em sys.meta_path que mede o tempo de execução de cada módulo
+importado a partir daí; finish() remove o finder e escreve no log (stdout -> CloudWatch)
+uma linha JSON com o tempo até o lambda_handler ficar pronto e os módulos mais lentos:
+
+    {"startup": {"ready_ms": 212.4, "imports": [{"module": "httpx", "ms": 81.2, "self_ms": 0.6}, ...]}}
+
+"ms" inclui os imports feitos pelo módulo e "self_ms" apenas a execução do próprio módulo.
+Com o modo desligado, begin() e finish() não fazem nada.
+
+Bibliotecas usadas só por parte das requisições (PyPDF2, openpyxl, html2text, jsonpath_ng)
+são importadas dentro das funções que as usam, e não no topo dos módulos, para ficarem
+fora do cold start.
+"""
+import json
+import os
+import sys
+import time
+
+# Liga o profiling dos imports na inicialização do container
+STARTUP_PROFILE = os.environ.get('STARTUP_PROFILE', 'false').lower() in ('1', 'true', 'yes')
+# Número de módulos listados no relatório
+STARTUP_PROFILE_TOP = int(os.environ.get('STARTUP_PROFILE_TOP', 20))
+
+_profiler = None
+
+
+class _TimedLoader:
+    """Envolve o loader original medindo exec_module; os demais atributos são delegados"""
+
+    def __init__(self, loader, name, profiler):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # O módulo passa a expor o loader original (usado por importlib.resources, pkgutil...)
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._profiler.enter()
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler.leave(self._name, time.perf_counter() - started)
+
+
+class ImportProfiler:
+    """Finder que não localiza módulos: só envolve o loader encontrado pelos demais finders"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}
+        # Tempo gasto em imports aninhados de cada import em andamento
+        self.children = []
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, name, self)
+        return spec
+
+    def enter(self):
+        self.children.append(0.0)
+
+    def leave(self, name, elapsed):
+        nested = self.children.pop()
+        if self.children:
+            self.children[-1] += elapsed
+        self.timings[name] = (elapsed, elapsed - nested)
+
+    def report(self, top=STARTUP_PROFILE_TOP):
+        imports = sorted(self.timings.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        return {
+            'ready_ms': round((time.perf_counter() - self.started) * 1000, 1),
+            'imports': [{'module': name, 'ms': round(total * 1000, 1), 'self_ms': round(own * 1000, 1)}
+                        for name, (total, own) in imports]
+        }
+
+
+def begin():
+    """Começa a medir os imports (somente com STARTUP_PROFILE ligado)"""
+    global _profiler
+    if STARTUP_PROFILE and _profiler is None:
+        _profiler = ImportProfiler()
+        sys.meta_path.insert(0, _profiler)
+
+
+def finish():
+    """Para a medição e escreve o relatório no log; retorna o relatório (ou None se desligado)"""
+    global _profiler
+    if _profiler is None:
+        return None
+    if _profiler in sys.meta_path:
+        sys.meta_path.remove(_profiler)
+    report = _profiler.report()
+    _profiler = None
+    print(json.dumps({'startup': report}))
+    return report
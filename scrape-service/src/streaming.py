@@ -0,0 +1,106 @@
+"""
+Saída em streaming (NDJSON): um registro JSON por página, emitido assim que a página termina.
+
+iter_ndjson é um gerador local (usado pelos testes e pelo lambda_handler); o mesmo gerador
+alimenta o stream_handler quando a Function URL usa response streaming. O processamento
+roda em uma thread separada e as páginas chegam por uma fila, de modo que a primeira linha
+sai logo após a página raiz e o crawl inteiro nunca é mantido em memória. Ao final de uma
+resposta 200, uma última linha {"type": "summary", ...} traz os relatórios do crawl
+(continuation_token, checkpoint, sitemap, near_duplicates...).
+"""
+import json
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+# Campos do resultado de cada página repassados ao registro NDJSON
+RECORD_FIELDS = ('title', 'content', 'type', 'images', 'error', 'status', 'truncated', 'duplicate_of')
+
+# Campos da resposta repassados à linha final de resumo
+SUMMARY_FIELDS = ('continuation_token', 'checkpoint', 'incremental', 'sitemap', 'near_duplicates',
+                  'link_rules', 'debug_timings')
+
+_DONE = object()
+
+# Threads persistentes: cada uma mantém seu event loop e cliente HTTP entre invocações
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ndjson')
+    return _executor
+
+
+def page_record(url, depth, parent, node):
+    """Monta o registro NDJSON de uma página (url, depth, parent, title, content, error...)"""
+    record = {"url": url, "depth": depth, "parent": parent}
+    for field in RECORD_FIELDS:
+        if field in node:
+            record[field] = node[field]
+    return record
+
+
+def _fallback_record(body, response):
+    """Registro único para respostas que não passaram pelo processamento de páginas (erros, JSON)"""
+    record = {"url": body.get('url'), "depth": 0, "parent": None}
+    try:
+        data = json.loads(response.get('body') or '{}')
+    except ValueError:
+        data = response.get('body')
+    if response.get('statusCode') != 200:
+        record["error"] = data.get('error') if isinstance(data, dict) else data
+        record["statusCode"] = response.get('statusCode')
+    else:
+        record["content"] = data
+    return record
+
+
+def summary_record(response, pages):
+    """Linha final de resumo: número de páginas emitidas e os relatórios da resposta"""
+    record = {"type": "summary", "pages": pages}
+    try:
+        data = json.loads(response.get('body') or '{}')
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        for field in SUMMARY_FIELDS:
+            if field in data:
+                record[field] = data[field]
+    return record
+
+
+def iter_ndjson(body, scrape, context=None):
+    """
+    Gera as linhas NDJSON do processamento de `body` por scrape(body, on_result=..., context=...).
+    O context da invocação define o prazo do checkpoint, cujo token sai na linha de resumo.
+    """
+    records = queue.Queue()
+
+    def emit(url, depth, parent, node):
+        records.put(page_record(url, depth, parent, node))
+
+    def worker():
+        try:
+            response = scrape(body, on_result=emit, context=context)
+        except Exception as e:
+            response = {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
+        records.put((_DONE, response))
+
+    get_executor().submit(worker)
+
+    emitted = 0
+    while True:
+        item = records.get()
+        if isinstance(item, tuple) and item[0] is _DONE:
+            response = item[1]
+            break
+        emitted += 1
+        yield json.dumps(item, ensure_ascii=False) + '\n'
+
+    if response.get('statusCode') != 200 or not emitted:
+        yield json.dumps(_fallback_record(body, response), ensure_ascii=False) + '\n'
+    else:
+        yield json.dumps(summary_record(response, emitted), ensure_ascii=False) + '\n'
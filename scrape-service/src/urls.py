@@ -0,0 +1,224 @@
+"""
+Canonicalização de URLs e conjuntos de URLs visitadas usados na recursão.
+
+As URLs são buscadas e usadas como chave na árvore de links exatamente como aparecem na
+página (já absolutas): servidores podem depender da ordem dos parâmetros ou de flags sem
+valor (?foo). A forma canônica serve apenas para comparar URLs; canonicalize() só aplica
+transformações que não mudam o recurso apontado:
+
+    - esquema e host em minúsculas, porta padrão removida (:80 em http, :443 em https)
+    - fragmento (#secao) removido
+    - parâmetros de rastreamento (utm_*, gclid, fbclid...) removidos
+    - query ordenada
+
+key() parte da URL canônica e aplica as equivalências "prováveis", usadas apenas para
+saber se a página já foi visitada: barra final (trailing_slash), caixa do caminho
+(lowercase_path) e http/https (ignore_scheme).
+
+Para crawls grandes, o conjunto de URLs visitadas pode ser um BloomFilter (memória fixa,
+com uma pequena taxa de falsos positivos: páginas novas ignoradas como já visitadas).
+"""
+import base64
+import hashlib
+import math
+import os
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Parâmetros de rastreamento removidos das URLs (sufixo * = prefixo)
+URL_TRACKING_PARAMS = os.environ.get(
+    'URL_TRACKING_PARAMS',
+    'utm_*,gclid,dclid,fbclid,msclkid,yclid,mc_cid,mc_eid,_ga,_gl,igshid,ref_src'
+)
+# Política da barra final na comparação: 'strip' (/a/ == /a), 'add' (/a == /a/) ou 'keep'
+URL_TRAILING_SLASH = os.environ.get('URL_TRAILING_SLASH', 'strip')
+# Compara caminhos sem diferenciar maiúsculas/minúsculas (/PAGE == /page)
+URL_LOWERCASE_PATH = os.environ.get('URL_LOWERCASE_PATH', 'false').lower() in ('1', 'true', 'yes')
+# Trata http:// e https:// da mesma URL como a mesma página
+URL_IGNORE_SCHEME = os.environ.get('URL_IGNORE_SCHEME', 'true').lower() in ('1', 'true', 'yes')
+# Conjunto de URLs visitadas: 'set' (exato) ou 'bloom' (memória fixa)
+CRAWL_SEEN_SET = os.environ.get('CRAWL_SEEN_SET', 'set')
+# Capacidade e taxa de falsos positivos do Bloom filter
+BLOOM_CAPACITY = int(os.environ.get('BLOOM_CAPACITY', 100000))
+BLOOM_ERROR_RATE = float(os.environ.get('BLOOM_ERROR_RATE', 0.001))
+
+TRAILING_SLASH_POLICIES = ('strip', 'add', 'keep')
+SEEN_SET_KINDS = ('set', 'bloom')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _split_names(value):
+    if isinstance(value, str):
+        value = value.split(',')
+    return [name.strip().lower() for name in value if name and name.strip()]
+
+
+class UrlCanonicalizer:
+    """Regras de canonicalização de uma requisição"""
+
+    def __init__(self, tracking_params=URL_TRACKING_PARAMS, trailing_slash=URL_TRAILING_SLASH,
+                 lowercase_path=URL_LOWERCASE_PATH, ignore_scheme=URL_IGNORE_SCHEME, enabled=True):
+        if trailing_slash not in TRAILING_SLASH_POLICIES:
+            raise ValueError(f"trailing_slash deve ser um de: {', '.join(TRAILING_SLASH_POLICIES)}")
+        names = _split_names(tracking_params or [])
+        self.tracking_names = frozenset(name for name in names if not name.endswith('*'))
+        self.tracking_prefixes = tuple(name[:-1] for name in names if name.endswith('*'))
+        self.trailing_slash = trailing_slash
+        self.lowercase_path = bool(lowercase_path)
+        self.ignore_scheme = bool(ignore_scheme)
+        self.enabled = enabled
+
+    @classmethod
+    def from_params(cls, body):
+        """
+        Regras a partir do parâmetro "url_canonicalization" (objeto com tracking_params,
+        trailing_slash, lowercase_path e ignore_scheme; false desliga). Lança ValueError.
+        """
+        params = body.get('url_canonicalization')
+        if params is None or params is True:
+            return DEFAULT_CANONICALIZER
+        if params is False:
+            return cls(enabled=False)
+        if not isinstance(params, dict):
+            raise ValueError("url_canonicalization deve ser um objeto ou booleano")
+        return cls(
+            tracking_params=params.get('tracking_params', URL_TRACKING_PARAMS),
+            trailing_slash=params.get('trailing_slash', URL_TRAILING_SLASH),
+            lowercase_path=params.get('lowercase_path', URL_LOWERCASE_PATH),
+            ignore_scheme=params.get('ignore_scheme', URL_IGNORE_SCHEME),
+        )
+
+    def is_tracking(self, name):
+        name = name.lower()
+        return name in self.tracking_names or name.startswith(self.tracking_prefixes)
+
+    def canonicalize(self, url):
+        """URL normalizada (mesmo recurso); URLs que não são http(s) voltam inalteradas"""
+        if not self.enabled:
+            return url
+        try:
+            parts = urlsplit(url)
+            port = parts.port
+        except ValueError:
+            return url
+        scheme = parts.scheme.lower()
+        if scheme not in DEFAULT_PORTS or not parts.hostname:
+            return url
+        netloc = parts.hostname.lower()
+        if ':' in netloc:
+            netloc = f'[{netloc}]'
+        if port is not None and port != DEFAULT_PORTS[scheme]:
+            netloc = f'{netloc}:{port}'
+        if parts.username or parts.password:
+            userinfo = parts.username or ''
+            if parts.password:
+                userinfo = f'{userinfo}:{parts.password}'
+            netloc = f'{userinfo}@{netloc}'
+        query = parts.query
+        if query:
+            params = [(name, value) for name, value in parse_qsl(query, keep_blank_values=True)
+                      if not self.is_tracking(name)]
+            query = urlencode(sorted(params))
+        return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+    def key(self, url):
+        """Chave de comparação de URLs já visitadas"""
+        return self._key(self.canonicalize(url))
+
+    def _key(self, url):
+        if not self.enabled:
+            return url
+        scheme, netloc, path, query, _ = urlsplit(url)
+        if scheme not in DEFAULT_PORTS:
+            return url
+        if self.ignore_scheme:
+            scheme = 'https'
+        if self.lowercase_path:
+            path = path.lower()
+        if self.trailing_slash == 'strip' and len(path) > 1:
+            path = path.rstrip('/') or '/'
+        elif self.trailing_slash == 'add' and not path.endswith('/'):
+            path += '/'
+        return urlunsplit((scheme, netloc, path, query, ''))
+
+    def dedupe(self, links):
+        """Pares (URL original, chave) sem chaves repetidas, na ordem original dos links"""
+        seen = set()
+        result = []
+        for link in links:
+            key = self.key(link)
+            if key not in seen:
+                seen.add(key)
+                result.append((link, key))
+        return result
+
+
+DEFAULT_CANONICALIZER = UrlCanonicalizer()
+
+
+class BloomFilter:
+    """
+    Conjunto aproximado de strings com memória fixa (add / in).
+    Dimensionado para `capacity` itens com taxa de falsos positivos `error_rate`.
+    """
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        capacity = max(1, int(capacity))
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: h1 + i * h2 a partir de um único digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        new = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+
+    def __contains__(self, item):
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+
+def make_seen_set(kind=None, capacity=None):
+    """Conjunto de URLs visitadas: set() ou BloomFilter (kind 'bloom')"""
+    kind = kind or CRAWL_SEEN_SET
+    if kind not in SEEN_SET_KINDS:
+        raise ValueError(f"seen_set deve ser um de: {', '.join(SEEN_SET_KINDS)}")
+    if kind == 'bloom':
+        return BloomFilter(capacity or BLOOM_CAPACITY)
+    return set()
+
+
+def dump_seen_set(seen):
+    """Conjunto de URLs visitadas em formato JSON (checkpoint do crawl)"""
+    if isinstance(seen, BloomFilter):
+        return {'bloom': base64.b64encode(bytes(seen.bits)).decode('ascii'), 'size': seen.size,
+                'hashes': seen.hashes, 'count': seen.count}
+    return sorted(seen)
+
+
+def load_seen_set(data):
+    """Inverso de dump_seen_set"""
+    if isinstance(data, dict):
+        bloom = BloomFilter.__new__(BloomFilter)
+        bloom.bits = bytearray(base64.b64decode(data['bloom']))
+        bloom.size, bloom.hashes, bloom.count = data['size'], data['hashes'], data['count']
+        return bloom
+    return set(data)
@@ -0,0 +1,207 @@
+"""
+Conversão de planilhas XLSX em tabela (HTML, Markdown, CSV ou NDJSON) em streaming.
+
+A planilha é aberta no modo read-only do openpyxl e cada linha é escrita diretamente
+na saída, sem montar a lista de linhas em memória. Com um stream de saída (arquivo,
+resposta em streaming) o texto não é acumulado e o consumo de memória não depende do
+número de linhas; sem ele, o texto devolvido é limitado por max_chars (XLSX_MAX_CHARS).
+A primeira linha de cada aba é usada como cabeçalho.
+"""
+import abc
+import csv
+import io
+import json
+import os
+
+# Limite padrão de caracteres da saída (0 = sem limite)
+XLSX_MAX_CHARS = int(os.environ.get('XLSX_MAX_CHARS', 2000000))
+
+OUTPUT_FORMATS = ('html', 'markdown', 'csv', 'ndjson')
+
+
+class _Output:
+    """Saída com limite de caracteres, escrita em um stream (padrão: buffer em memória)"""
+
+    def __init__(self, max_chars=None, stream=None):
+        self.buffered = stream is None
+        self.stream = io.StringIO() if stream is None else stream
+        self.size = 0
+        self.max_chars = max_chars
+        self.full = False
+        self.truncated = False
+
+    def write(self, text, partial=False):
+        """
+        Escreve o texto inteiro ou nada; retorna False quando o limite foi atingido.
+        Com partial, o início do texto que cabe no limite é escrito (primeira linha da tabela).
+        """
+        if self.full:
+            return False
+        if self.max_chars and self.size + len(text) > self.max_chars:
+            if partial:
+                self.append(text[:max(self.max_chars - self.size, 0)])
+            self.full = self.truncated = True
+            return False
+        self.append(text)
+        return True
+
+    def append(self, text):
+        """Escreve sem verificar o limite (fechamento da tabela)"""
+        self.stream.write(text)
+        self.size += len(text)
+
+    def getvalue(self):
+        return self.stream.getvalue() if self.buffered else None
+
+
+class _Table(abc.ABC):
+    """Escritor de tabela: recebe o cabeçalho de cada aba e as linhas, uma a uma"""
+
+    def __init__(self, out):
+        self.out = out
+        self.started = False
+        self.pending = ()
+
+    def begin(self):
+        pass
+
+    def header(self, header):
+        # Por padrão o cabeçalho só é escrito junto com a primeira linha de dados
+        self.pending = header
+
+    @abc.abstractmethod
+    def row(self, header, row, partial=False):
+        """Escreve a linha; retorna False quando o limite de caracteres foi atingido"""
+
+    def end(self):
+        pass
+
+
+class _HtmlTable(_Table):
+    def begin(self):
+        self.out.append('<table border="1"><tr>')
+
+    def row(self, header, row, partial=False):
+        text = ''
+        if not self.started:
+            self.started = True
+            text = ''.join(f'<th>{k}</th>' for k in self.pending) + '</tr>'
+        return self.out.write(text + '<tr>' + ''.join(f'<td>{v}</td>' for v in row) + '</tr>', partial)
+
+    def end(self):
+        # O fechamento da tabela é escrito mesmo após atingir o limite
+        self.out.append('</table>')
+
+
+class _MarkdownTable(_Table):
+    def row(self, header, row, partial=False):
+        lines = []
+        if not self.started:
+            self.started = True
+            lines.append('| ' + ' | '.join(str(h) for h in self.pending) + ' |')
+            lines.append('| ' + ' | '.join(['---'] * len(self.pending)) + ' |')
+        lines.append('| ' + ' | '.join(str(v) for v in row) + ' |')
+        return self.out.write(('\n' if self.out.size else '') + '\n'.join(lines), partial)
+
+    def end(self):
+        if not self.out.size:
+            self.out.append("Empty spreadsheet")
+
+
+class _CsvTable(_Table):
+    def __init__(self, out):
+        super().__init__(out)
+        self.line = io.StringIO()
+        self.writer = csv.writer(self.line, lineterminator='\n')
+
+    def _format(self, values):
+        self.line.seek(0)
+        self.line.truncate()
+        self.writer.writerow(values)
+        return self.line.getvalue()
+
+    def header(self, header):
+        if not self.started:
+            self.started = True
+            self.out.write(self._format(header), partial=True)
+
+    def row(self, header, row, partial=False):
+        return self.out.write(self._format(row), partial)
+
+
+class _NdjsonTable(_Table):
+    def row(self, header, row, partial=False):
+        record = dict(zip((str(h) for h in header), row))
+        return self.out.write(json.dumps(record, ensure_ascii=False, default=str) + '\n', partial)
+
+
+_WRITERS = {'html': _HtmlTable, 'markdown': _MarkdownTable, 'csv': _CsvTable, 'ndjson': _NdjsonTable}
+
+
+def _select_sheets(workbook, sheets):
+    """Abas selecionadas por nome ou índice (0-based); None = todas"""
+    if sheets is None:
+        return list(workbook.worksheets)
+    if not isinstance(sheets, list):
+        sheets = [sheets]
+    selected = []
+    for sheet in sheets:
+        if isinstance(sheet, int):
+            if not 0 <= sheet < len(workbook.worksheets):
+                raise ValueError(f"Aba inexistente: {sheet}")
+            selected.append(workbook.worksheets[sheet])
+        elif sheet in workbook.sheetnames:
+            selected.append(workbook[sheet])
+        else:
+            raise ValueError(f"Aba inexistente: {sheet}")
+    return selected
+
+
+def convert_xlsx(content, output_format='markdown', sheets=None, max_rows=None, max_cols=None, max_chars=None,
+                 stream=None):
+    """
+    Converte a planilha em texto no formato output_format ('html', 'markdown', 'csv' ou 'ndjson').
+
+    sheets: nomes ou índices das abas (padrão: todas)
+    max_rows: linhas de dados lidas por aba (padrão: todas)
+    max_cols: colunas lidas por linha (padrão: todas)
+    max_chars: limite de caracteres da saída (padrão: XLSX_MAX_CHARS; 0 = sem limite). Só
+               linhas inteiras são escritas, exceto a primeira, cortada no limite se não couber
+    stream: objeto com write() que recebe a saída à medida que é gerada; o texto não é acumulado
+
+    Retorna (texto, estatísticas {"sheets", "rows", "truncated"}); o texto é None com stream.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato de planilha inválido: {output_format}")
+    from openpyxl import load_workbook
+
+    out = _Output(max_chars if max_chars is not None else XLSX_MAX_CHARS, stream)
+    writer = _WRITERS[output_format](out)
+    workbook = load_workbook(io.BytesIO(content), read_only=True)
+    rows = 0
+    names = []
+    try:
+        writer.begin()
+        for sheet in _select_sheets(workbook, sheets):
+            names.append(sheet.title)
+            values = sheet.iter_rows(values_only=True, max_col=max_cols)
+            header = next(values, None)
+            if header is None:
+                continue
+            writer.header(header)
+            for count, row in enumerate(values):
+                if max_rows is not None and count >= max_rows:
+                    out.truncated = True
+                    break
+                if len(row) < len(header):
+                    # Células vazias no fim da linha não são devolvidas pelo modo read-only
+                    row = row + (None,) * (len(header) - len(row))
+                if not writer.row(header, row, partial=not rows):
+                    break
+                rows += 1
+            if out.full:
+                break
+        writer.end()
+    finally:
+        workbook.close()
+    return out.getvalue(), {"sheets": names, "rows": rows, "truncated": out.truncated}
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+import respx
+
+from src import batch
+from src.scrape_lambda import lambda_handler
+
+
+class FakeContext:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def invoke(body, context=None):
+    response = lambda_handler({'body': json.dumps(body)}, context)
+    return response['statusCode'], json.loads(response['body'])
+
+
+@respx.mock
+def test_batch_per_url_results_and_overrides():
+    respx.get('https://example.com/a').mock(
+        return_value=httpx.Response(200, text='<html><title>A</title><body><p>texto A</p></body></html>')
+    )
+    respx.get('https://example.com/b').mock(
+        return_value=httpx.Response(200, text='<html><title>B</title><body><p>texto B</p></body></html>')
+    )
+    status, body = invoke({
+        'format': 'markdown',
+        'urls': ['https://example.com/a', {'url': 'https://example.com/b', 'format': 'html'}],
+    })
+
+    assert status == 200
+    assert [r['url'] for r in body['results']] == ['https://example.com/a', 'https://example.com/b']
+    assert all(r['status'] == 'ok' for r in body['results'])
+    assert body['results'][0]['result']['markdown'].startswith('# A')
+    assert body['results'][1]['result']['resumo_html'] == '<p>texto B</p>\n'
+    assert body['unprocessed'] == []
+
+
+@respx.mock
+def test_batch_reports_errors_per_url():
+    respx.get('https://example.com/a').mock(return_value=httpx.Response(200, text='<html></html>'))
+    respx.get('https://example.com/falha').mock(side_effect=httpx.ConnectError('falha'))
+    status, body = invoke({'urls': ['https://example.com/a', 'https://example.com/falha']})
+
+    assert status == 200
+    assert [r['status'] for r in body['results']] == ['ok', 'error']
+    assert body['results'][1]['statusCode'] == 500
+
+
+@respx.mock
+def test_batch_deadline_returns_unprocessed(monkeypatch):
+    def slow(request):
+        time.sleep(0.3)
+        return httpx.Response(200, text='<html></html>')
+
+    respx.get(url__startswith='https://example.com/').mock(side_effect=slow)
+    monkeypatch.setattr(batch, 'BATCH_DEADLINE_MARGIN_MS', 0)
+    urls = [f'https://example.com/{i}' for i in range(6)]
+    status, body = invoke({'urls': urls, 'max_batch_concurrency': 2, 'rate_limit': 0},
+                          FakeContext(remaining_ms=batch.BATCH_DEADLINE_MARGIN_MS + 450))
+
+    assert status == 200
+    assert body['deadline_reached'] is True
+    assert [r['url'] for r in body['results']] == urls[:2]
+    assert body['unprocessed'] == urls[2:]
+
+
+@respx.mock
+def test_batch_items_stop_at_the_deadline(monkeypatch):
+    async def slow(request):
+        await asyncio.sleep(2)
+        return httpx.Response(200, text='<html></html>')
+
+    page = '<html><title>Raiz</title><body><a href="https://lento.example/a">a</a></body></html>'
+    respx.get('https://lento.example/').mock(return_value=httpx.Response(200, text=page))
+    respx.get('https://lento.example/a').mock(side_effect=slow)
+    monkeypatch.setattr(batch, 'BATCH_DEADLINE_MARGIN_MS', 400)
+    start = time.monotonic()
+    status, body = invoke({'urls': ['https://lento.example/'], 'format': 'markdown', 'max_level': 1,
+                           'cache': False, 'rate_limit': 0}, FakeContext(remaining_ms=700))
+
+    # A recursão do item para no prazo e o item é concluído na margem, sem ficar no pool
+    assert time.monotonic() - start < 1
+    assert status == 200 and body['unprocessed'] == []
+    result = body['results'][0]['result']
+    assert result['links'] == {'https://lento.example/a': {'status': 'pending'}}
+    assert result['checkpoint']['pending'] == 1
+
+
+
+@respx.mock
+def test_batch_items_share_the_host_rate_limit():
+    started = []
+
+    def record(request):
+        started.append(time.monotonic())
+        return httpx.Response(200, text='<html></html>')
+
+    respx.get(url__startswith='https://mesmo-host.example/').mock(side_effect=record)
+    respx.get(url__startswith='https://outro-host.example/').mock(side_effect=record)
+    urls = [f'https://mesmo-host.example/{i}' for i in range(3)]
+    status, body = invoke({'urls': urls, 'max_batch_concurrency': 3, 'rate_limit': 0.2, 'cache': False})
+
+    assert status == 200 and len(body['results']) == 3
+    # As requisições iniciais dos itens, em paralelo, ficam espaçadas pelo intervalo do host
+    gaps = [later - earlier for earlier, later in zip(sorted(started), sorted(started)[1:])]
+    assert all(gap >= 0.15 for gap in gaps)
+
+    started.clear()
+    start = time.monotonic()
+    invoke({'urls': ['https://outro-host.example/a', 'https://mesmo-host.example/a'], 'rate_limit': 0.2,
+            'cache': False})
+    assert time.monotonic() - start < 0.15
+
+@pytest.mark.parametrize("urls", ['https://example.com', [], [{'sem_url': True}]])
+def test_batch_invalid_urls(urls):
+    status, _ = invoke({'urls': urls})
+    assert status == 400
@@ -0,0 +1,138 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from src import cache as cache_module
+from src import scrape_lambda
+from src.cache import DiskStore, MemoryStore, ResponseCache, S3Store, TieredStore, freshness_lifetime
+from src.scrape_lambda import lambda_handler
+
+PAGE = '<html><title>Bula</title><body><p>Conteúdo da bula</p></body></html>'
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = ResponseCache(MemoryStore())
+    monkeypatch.setattr(cache_module, '_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def extract_calls(monkeypatch):
+    calls = []
+    original = scrape_lambda.extract_page
+
+    def counting_extract_page(*args, **kwargs):
+        calls.append(args[1])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(scrape_lambda, 'extract_page', counting_extract_page)
+    return calls
+
+
+def scrape(url='https://example.com/bula', **params):
+    event = {'body': json.dumps({'url': url, 'format': 'markdown', **params})}
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+def test_memory_store_lru():
+    store = MemoryStore(max_entries=2)
+    store.set('a', b'1')
+    store.set('b', b'2')
+    store.get('a')
+    store.set('c', b'3')
+    assert store.get('b') is None
+    assert store.get('a') == b'1'
+
+
+def test_memory_store_bounded_by_bytes():
+    store = MemoryStore(max_entries=100, max_bytes=10)
+    store.set('a', b'1234')
+    store.set('b', b'5678')
+    store.get('a')
+    store.set('c', b'90ab')
+    # 12 bytes não cabem: sai o registro menos usado (b)
+    assert store.get('b') is None
+    assert store.get('a') == b'1234' and store.get('c') == b'90ab'
+    assert store.size == 8
+    store.set('a', b'12')
+    assert store.size == 6
+    store.set('grande', b'x' * 11)
+    assert store.get('grande') is None and store.size == 6
+
+
+def test_disk_store_and_tiers(tmp_path):
+    disk = DiskStore(str(tmp_path))
+    disk.set('chave', b'valor')
+    tiered = TieredStore(MemoryStore(), disk)
+    assert tiered.get('chave') == b'valor'
+    # Promovido para a memória
+    assert tiered.memory.get('chave') == b'valor'
+    tiered.delete('chave')
+    assert disk.get('chave') is None
+
+
+def test_s3_store():
+    moto = pytest.importorskip('moto')
+    boto3 = pytest.importorskip('boto3')
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='cache-bucket')
+        store = S3Store('cache-bucket', 'cache/', client=client)
+        assert store.get('chave') is None
+        store.set('chave', b'valor')
+        assert store.get('chave') == b'valor'
+
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({'cache-control': 'public, max-age=60'}) == 60
+    assert freshness_lifetime({'cache-control': 'max-age=60, no-cache'}) == 0
+    assert freshness_lifetime({}) == 0
+
+
+@respx.mock
+def test_revalidation_304_skips_parsing(fresh_cache, extract_calls):
+    route = respx.get('https://example.com/bula').mock(side_effect=[
+        httpx.Response(200, text=PAGE, headers={'ETag': '"v1"', 'Content-Type': 'text/html'}),
+        httpx.Response(304, headers={'ETag': '"v1"'}),
+    ])
+    first = scrape()
+    second = scrape()
+
+    assert route.calls[1].request.headers['If-None-Match'] == '"v1"'
+    assert second['markdown'] == first['markdown']
+    assert second['title'] == 'Bula'
+    assert len(extract_calls) == 1
+    assert fresh_cache.stats['revalidated'] == 1
+
+
+@respx.mock
+def test_fresh_response_served_without_request(fresh_cache):
+    route = respx.get('https://example.com/bula').mock(
+        return_value=httpx.Response(200, text=PAGE, headers={'Cache-Control': 'max-age=300',
+                                                             'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+    )
+    scrape()
+    scrape()
+    assert route.call_count == 1
+    assert fresh_cache.stats['hits'] == 1
+
+
+@respx.mock
+def test_no_store_and_cache_disabled(fresh_cache):
+    route = respx.get('https://example.com/bula').mock(
+        return_value=httpx.Response(200, text=PAGE, headers={'Cache-Control': 'no-store, max-age=300'})
+    )
+    scrape()
+    scrape()
+    assert route.call_count == 2
+
+    route.mock(return_value=httpx.Response(200, text=PAGE, headers={'Cache-Control': 'max-age=300'}))
+    scrape(cache=False)
+    scrape(cache=False)
+    assert route.call_count == 4
+    assert fresh_cache.stats['hits'] == 0
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import httpx
+import respx
+
+from src.crawler import crawl, filter_links
+
+
+def process_response(response, url):
+    """Trata toda resposta como página HTML cujos links vêm no corpo, um por linha"""
+    child_links = [l for l in response.text.splitlines() if l]
+    return {"title": url, "links": {}}, child_links
+
+
+def test_filter_links_keeps_order():
+    links = ['https://a.com/1.pdf', 'https://a.com/2.doc', 'https://a.com/3.pdf']
+    assert filter_links(links, '\\.pdf$') == ['https://a.com/1.pdf', 'https://a.com/3.pdf']
+    assert filter_links(links) == links
+
+
+@respx.mock
+def test_crawl_fetches_level_concurrently():
+    async def slow_page(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, text='')
+
+    links = [f'https://example.com/{i}' for i in range(8)]
+    for link in links:
+        respx.get(link).mock(side_effect=slow_page)
+
+    start = time.perf_counter()
+    tree = crawl(links, process_response, max_level=1, max_concurrency=8)
+    elapsed = time.perf_counter() - start
+
+    assert list(tree.keys()) == links
+    assert elapsed < 0.2 * len(links) / 2
+
+
+@respx.mock
+def test_crawl_bfs_tree_and_dedupe():
+    respx.get('https://example.com/a').mock(
+        return_value=httpx.Response(200, text='https://example.com/b\nhttps://example.com/c')
+    )
+    respx.get('https://example.com/b').mock(
+        return_value=httpx.Response(200, text='https://example.com/a')
+    )
+    c_route = respx.get('https://example.com/c').mock(return_value=httpx.Response(200, text=''))
+
+    processed = {'https://example.com/'}
+    tree = crawl(
+        ['https://example.com/a', 'https://example.com/b', 'https://example.com/a'],
+        process_response, max_level=2, processed_urls=processed
+    )
+
+    # b é buscado uma única vez (nível 1) e aparece como já visitado no nível 2
+    assert tree['https://example.com/b']['title'] == 'https://example.com/b'
+    assert tree['https://example.com/a']['links']['https://example.com/b'] == {"status": "max_level_reached"}
+    assert tree['https://example.com/a']['links']['https://example.com/c']['title'] == 'https://example.com/c'
+    assert tree['https://example.com/b']['links']['https://example.com/a'] == {"status": "max_level_reached"}
+    assert c_route.call_count == 1
+    assert {'https://example.com/a', 'https://example.com/b', 'https://example.com/c'} <= processed
+
+
+@respx.mock
+def test_crawl_respects_max_recursion_links_and_errors():
+    respx.get('https://example.com/1').mock(side_effect=httpx.ConnectError("falha"))
+    links = ['https://example.com/1', 'https://example.com/2']
+
+    counter = {'count': 0}
+    tree = crawl(links, process_response, max_level=1, max_recursion_links=1,
+                 current_recursion_count=counter)
+
+    assert 'error' in tree['https://example.com/1']
+    assert tree['https://example.com/2'] == {"status": "max_recursion_links_reached"}
+    assert counter['count'] == 1
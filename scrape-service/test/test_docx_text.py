@@ -0,0 +1,102 @@
+import io
+import json
+import zipfile
+
+import httpx
+import respx
+
+from src.docx_text import extract_docx
+from src.scrape_lambda import lambda_handler, process_document
+
+BASE = 'https://documentos.example'
+DOCX_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def paragraph(*runs):
+    return '<w:p>' + ''.join(f'<w:r>{run}</w:r>' for run in runs) + '</w:p>'
+
+
+def text(value):
+    return f'<w:t xml:space="preserve">{value}</w:t>'
+
+
+def table(rows):
+    cells = lambda row: ''.join(f'<w:tc>{paragraph(text(cell))}</w:tc>' for cell in row)
+    return '<w:tbl>' + ''.join(f'<w:tr>{cells(row)}</w:tr>' for row in rows) + '</w:tbl>'
+
+
+def make_docx(body, header=None, footer=None):
+    """DOCX mínimo montado à mão (com uma imagem embutida que a extração não deve ler)"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', '<?xml version="1.0"?><Types/>')
+        archive.writestr('word/document.xml', f'<w:document {NS}><w:body>{body}<w:sectPr/></w:body></w:document>')
+        if header:
+            archive.writestr('word/header1.xml', f'<w:hdr {NS}>{header}</w:hdr>')
+        if footer:
+            archive.writestr('word/footer1.xml', f'<w:ftr {NS}>{footer}</w:ftr>')
+        archive.writestr('word/media/image1.png', b'\x89PNG' + bytes(4096))
+    return buffer.getvalue()
+
+
+BODY = (paragraph(text('Relatório'), '<w:tab/>', text('2024'))
+        + paragraph(text('Primeira linha'), '<w:br/>', text('segunda linha'))
+        + table([['Produto', 'Preço'], ['Caneta', '2,50']])
+        + paragraph(text('Fim &amp; conclusão')))
+
+
+# Saída do docx2txt.process para BODY (a extração segue o mesmo layout)
+DOCX2TXT_TEXT = ('Relatório\t2024\n\nPrimeira linha\nsegunda linha\n\nProduto\n\nPreço\n\nCaneta\n\n2,50\n\n'
+                 'Fim & conclusão')
+
+
+def test_text_matches_docx2txt():
+    content = make_docx(BODY)
+    text_content, stats = extract_docx(content)
+    assert text_content == DOCX2TXT_TEXT
+    assert stats == {'paragraphs': 7, 'chars': len(text_content), 'truncated': False}
+
+
+def test_character_budget_stops_reading():
+    content = make_docx(''.join(paragraph(text(f'Parágrafo {i} ' + 'x' * 50)) for i in range(1000)))
+    text_content, stats = extract_docx(content, max_chars=200)
+    assert len(text_content) == 200
+    assert text_content.startswith('Parágrafo 0 ')
+    assert stats['truncated'] is True
+    # A leitura para no limite: só os primeiros parágrafos foram visitados
+    assert stats['paragraphs'] < 10
+
+
+def test_headers_footers_and_tables():
+    content = make_docx(BODY, header=paragraph(text('Empresa S.A.')), footer=paragraph(text('Página 1')))
+    text_content, stats = extract_docx(content, headers_footers=True, tables=True)
+    assert 'Empresa' not in text_content
+    assert stats['headers'] == ['Empresa S.A.']
+    assert stats['footers'] == ['Página 1']
+    assert stats['tables'] == [[['Produto', 'Preço'], ['Caneta', '2,50']]]
+
+
+def test_process_document_docx():
+    content = make_docx(BODY)
+    assert process_document(content, DOCX_TYPE, 'html').startswith('<pre>Relatório\t2024')
+
+
+@respx.mock
+def test_crawled_docx_options():
+    page = f'<html><title>Docs</title><body><a href="{BASE}/relatorio.docx">Relatório</a></body></html>'
+    respx.get(f'{BASE}/').mock(return_value=httpx.Response(200, headers={'Content-Type': 'text/html'}, text=page))
+    respx.get(f'{BASE}/relatorio.docx').mock(return_value=httpx.Response(
+        200, headers={'Content-Type': DOCX_TYPE}, content=make_docx(BODY)))
+    event = {'body': json.dumps({'url': f'{BASE}/', 'format': 'markdown', 'max_level': 1, 'rate_limit': 0,
+                                 'cache': False, 'docx_max_chars': 9, 'docx_tables': True})}
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 200
+    node = json.loads(response['body'])['links'][f'{BASE}/relatorio.docx']
+    assert node['content'] == 'Relatório'
+    assert node['docx']['truncated'] is True
+
+
+def test_invalid_docx_max_chars():
+    event = {'body': json.dumps({'url': f'{BASE}/', 'docx_max_chars': 0})}
+    assert lambda_handler(event, None)['statusCode'] == 400
@@ -0,0 +1,170 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import respx
+
+from src import cache as cache_module
+from src.cache import MemoryStore, ResponseCache
+from src.download import DownloadBudget, content_kind, download, download_async
+from src.scrape_lambda import lambda_handler
+
+BASE = 'https://arquivos.example'
+PARAGRAPHS = ''.join(f'<p>Parágrafo {i} com algum texto de exemplo.</p>' for i in range(2000))
+BIG_PAGE = f'<html><title>Grande</title><body>{PARAGRAPHS}</body></html>'
+
+
+class TrackedStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Corpo em blocos que registra quantos blocos foram lidos"""
+
+    def __init__(self, data, chunk_size=1024):
+        self.chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+        self.read = 0
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+    async def __aiter__(self):
+        for chunk in self:
+            yield chunk
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = ResponseCache(MemoryStore())
+    monkeypatch.setattr(cache_module, '_cache', cache)
+    return cache
+
+
+def call(url, **params):
+    response = lambda_handler({'body': json.dumps({'url': url, 'format': 'markdown', **params})}, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_content_kind():
+    assert content_kind('text/html; charset=utf-8') == 'text'
+    assert content_kind('application/pdf') == 'document'
+    assert content_kind('') == 'text'
+    assert content_kind('video/mp4') is None
+
+
+@respx.mock
+def test_unsupported_type_is_not_read():
+    stream = TrackedStream(b'\x00' * 50000)
+    respx.get(f'{BASE}/video').mock(return_value=httpx.Response(200, headers={'Content-Type': 'video/mp4'},
+                                                                 stream=stream))
+    status, body = call(f'{BASE}/video', cache=False)
+    assert status == 415
+    assert 'unsupported_type' in body['error']
+    assert stream.read == 0
+
+
+@respx.mock
+def test_html_truncated_at_max_bytes(fresh_cache):
+    stream = TrackedStream(BIG_PAGE.encode('utf-8'))
+    respx.get(f'{BASE}/grande').mock(return_value=httpx.Response(200, headers={'Content-Type': 'text/html'},
+                                                                  stream=stream))
+    status, body = call(f'{BASE}/grande', max_html_bytes=4096)
+    assert status == 200
+    assert body['truncated'] == 'max_bytes'
+    assert body['title'] == 'Grande'
+    assert stream.read < len(stream.chunks)
+    # Corpo incompleto não é guardado no cache
+    assert fresh_cache.lookup(f'{BASE}/grande') == (None, False)
+
+
+@respx.mock
+def test_early_abort_stops_after_enough_text():
+    stream = TrackedStream(BIG_PAGE.encode('utf-8'))
+    respx.get(f'{BASE}/resumo').mock(return_value=httpx.Response(200, headers={'Content-Type': 'text/html'},
+                                                                  stream=stream))
+    status, body = call(f'{BASE}/resumo', maxsize=300, early_abort=True, cache=False)
+    assert status == 200
+    assert body['truncated'] == 'early_abort'
+    assert 'Parágrafo 0' in body['markdown']
+    assert stream.read <= 2
+
+
+@respx.mock
+def test_large_document_skipped_in_recursion():
+    page = f'<html><title>Raiz</title><body><a href="{BASE}/manual.pdf">Manual</a></body></html>'
+    respx.get(f'{BASE}/raiz').mock(return_value=httpx.Response(200, headers={'Content-Type': 'text/html'},
+                                                                text=page))
+    pdf = TrackedStream(b'%PDF' + b'0' * 20000)
+    respx.get(f'{BASE}/manual.pdf').mock(return_value=httpx.Response(
+        200, headers={'Content-Type': 'application/pdf', 'Content-Length': '20004'}, stream=pdf))
+    status, body = call(f'{BASE}/raiz', max_level=1, max_document_bytes=1000, rate_limit=0, cache=False)
+    assert status == 200
+    assert body['links'][f'{BASE}/manual.pdf']['status'] == 'too_large'
+    assert pdf.read == 0
+
+
+@respx.mock
+def test_total_budget_shared_between_downloads():
+    respx.get(f'{BASE}/a').mock(return_value=httpx.Response(200, headers={'Content-Type': 'text/html'},
+                                                             content=b'a' * 3000))
+    respx.get(f'{BASE}/b').mock(return_value=httpx.Response(200, headers={'Content-Type': 'text/html'},
+                                                             content=b'b' * 3000))
+    budget = DownloadBudget(max_total_bytes=4000)
+    with httpx.Client() as client:
+        first = download(client, 'GET', f'{BASE}/a', budget=budget)
+        second = download(client, 'GET', f'{BASE}/b', budget=budget)
+        third = download(client, 'GET', f'{BASE}/a', budget=budget)
+    assert len(first.content) == 3000
+    assert len(second.content) == 1000
+    assert second.extensions['download']['truncated'] == 'total_budget'
+    assert third.extensions['download']['skipped'] == 'total_budget'
+    assert budget.used_bytes == 4000
+
+
+
+
+class SlowStream(httpx.AsyncByteStream):
+    """Corpo assíncrono que cede o event loop entre os blocos"""
+
+    def __init__(self, data, chunk_size=500):
+        self.chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0.001)
+            yield chunk
+
+
+@respx.mock
+def test_concurrent_downloads_stop_at_the_shared_total():
+    for name in ('a', 'b', 'c'):
+        respx.get(f'{BASE}/{name}').mock(return_value=httpx.Response(
+            200, headers={'Content-Type': 'text/html'}, stream=SlowStream(name.encode() * 3000)))
+    budget = DownloadBudget(max_total_bytes=4000)
+
+    async def download_all():
+        async with httpx.AsyncClient() as client:
+            return await asyncio.gather(*[download_async(client, 'GET', f'{BASE}/{name}', budget=budget)
+                                          for name in ('a', 'b', 'c')])
+
+    responses = asyncio.run(download_all())
+    assert sum(len(response.content) for response in responses) == 4000
+    assert budget.used_bytes == 4000
+    assert all(response.extensions['download']['truncated'] == 'total_budget' for response in responses)
+
+@respx.mock
+def test_document_exactly_at_the_limit_is_complete():
+    respx.get(f'{BASE}/exato.pdf').mock(return_value=httpx.Response(
+        200, headers={'Content-Type': 'application/pdf'}, stream=TrackedStream(b'%PDF' + b'0' * 2044)))
+    respx.get(f'{BASE}/maior.pdf').mock(return_value=httpx.Response(
+        200, headers={'Content-Type': 'application/pdf'}, stream=TrackedStream(b'%PDF' + b'0' * 2045)))
+    budget = DownloadBudget(max_document_bytes=2048)
+    with httpx.Client() as client:
+        exact = download(client, 'GET', f'{BASE}/exato.pdf', budget=budget)
+        larger = download(client, 'GET', f'{BASE}/maior.pdf', budget=budget)
+    assert len(exact.content) == 2048
+    assert exact.extensions['download']['truncated'] is False
+    assert larger.extensions['download']['truncated'] == 'max_bytes'
+
+def test_invalid_download_limit():
+    status, body = call(f'{BASE}/qualquer', max_total_bytes=0)
+    assert status == 400
@@ -0,0 +1,93 @@
+from urllib.parse import urljoin
+
+import pytest
+from bs4 import BeautifulSoup
+
+from src.extraction import extract_page
+from src.scrape_lambda import extract_metadata
+
+SAMPLE_HTML = '''
+<html><head><title> Produto X </title>
+<script type="application/ld+json">{"@type": "Product", "name": "X"}</script>
+<script type="application/ld+json">[{"@type": "BreadcrumbList", "itemListElement": [1, 2]}]</script>
+<script id="__NEXT_DATA__" type="application/json">{"props": {"pageProps": {"sku": 1}}}</script>
+</head><body>
+<h1>Produto <strong>X</strong></h1>
+<p>Descrição <span>longa</span> do produto</p>
+<p>Descrição <span>longa</span> do produto</p>
+<a href="/a">Link A</a><a href="b.pdf"><img src="img1.png"></a>
+<img src="img1.png"><img src="/img2.png"><img src="img3.png"><img src="img4.png"><img src="img5.png"><img src="img6.png">
+<p>Último parágrafo</p>
+</body></html>
+'''
+
+
+def reference_extract(html_content, final_url, maxsize):
+    """Extração original em várias passadas, usada como referência de paridade"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    title = soup.title.string.strip() if soup.title and soup.title.string else "Sem Título"
+    paragraphs = []
+    ultimo_texto = None
+    for elemento in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'strong', 'span', 'a']):
+        texto_atual = elemento.get_text(strip=True)
+        if elemento.name == 'a':
+            texto_atual = f"[{elemento.get_text(strip=True)}]({elemento.get('href')})"
+        if texto_atual and texto_atual != ultimo_texto:
+            paragraphs.append(elemento)
+            ultimo_texto = texto_atual
+    resumo_html = ""
+    for p in paragraphs:
+        text = p.get_text().strip()
+        if text:
+            resumo_html += f"<p>{text}</p>\n"
+        if len(resumo_html) > maxsize:
+            break
+    if not resumo_html:
+        resumo_html = "<p>Não foram encontrados textos significativos na página.</p>"
+    images = []
+    for img in soup.find_all('img'):
+        src = img.get('src')
+        if src:
+            full_src = urljoin(final_url, src)
+            if full_src not in images:
+                images.append(full_src)
+        if len(images) >= 5:
+            break
+    links = [urljoin(final_url, a.get('href')) for a in soup.find_all('a') if a.get('href')]
+    return title, resumo_html, images, links
+
+
+@pytest.mark.parametrize("maxsize", [0, 40, 300, 20000])
+def test_extract_page_matches_reference(maxsize):
+    page = extract_page(SAMPLE_HTML, 'https://example.com/p/', maxsize)
+    assert (page['title'], page['resumo_html'], page['images'], page['links']) == \
+        reference_extract(SAMPLE_HTML, 'https://example.com/p/', maxsize)
+
+
+def test_extract_page_collects_metadata():
+    page = extract_page(SAMPLE_HTML, 'https://example.com/p/')
+    assert page['metadata']['schema'] == {"@type": "Product", "name": "X", "breadcrumb": [1, 2]}
+    assert page['metadata']['nextData'] == {"props": {"pageProps": {"sku": 1}}}
+    assert extract_metadata(SAMPLE_HTML) == page['metadata']
+    assert extract_page(SAMPLE_HTML, 'https://example.com/p/', metadata=False)['metadata'] is None
+
+
+def test_extract_page_stops_summary_at_maxsize():
+    html = '<html><body>' + ''.join(f'<p>paragrafo {i}</p>' for i in range(1000)) + '</body></html>'
+    page = extract_page(html, 'https://example.com', maxsize=50)
+    assert page['resumo_html'].count('<p>') == 3
+
+
+def test_extract_page_empty():
+    page = extract_page('<html></html>', 'https://example.com')
+    assert page['title'] == 'Sem Título'
+    assert page['resumo_html'] == "<p>Não foram encontrados textos significativos na página.</p>"
+    assert page['metadata'] == {"schema": {}, "nextData": {}}
+
+
+def test_extract_page_collects_only_requested_parts():
+    full = extract_page(SAMPLE_HTML, 'https://example.com/p/')
+    page = extract_page(SAMPLE_HTML, 'https://example.com/p/', parts={'title', 'links'})
+    assert (page['title'], page['links']) == (full['title'], full['links'])
+    assert page['resumo_html'] is None and page['images'] is None and page['metadata'] is None
+    assert extract_page(SAMPLE_HTML, 'https://example.com/p/', parts={'metadata'})['metadata'] == full['metadata']
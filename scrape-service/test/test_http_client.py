@@ -0,0 +1,68 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from src import http_client
+from src.scrape_lambda import lambda_handler
+
+
+@respx.mock
+def test_client_reused_across_invocations():
+    respx.get("https://example.com").mock(
+        return_value=httpx.Response(200, text='<html><title>Test</title></html>')
+    )
+    event = {'body': json.dumps({'url': 'https://example.com', 'format': 'markdown'})}
+
+    assert lambda_handler(event, None)['statusCode'] == 200
+    client = http_client.get_client()
+    assert lambda_handler(event, None)['statusCode'] == 200
+    assert http_client.get_client() is client
+
+
+
+@respx.mock
+def test_cookies_do_not_leak_between_invocations():
+    respx.get('https://a.example/').mock(return_value=httpx.Response(
+        200, headers={'Set-Cookie': 'session=caller-A-secret; Path=/'}, text='<html><title>A</title></html>'))
+    second = respx.get('https://a.example/outra').mock(
+        return_value=httpx.Response(200, text='<html><title>B</title></html>'))
+
+    first_event = {'body': json.dumps({'url': 'https://a.example/', 'format': 'markdown', 'cache': False})}
+    second_event = {'body': json.dumps({'url': 'https://a.example/outra', 'format': 'markdown', 'cache': False})}
+    assert lambda_handler(first_event, None)['statusCode'] == 200
+    assert lambda_handler(second_event, None)['statusCode'] == 200
+    assert 'cookie' not in second.calls.last.request.headers
+    assert not http_client.get_client().cookies
+    assert not http_client.get_async_client().cookies
+
+def test_async_client_shares_persistent_loop():
+    async def current_client():
+        return http_client.get_async_client()
+
+    first = http_client.run(current_client())
+    assert http_client.run(current_client()) is first
+
+
+def test_http2_requires_h2(monkeypatch):
+    monkeypatch.setattr(http_client, 'HTTP_HTTP2', False)
+    assert not http_client.http2_enabled()
+    monkeypatch.setattr(http_client, 'HTTP_HTTP2', True)
+    monkeypatch.setattr(http_client.importlib.util, 'find_spec', lambda name: None)
+    assert not http_client.http2_enabled()
+
+
+@pytest.mark.parametrize("value,expected", [
+    (None, httpx.Timeout(http_client.HTTP_DEFAULT_TIMEOUT)),
+    (5, httpx.Timeout(5.0)),
+    ({'connect': 2, 'read': 20}, httpx.Timeout(http_client.HTTP_DEFAULT_TIMEOUT, connect=2.0, read=20.0)),
+])
+def test_build_timeout(value, expected):
+    assert http_client.build_timeout(value) == expected
+
+
+def test_lambda_handler_invalid_timeout():
+    event = {'body': json.dumps({'url': 'https://example.com', 'timeout': 'abc'})}
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 400
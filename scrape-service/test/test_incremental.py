@@ -0,0 +1,103 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from src import incremental, scrape_lambda
+from src.incremental import IncrementalState, S3StateStore, open_state_store, prune_unchanged
+from src.scrape_lambda import lambda_handler
+
+BASE = 'https://catalogo-diario.example'
+HTML = {'Content-Type': 'text/html'}
+ROOT = f'<html><title>Catálogo</title><body><a href="{BASE}/p1">1</a><a href="{BASE}/p2">2</a></body></html>'
+
+
+def conditional(etag, text):
+    """Responde 304 quando o If-None-Match confere com o ETag atual"""
+    def respond(request):
+        if request.headers.get('If-None-Match') == etag:
+            return httpx.Response(304, headers={'ETag': etag})
+        return httpx.Response(200, headers={**HTML, 'ETag': etag}, text=text)
+    return respond
+
+
+def call(state_name):
+    body = {'url': f'{BASE}/', 'format': 'markdown', 'max_level': 1, 'rate_limit': 0,
+            'incremental': state_name}
+    response = lambda_handler({'body': json.dumps(body)}, None)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+@respx.mock
+def test_incremental_recrawl(tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental, 'INCREMENTAL_STATE_BASE', str(tmp_path))
+    state_path = tmp_path / 'estado.json'
+    respx.get(f'{BASE}/').mock(side_effect=conditional('"raiz-1"', ROOT))
+    # p1 não tem validadores: a comparação é feita pelo hash do conteúdo
+    respx.get(f'{BASE}/p1').mock(return_value=httpx.Response(200, headers=HTML, text='<title>P1</title>'))
+    p2 = respx.get(f'{BASE}/p2').mock(side_effect=conditional('"p2-1"', '<title>P2</title>'))
+
+    first = call('estado')
+    assert first['incremental'] == {'new': [f'{BASE}/', f'{BASE}/p1', f'{BASE}/p2'], 'changed': [],
+                                    'unchanged': 0, 'not_visited': 0}
+    assert set(first['links']) == {f'{BASE}/p1', f'{BASE}/p2'}
+    saved = json.loads(state_path.read_text())['pages']
+    assert saved[f'{BASE}/']['etag'] == '"raiz-1"'
+    assert saved[f'{BASE}/']['links'] == [f'{BASE}/p1', f'{BASE}/p2']
+
+    # Segunda execução: só p2 mudou; raiz e p1 não são extraídas de novo
+    p2.side_effect = conditional('"p2-2"', '<title>P2 novo</title>')
+    extract_calls = []
+    original_extract = scrape_lambda.extract_page
+    monkeypatch.setattr(scrape_lambda, 'extract_page',
+                        lambda html, url, *args, **kwargs: extract_calls.append(url) or
+                        original_extract(html, url, *args, **kwargs))
+
+    second = call('estado')
+    assert second['incremental'] == {'new': [], 'changed': [f'{BASE}/p2'], 'unchanged': 2, 'not_visited': 0}
+    assert second['title'] is None
+    assert list(second['links']) == [f'{BASE}/p2']
+    assert second['links'][f'{BASE}/p2']['title'] == 'P2 novo'
+    assert extract_calls == [f'{BASE}/p2']
+    assert p2.calls[-1].request.headers['If-None-Match'] == '"p2-1"'
+    assert json.loads(state_path.read_text())['pages'][f'{BASE}/p2']['etag'] == '"p2-2"'
+
+
+def test_prune_unchanged():
+    tree = {
+        'a': {'status': 'unchanged', 'links': {'b': {'status': 'unchanged'}, 'c': {'title': 'C', 'links': {}}}},
+        'd': {'status': 'unchanged', 'links': {'e': {'status': 'unchanged'}}},
+        'f': {'status': 'max_level_reached'},
+    }
+    assert prune_unchanged(tree) == {'a': {'status': 'unchanged', 'links': {'c': {'title': 'C', 'links': {}}}},
+                                     'f': {'status': 'max_level_reached'}}
+
+
+def test_state_stores(tmp_path, monkeypatch):
+    # Sem base configurada o modo incremental é recusado
+    monkeypatch.setattr(incremental, 'INCREMENTAL_STATE_BASE', '')
+    with pytest.raises(ValueError):
+        open_state_store('catalogo')
+    body = {'url': f'{BASE}/', 'incremental': 'catalogo'}
+    assert lambda_handler({'body': json.dumps(body)}, None)['statusCode'] == 400
+
+    for name in ('', '../segredo', '/etc/passwd', 's3://outro/chave', 'a.json', None):
+        with pytest.raises(ValueError):
+            open_state_store(name, base=str(tmp_path))
+    assert open_state_store('x', base=f'file://{tmp_path}').path == f'{tmp_path}/x.json'
+    s3_store = open_state_store('catalogo', base='s3://estado/crawl')
+    assert (s3_store.bucket, s3_store.key) == ('estado', 'crawl/catalogo.json')
+
+    moto = pytest.importorskip('moto')
+    boto3 = pytest.importorskip('boto3')
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='estado')
+        store = S3StateStore('estado', 'crawl/catalogo.json', client=client)
+        state = IncrementalState.load(store)
+        assert state.previous == {}
+        state.pages['https://a.example/'] = {'etag': '"1"', 'hash': 'abc', 'links': None}
+        state.save()
+        assert IncrementalState.load(store).conditional_headers('https://a.example/') == {'If-None-Match': '"1"'}
@@ -0,0 +1,98 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from src import cache as cache_module
+from src import instrumentation
+from src import scrape_lambda
+from src.cache import MemoryStore, ResponseCache
+from src.scrape_lambda import lambda_handler
+
+BASE = 'https://metricas.example'
+ROOT = f'<html><title>Raiz</title><body><p>Texto</p><a href="{BASE}/filho">Filho</a></body></html>'
+CHILD = '<html><title>Filho</title><body><p>Conteúdo do filho</p></body></html>'
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = ResponseCache(MemoryStore())
+    monkeypatch.setattr(cache_module, '_cache', cache)
+    return cache
+
+
+def mock_site():
+    headers = {'Content-Type': 'text/html', 'ETag': '"v1"', 'Cache-Control': 'max-age=60'}
+    respx.get(f'{BASE}/').mock(return_value=httpx.Response(200, headers=headers, text=ROOT))
+    respx.get(f'{BASE}/filho').mock(return_value=httpx.Response(200, headers=headers, text=CHILD))
+
+
+def call(**params):
+    body = {'url': f'{BASE}/', 'format': 'markdown', 'rate_limit': 0, **params}
+    response = lambda_handler({'body': json.dumps(body)}, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+@respx.mock
+def test_debug_timings_block(fresh_cache):
+    mock_site()
+    status, body = call(debug_timings=True, max_level=1)
+    assert status == 200
+    report = body['debug_timings']
+    for name in ('fetch', 'download', 'extract', 'crawl', 'markdown'):
+        assert report['stages'][name]['ms'] >= 0
+    assert report['stages']['download']['count'] == 2
+    assert report['counters']['responses_fetched'] == 2
+    assert report['counters']['pages_crawled'] == 1
+    assert report['counters']['bytes_downloaded'] == len(ROOT.encode()) + len(CHILD.encode())
+    assert report['counters']['cache_misses'] == 2
+    assert report['peak_memory_mb'] > 0
+
+    # Segunda chamada: respostas frescas vêm do cache, sem download
+    status, body = call(debug_timings=True, max_level=1)
+    report = body['debug_timings']
+    assert report['counters']['cache_hits'] == 2
+    assert 'download' not in report['stages']
+
+
+@respx.mock
+def test_disabled_by_default(fresh_cache):
+    mock_site()
+    status, body = call()
+    assert status == 200
+    assert 'debug_timings' not in body
+    assert instrumentation.current() is instrumentation.NULL_TRACE
+
+
+@respx.mock
+def test_emf_log_line(fresh_cache, monkeypatch, capsys):
+    monkeypatch.setattr(scrape_lambda, 'INSTRUMENTATION_LOGS', True)
+    mock_site()
+    status, body = call(cache=False)
+    assert status == 200
+    assert 'debug_timings' not in body
+    record = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    directive = record['_aws']['CloudWatchMetrics'][0]
+    assert directive['Dimensions'] == [['Format']]
+    names = {metric['Name'] for metric in directive['Metrics']}
+    assert {'total_ms', 'fetch_ms', 'extract_ms', 'bytes_downloaded', 'peak_memory_mb'} <= names
+    # Todas as métricas declaradas estão no registro
+    assert all(name in record for name in names)
+    assert record['Format'] == 'markdown'
+    assert record['statusCode'] == 200
+
+    # Formatos desconhecidos não criam novas séries de métricas
+    call(cache=False, format='qualquer-coisa-123')
+    record = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert record['Format'] == 'other'
+
+
+def test_http_trace_stages():
+    trace = instrumentation.Trace()
+    hook = trace.http_trace()
+    for event in ('connection.connect_tcp', 'connection.start_tls', 'http11.receive_response_headers'):
+        hook(f'{event}.started', {})
+        hook(f'{event}.complete', {})
+    hook('http11.send_request_body.started', {})
+    assert set(trace.report()['stages']) == {'connect', 'tls', 'wait_headers'}
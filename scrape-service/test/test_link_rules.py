@@ -0,0 +1,78 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from src.link_rules import LinkRules, compile_alternation
+from src.scrape_lambda import lambda_handler
+
+BASE = 'https://www.catalogo.example'
+
+
+def test_include_exclude_and_counters():
+    rules = LinkRules(include=[r'/produto/', r'/categoria/'], exclude=[r'\?page=', r'/produto/.*/avaliacoes'])
+    links = [f'{BASE}/produto/1', f'{BASE}/categoria/a', f'{BASE}/categoria/a?page=2',
+             f'{BASE}/produto/1/avaliacoes', f'{BASE}/sobre']
+    assert rules.filter(links) == [f'{BASE}/produto/1', f'{BASE}/categoria/a']
+    report = rules.report()
+    assert report['accepted'] == 2 and report['rejected'] == 3
+    counts = {(rule['rule'], rule['pattern']): rule['matches'] for rule in report['rules']}
+    assert counts[('include', '/produto/')] == 1
+    assert counts[('include', '/categoria/')] == 1
+    assert counts[('exclude', r'\?page=')] == 1
+    assert counts[('exclude', '/produto/.*/avaliacoes')] == 1
+
+
+def test_domain_scope_paths_and_extensions():
+    rules = LinkRules(same_domain=True, path_prefixes=['/docs/'], exclude_extensions=['zip'],
+                      extensions=['pdf', 'html']).scoped_to(f'{BASE}/')
+    assert rules.match('https://catalogo.example/docs/manual.pdf')
+    assert rules.match('https://cdn.catalogo.example/docs/index.html')
+    assert not rules.match('https://outro.example/docs/manual.pdf')
+    assert not rules.match(f'{BASE}/docs/pacote.zip')
+    assert not rules.match(f'{BASE}/blog/post.html')
+    assert not rules.match(f'{BASE}/docs/imagem.PNG')
+
+    strict = LinkRules(domains=['catalogo.example'], subdomains=False)
+    assert strict.match('https://catalogo.example/a')
+    assert not strict.match('https://cdn.catalogo.example/a')
+
+
+def test_patterns_with_backreferences_are_not_combined():
+    compiled = compile_alternation((r'(\d)\1', r'/a'))
+    assert len(compiled) == 2
+    rules = LinkRules(include=[r'(\d)\1', '/a'])
+    assert rules.filter(['https://x.example/11', 'https://x.example/a', 'https://x.example/12']) == \
+        ['https://x.example/11', 'https://x.example/a']
+
+
+def test_invalid_rules():
+    with pytest.raises(ValueError):
+        LinkRules.from_params({'link_rules': {'include': ['(']}})
+    with pytest.raises(ValueError):
+        LinkRules.from_params({'link_rules': {'incluir': ['/a']}})
+    assert LinkRules.from_params({}) is None
+    assert LinkRules.from_params({'link_exp_filter': r'\.pdf$'}).include == [r'\.pdf$']
+
+
+@respx.mock
+def test_link_rules_in_response():
+    page = (f'<html><title>Catálogo</title><body><a href="/produto/1">1</a><a href="/produto/2?page=2">2</a>'
+            '<a href="https://externo.example/produto/3">3</a></body></html>')
+    respx.get(f'{BASE}/').mock(return_value=httpx.Response(200, headers={'Content-Type': 'text/html'}, text=page))
+    product = respx.get(f'{BASE}/produto/1').mock(
+        return_value=httpx.Response(200, headers={'Content-Type': 'text/html'}, text='<title>P1</title>'))
+    body = {'url': f'{BASE}/', 'format': 'markdown', 'max_level': 1, 'cache': False, 'rate_limit': 0,
+            'link_rules': {'same_domain': True, 'include': ['/produto/'], 'exclude': [r'\?page=']}}
+    response = lambda_handler({'body': json.dumps(body)}, None)
+    assert response['statusCode'] == 200
+    data = json.loads(response['body'])
+    assert list(data['links']) == [f'{BASE}/produto/1']
+    assert product.call_count == 1
+    assert data['link_rules']['accepted'] == 1
+    rules = {rule['rule']: rule['matches'] for rule in data['link_rules']['rules']}
+    assert rules == {'include': 1, 'exclude': 1, 'domains': 1}
+
+    body['link_rules'] = {'include': ['(']}
+    assert lambda_handler({'body': json.dumps(body)}, None)['statusCode'] == 400
@@ -0,0 +1,94 @@
+import json
+
+import httpx
+import respx
+from jsonpath_ng import parse
+
+from src.metadata_filters import FilterPlan, apply_filters, compile_query
+from src.scrape_lambda import lambda_handler
+
+NEXT_DATA = {
+    'props': {'pageProps': {
+        'product': {'name': 'Dipirona', 'price': 9.9, 'items': [{'sku': 1}, {'sku': 2}, {'sku': 3}]},
+        'related': [{'name': 'Paracetamol'}, {'name': 'Ibuprofeno'}]
+    }},
+    'page': '/produto'
+}
+
+QUERIES = [
+    '$.props.pageProps.product.name',
+    '$.props.pageProps.product.items[*].sku',
+    '$.props.pageProps.product.items[1:]',
+    '$.props.pageProps.related[0].name',
+    '$..name',
+    '$.page',
+    '$.props.inexistente',
+    '$.[[',
+]
+
+
+def reference(data, queries):
+    filtered = {}
+    for query in queries:
+        try:
+            filtered[query] = [match.value for match in parse(query).find(data)]
+        except Exception as e:
+            filtered[query] = f"Error: {str(e)}"
+    return filtered
+
+
+def test_parity_with_jsonpath_ng():
+    assert apply_filters(NEXT_DATA, QUERIES) == reference(NEXT_DATA, QUERIES)
+
+
+def test_shared_prefix_is_traversed_once():
+    plan = FilterPlan(QUERIES[:4])
+    # $ -> props -> pageProps são compartilhados pelas quatro expressões
+    node = plan.root
+    for _ in range(3):
+        assert len(node.children) == 1
+        node = next(iter(node.children.values()))
+    assert len(node.children) == 2
+
+
+def test_compiled_expressions_are_cached():
+    compile_query.cache_clear()
+    FilterPlan(['$.a.b', '$.c'])
+    FilterPlan(['$.a.b'])
+    info = compile_query.cache_info()
+    assert info.misses == 2
+    assert info.hits == 1
+
+
+@respx.mock
+def test_filters_apply_to_next_data_and_schema():
+    page = (
+        '<html><head><title>Produto</title>'
+        '<script type="application/ld+json">{"@type": "Product", "name": "Dipirona", "sku": "789"}</script>'
+        f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(NEXT_DATA)}</script>'
+        '</head><body><p>Texto</p></body></html>'
+    )
+    respx.get('https://farmacia.example/produto').mock(
+        return_value=httpx.Response(200, headers={'Content-Type': 'text/html'}, text=page))
+    event = {'body': json.dumps({'url': 'https://farmacia.example/produto', 'format': 'metadata', 'cache': False,
+                                 'metadata_filters': ['$.props.pageProps.product.name', '$.sku']})}
+    body = json.loads(lambda_handler(event, None)['body'])
+    assert body['nextData'] == {'$.props.pageProps.product.name': ['Dipirona'], '$.sku': []}
+    assert body['schemaData'] == {'$.props.pageProps.product.name': [], '$.sku': ['789']}
+
+
+@respx.mock
+def test_non_string_filters_get_an_error_entry():
+    assert apply_filters(NEXT_DATA, ['$.page', {'a': 1}, 5]) == {
+        '$.page': ['/produto'],
+        "{'a': 1}": 'Error: a expressão JSONPath deve ser uma string',
+        '5': 'Error: a expressão JSONPath deve ser uma string',
+    }
+    page = f'<html><script id="__NEXT_DATA__" type="application/json">{json.dumps(NEXT_DATA)}</script></html>'
+    respx.get('https://farmacia.example/filtros').mock(
+        return_value=httpx.Response(200, headers={'Content-Type': 'text/html'}, text=page))
+    event = {'body': json.dumps({'url': 'https://farmacia.example/filtros', 'format': 'metadata', 'cache': False,
+                                 'metadata_filters': ['$.page', {'path': '$.page'}]})}
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['nextData']["{'path': '$.page'}"].startswith('Error: ')
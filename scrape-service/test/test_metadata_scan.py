@@ -0,0 +1,48 @@
+import json
+import math
+from pathlib import Path
+
+import pytest
+
+from src import metadata_scan
+from src.extraction import extract_page
+from src.metadata_scan import decode_next_data, scan_metadata
+from src.scrape_lambda import extract_metadata
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'parsers'
+
+NEXT_DATA = {'props': {'pageProps': {'product': {'name': 'Tênis', 'items': [{'price': 10.5}, {'price': 12}]},
+                                     'related': [{'name': 'Meia'}]}},
+             'page': '/produto/[slug]', 'buildId': 'abc'}
+
+EDGE_HTML = f'''<!DOCTYPE html><HTML><HEAD><TITLE> Loja &amp; Cia </TITLE>
+<!-- <script type="application/ld+json">{{"@type": "Product", "name": "comentado"}}</script> -->
+<script>var s = '<script type="application/ld+json">{{}}</' + 'script>';</script>
+<script type='application/ld+json'>
+  [{{"@type": "Product", "name": "Tênis", "offers": {{"price": 99.9}}}},
+   {{"@type": "BreadcrumbList", "itemListElement": [{{"position": 1}}]}}]
+</script>
+<script type="application/ld+json">{{inválido</script>
+<script type=application/json id="__NEXT_DATA__">{json.dumps(NEXT_DATA)}</script>
+<script type="application/json" id="__NEXT_DATA__">{{"segundo": true}}</script>
+</HEAD><body><title>Outro</title><p>Texto</p></body></HTML>'''
+
+
+@pytest.mark.parametrize('html_content', [EDGE_HTML, '<html></html>', '<title></title><p>x</p>'] +
+                         [path.read_text() for path in sorted(FIXTURES.glob('*.html'))])
+def test_scan_metadata_matches_extract_metadata(html_content):
+    scanned = scan_metadata(html_content)
+    assert scanned['metadata'] == extract_metadata(html_content)
+    assert scanned['title'] == extract_page(html_content, '', maxsize=0)['title']
+
+
+def test_next_data_is_decoded_only_when_requested():
+    html_content = f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(NEXT_DATA)}</script>'
+    assert scan_metadata(html_content)['metadata']['nextData'] == NEXT_DATA
+    assert scan_metadata(html_content, next_data=False)['metadata']['nextData'] == {}
+    assert decode_next_data('{inválido') == {}
+
+
+def test_loads_falls_back_to_stdlib():
+    assert math.isnan(metadata_scan.loads('{"a": NaN}')['a'])
+    assert metadata_scan.loads(b'[1, "a"]') == [1, 'a']
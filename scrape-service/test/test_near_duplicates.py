@@ -0,0 +1,102 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from src.near_duplicates import NearDuplicateDetector, signature, similarity, simhash, url_pattern, words
+from src.scrape_lambda import lambda_handler
+
+BASE = 'https://catalogo-repetido.example'
+HTML = {'Content-Type': 'text/html'}
+LISTING = ('Confira os produtos em destaque da nossa loja com frete grátis para todo o Brasil '
+           'e parcelamento em até dez vezes sem juros no cartão de crédito, ofertas válidas '
+           'enquanto durarem os estoques das lojas participantes. Trocas e devoluções gratuitas em '
+           'até trinta dias após o recebimento, atendimento pelo chat de segunda a sábado das oito '
+           'às vinte horas e retirada sem custo em qualquer uma das nossas lojas. Página {n}')
+ABOUT = ('Somos uma empresa familiar fundada em mil novecentos e noventa, especializada em '
+         'calçados artesanais feitos com couro legítimo curtido de forma sustentável por '
+         'artesãos da região sul do país')
+
+
+def page(title, text, *links):
+    anchors = ''.join(f'<a href="{BASE}{link}">{link}</a>' for link in links)
+    return f'<html><title>{title}</title><body><p>{text}</p>{anchors}</body></html>'
+
+
+def test_simhash_similarity_and_patterns():
+    first = simhash(words(LISTING.format(n=1)))
+    assert similarity(first, simhash(words(LISTING.format(n=2)))) >= 0.9
+    assert similarity(first, simhash(words(ABOUT))) < 0.8
+    assert url_pattern('https://A.example/produto/123/print?sort=asc&page=2') == 'a.example/produto/{n}/print?page&sort'
+
+    detector = NearDuplicateDetector(pattern_limit=2)
+    assert detector.check(f'{BASE}/lista?page=1', signature(LISTING.format(n=1))) is None
+    assert detector.check(f'{BASE}/curta', signature('texto curto')) is None
+    assert detector.check(f'{BASE}/lista?page=2', signature(LISTING.format(n=2)))[0] == f'{BASE}/lista?page=1'
+    assert not detector.blocked(f'{BASE}/lista?page=9')
+    detector.check(f'{BASE}/lista?page=3', signature(LISTING.format(n=3)))
+    assert detector.blocked(f'{BASE}/lista?page=9') and not detector.blocked(f'{BASE}/sobre')
+
+    restored = NearDuplicateDetector(pattern_limit=2)
+    restored.load(json.loads(json.dumps(detector.dump())))
+    assert restored.report() == detector.report()
+
+    with pytest.raises(ValueError):
+        NearDuplicateDetector.from_params({'near_duplicates': 1.5})
+    assert NearDuplicateDetector.from_params({}) is None
+
+
+@respx.mock
+def test_crawl_collapses_duplicates_and_stops_duplicate_patterns():
+    respx.get(f'{BASE}/').mock(return_value=httpx.Response(200, headers=HTML, text=page(
+        'Início', ABOUT[::-1], '/lista?page=1', '/lista?page=2', '/lista?page=3', '/lista?page=4', '/sobre')))
+    for n in range(1, 5):
+        respx.get(f'{BASE}/lista', params={'page': str(n)}).mock(return_value=httpx.Response(
+            200, headers=HTML, text=page(f'Lista {n}', LISTING.format(n=n), '/lista?page=7')))
+    respx.get(f'{BASE}/sobre').mock(return_value=httpx.Response(200, headers=HTML, text=page(
+        'Sobre', ABOUT, '/lista?page=5', '/contato')))
+    later = respx.get(f'{BASE}/lista', params={'page': '5'}).mock(return_value=httpx.Response(
+        200, headers=HTML, text=page('Lista 5', LISTING.format(n=5))))
+    seven = respx.get(f'{BASE}/lista', params={'page': '7'}).mock(return_value=httpx.Response(200, headers=HTML))
+    respx.get(f'{BASE}/contato').mock(return_value=httpx.Response(200, headers=HTML, text='<title>Contato</title>'))
+
+    body = {'url': f'{BASE}/', 'format': 'markdown', 'max_level': 2, 'maxsize': 2000, 'cache': False,
+            'rate_limit': 0, 'max_concurrency': 1, 'near_duplicates': True}
+    response = lambda_handler({'body': json.dumps(body)}, None)
+    assert response['statusCode'] == 200
+    data = json.loads(response['body'])
+    links = data['links']
+    assert links[f'{BASE}/lista?page=1']['title'] == 'Lista 1'
+    for n in (2, 3, 4):
+        assert links[f'{BASE}/lista?page={n}']['status'] == 'near_duplicate'
+        assert links[f'{BASE}/lista?page={n}']['duplicate_of'] == f'{BASE}/lista?page=1'
+    assert links[f'{BASE}/sobre']['links'][f'{BASE}/lista?page=5'] == {'status': 'near_duplicate_pattern'}
+    assert links[f'{BASE}/sobre']['links'][f'{BASE}/contato']['title'] == 'Contato'
+    assert later.call_count == 0
+    # page=7 só é alcançada pela página 1 (as duplicatas não são expandidas), e o padrão já está bloqueado
+    assert seven.call_count == 0
+    assert data['near_duplicates'] == {'duplicates': 3, 'blocked_links': 2, 'blocked_patterns': [
+        'catalogo-repetido.example/lista?page']}
+
+
+@respx.mock
+def test_pages_sharing_boilerplate_are_not_collapsed():
+    # O menu em comum ocupa todo o resumo (maxsize padrão de 300 caracteres)
+    nav = ''.join(f'<p>{LISTING.format(n=n)}</p>' for n in range(2))
+    products = [ABOUT, LISTING[::-1], ' '.join(reversed(ABOUT.split()))]
+
+    def product_page(n):
+        return f'<html><title>Produto {n}</title><body>{nav}<p>{products[n - 1] * 3}</p></body></html>'
+
+    respx.get(f'{BASE}/').mock(return_value=httpx.Response(200, headers=HTML, text=(
+        f'<html><title>Início</title><body>{nav}<a href="/p1">1</a><a href="/p2">2</a><a href="/p3">3</a></body></html>')))
+    for n in (1, 2, 3):
+        respx.get(f'{BASE}/p{n}').mock(return_value=httpx.Response(200, headers=HTML, text=product_page(n)))
+
+    body = {'url': f'{BASE}/', 'format': 'markdown', 'max_level': 1, 'cache': False,
+            'rate_limit': 0, 'max_concurrency': 1, 'near_duplicates': True}
+    data = json.loads(lambda_handler({'body': json.dumps(body)}, None)['body'])
+    for n in (1, 2, 3):
+        assert data['links'][f'{BASE}/p{n}']['title'] == f'Produto {n}'
+    assert data['near_duplicates'] == {'duplicates': 0, 'blocked_links': 0, 'blocked_patterns': []}
@@ -0,0 +1,37 @@
+import glob
+import importlib.util
+import json
+import os
+
+import pytest
+
+from src.extraction import extract_page, get_backend
+from src.scrape_lambda import lambda_handler
+
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'fixtures', 'parsers', '*.html')))
+
+
+def available(module):
+    return pytest.param(module, marks=pytest.mark.skipif(
+        importlib.util.find_spec(module) is None, reason=f"{module} não instalado"))
+
+
+@pytest.mark.parametrize("parser", [available('lxml'), available('selectolax')])
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+@pytest.mark.parametrize("maxsize", [100, 2000])
+def test_parser_parity(parser, path, maxsize):
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+    expected = extract_page(html, 'https://example.com/dir/', maxsize, parser='html.parser')
+    assert extract_page(html, 'https://example.com/dir/', maxsize, parser=parser) == expected
+
+
+def test_unknown_parser():
+    with pytest.raises(ValueError):
+        get_backend('html5lib-inexistente')
+
+
+def test_lambda_handler_invalid_parser():
+    event = {'body': json.dumps({'url': 'https://example.com', 'parser': 'inexistente'})}
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 400
@@ -0,0 +1,108 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from benchmarks.site import build_pdf
+from src import pdf as pdf_module
+from src.cache import MemoryStore
+from src.pdf import extract_pdf, parse_page_range
+from src.scrape_lambda import lambda_handler
+
+BASE = 'https://bulas.example'
+PAGES = [f'Pagina {i} da bula' for i in range(1, 21)]
+DOCUMENT = build_pdf(PAGES)
+
+
+@pytest.fixture(autouse=True)
+def fresh_text_cache(monkeypatch):
+    monkeypatch.setattr(pdf_module, '_text_cache', MemoryStore())
+
+
+def test_parse_page_range():
+    assert parse_page_range(None, 3) == [0, 1, 2]
+    assert parse_page_range('1-2,5', 10) == [0, 1, 4]
+    assert parse_page_range([2, 4], 3) == [1, 2]
+    with pytest.raises(ValueError):
+        parse_page_range('3-1', 10)
+
+
+def test_full_extraction_matches_pypdf2():
+    result = extract_pdf(DOCUMENT)
+    assert result['text'] == '\n\n'.join(PAGES)
+    assert result['page_count'] == 20
+    assert not result['truncated']
+    assert [page['page'] for page in result['pages']] == list(range(1, 21))
+
+
+def test_char_budget_stops_early():
+    result = extract_pdf(DOCUMENT, max_chars=40)
+    assert result['text'] == '\n\n'.join(PAGES)[:40]
+    assert result['truncated']
+    assert len(result['pages']) == 3
+
+
+def test_page_range():
+    result = extract_pdf(DOCUMENT, pages='2-3')
+    assert result['text'] == 'Pagina 2 da bula\n\nPagina 3 da bula'
+
+
+def test_parallel_extraction(monkeypatch):
+    monkeypatch.setattr(pdf_module, 'PDF_MAX_WORKERS', 2)
+    monkeypatch.setattr(pdf_module, 'PDF_PARALLEL_MIN_PAGES', 2)
+    monkeypatch.setattr(pdf_module, '_executor', None)
+    try:
+        result = extract_pdf(DOCUMENT)
+        assert pdf_module._executor is not None
+    finally:
+        if pdf_module._executor is not None:
+            pdf_module._executor.shutdown()
+    assert result['text'] == '\n\n'.join(PAGES)
+    assert [page['page'] for page in result['pages']] == list(range(1, 21))
+
+
+def test_pool_failure_falls_back_to_serial_once(monkeypatch):
+    import concurrent.futures
+
+    attempts = []
+
+    def unavailable(*args, **kwargs):
+        attempts.append(kwargs)
+        raise OSError('sem /dev/shm')
+
+    monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor', unavailable)
+    monkeypatch.setattr(pdf_module, 'PDF_MAX_WORKERS', 2)
+    monkeypatch.setattr(pdf_module, 'PDF_PARALLEL_MIN_PAGES', 2)
+    monkeypatch.setattr(pdf_module, '_executor', None)
+    monkeypatch.setattr(pdf_module, '_executor_failed', False)
+    monkeypatch.setattr(pdf_module, '_text_cache', MemoryStore())
+    assert extract_pdf(DOCUMENT)['text'] == '\n\n'.join(PAGES)
+    assert extract_pdf(DOCUMENT, pages='1-10')['page_count'] == 20
+    assert len(attempts) == 1
+
+
+def test_text_cached_by_document_hash():
+    first = extract_pdf(DOCUMENT, max_chars=100)
+    assert extract_pdf(build_pdf(PAGES), max_chars=100) is first
+
+
+@respx.mock
+def test_crawled_pdf_with_budget_and_stats():
+    page = f'<html><title>Bulas</title><body><a href="{BASE}/bula.pdf">Bula</a></body></html>'
+    respx.get(f'{BASE}/').mock(return_value=httpx.Response(200, headers={'Content-Type': 'text/html'}, text=page))
+    respx.get(f'{BASE}/bula.pdf').mock(return_value=httpx.Response(
+        200, headers={'Content-Type': 'application/pdf'}, content=DOCUMENT))
+    event = {'body': json.dumps({'url': f'{BASE}/', 'format': 'markdown', 'max_level': 1, 'rate_limit': 0,
+                                 'cache': False, 'pdf_pages': '5-20', 'pdf_max_chars': 16})}
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 200
+    node = json.loads(response['body'])['links'][f'{BASE}/bula.pdf']
+    assert node['content'] == 'Pagina 5 da bula'
+    assert node['pdf']['page_count'] == 20
+    assert [stats['page'] for stats in node['pdf']['pages']] == [5]
+
+
+def test_invalid_pdf_pages():
+    event = {'body': json.dumps({'url': f'{BASE}/', 'pdf_pages': 'a-b'})}
+    assert lambda_handler(event, None)['statusCode'] == 400
@@ -0,0 +1,93 @@
+import json
+import sys
+
+import httpx
+import pytest
+import respx
+
+from src import scrape_lambda
+from src.projection import LazyResponse, parse_fields, select_fields
+from src.scrape_lambda import lambda_handler
+
+BASE = 'https://vitrine.example'
+PAGE = f'''<html><head><title>Vitrine</title>
+<script type="application/ld+json">{{"@type": "Product", "name": "Sapato"}}</script></head>
+<body><p>Texto da vitrine</p><img src="/foto.png"><a href="{BASE}/sub">Sub</a></body></html>'''
+
+
+def call(body):
+    response = lambda_handler({'body': json.dumps({'url': f'{BASE}/', 'cache': False, 'rate_limit': 0, **body})},
+                              None)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+def fail(stage):
+    def run(*args, **kwargs):
+        raise AssertionError(f"etapa {stage} não deveria rodar")
+    return run
+
+
+@pytest.fixture
+def site():
+    with respx.mock:
+        respx.get(f'{BASE}/').mock(return_value=httpx.Response(200, headers={'Content-Type': 'text/html'}, text=PAGE))
+        yield respx.get(f'{BASE}/sub').mock(return_value=httpx.Response(
+            200, headers={'Content-Type': 'text/html'}, text='<title>Sub</title>'))
+
+
+def test_metadata_format_skips_markdown_and_crawl(site, monkeypatch):
+    # Um import do html2text falharia: a conversão para markdown não pode rodar
+    monkeypatch.setitem(sys.modules, 'html2text', None)
+    monkeypatch.setattr(scrape_lambda, 'process_html', fail('crawl'))
+    data = call({'format': 'metadata', 'max_level': 1})
+    assert data['title'] == 'Vitrine'
+    assert data['metadata'] == {'@type': 'Product', 'name': 'Sapato'}
+    assert data['markdown'] is None and data['links'] is None and data['images'] is None
+    assert site.call_count == 0
+
+
+def test_fields_projection_runs_only_requested_producers(site, monkeypatch):
+    extract_calls = []
+    original_extract = scrape_lambda.extract_page
+    monkeypatch.setattr(scrape_lambda, 'extract_page', lambda *args, **kwargs: extract_calls.append(
+        kwargs.get('parts')) or original_extract(*args, **kwargs))
+    monkeypatch.setitem(sys.modules, 'html2text', None)
+
+    data = call({'format': 'markdown', 'max_level': 1, 'fields': ['title', 'final_url']})
+    assert data == {'title': 'Vitrine', 'final_url': f'{BASE}/'}
+    assert extract_calls == [{'title'}]
+    assert site.call_count == 0
+
+    monkeypatch.delitem(sys.modules, 'html2text')
+    data = call({'format': 'markdown', 'max_level': 1, 'fields': ['markdown', 'links'], 'debug_timings': True})
+    assert set(data) == {'markdown', 'links', 'debug_timings'}
+    assert data['markdown'].startswith('# Vitrine')
+    assert data['links'][f'{BASE}/sub']['title'] == 'Sub'
+    assert 'metadata_filters' not in data['debug_timings']['stages']
+
+
+@respx.mock
+def test_json_format_passes_upstream_body_through():
+    raw = '{"b": 1,   "a": [1, 2.50], "texto": "ação"}'
+    respx.get(f'{BASE}/api').mock(return_value=httpx.Response(
+        200, headers={'Content-Type': 'application/json'}, text=raw))
+    response = lambda_handler({'body': json.dumps({'url': f'{BASE}/api', 'format': 'json', 'cache': False})}, None)
+    assert response['statusCode'] == 200
+    assert response['body'] == raw
+
+
+def test_parse_and_select_fields():
+    assert parse_fields(None) is None
+    assert parse_fields('title, links') == {'title', 'links'}
+    with pytest.raises(ValueError):
+        parse_fields(['title', 'preco'])
+    assert select_fields('text') == {'title', 'final_url', 'truncated'}
+    assert 'headers' in select_fields('html', output_headers=True)
+    response = lambda_handler({'body': json.dumps({'url': f'{BASE}/', 'fields': ['preco']})}, None)
+    assert response['statusCode'] == 400
+
+    calls = []
+    lazy = LazyResponse({'title': lambda: calls.append('title') or 'T', 'links': fail('links')})
+    assert lazy.build({'title'}, projected=True) == {'title': 'T'}
+    assert lazy['title'] == 'T' and calls == ['title']
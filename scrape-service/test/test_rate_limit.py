@@ -0,0 +1,90 @@
+import asyncio
+import json
+import time
+
+import httpx
+import respx
+
+from src import rate_limit
+from src.crawler import crawl
+from src.rate_limit import HostRateLimiter, TokenBucket, parse_retry_after
+from src.scrape_lambda import lambda_handler
+
+
+def process_response(response, url):
+    return {"status_code": response.status_code}, None
+
+
+def elapsed_for(coro_factory):
+    start = time.perf_counter()
+    asyncio.run(coro_factory())
+    return time.perf_counter() - start
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate=20, burst=1)
+
+    async def three():
+        for _ in range(3):
+            await bucket.acquire()
+
+    # Primeira imediata, as outras duas a cada 50 ms
+    assert 0.09 < elapsed_for(three) < 0.3
+
+
+def test_token_bucket_burst():
+    bucket = TokenBucket(rate=1, burst=3)
+
+    async def three():
+        for _ in range(3):
+            await bucket.acquire()
+
+    assert elapsed_for(three) < 0.05
+
+
+def test_hosts_do_not_wait_for_each_other():
+    limiter = HostRateLimiter.from_interval(0.5)
+
+    async def many_hosts():
+        await asyncio.gather(*[limiter.acquire(f'https://host{i}.com/page') for i in range(10)])
+
+    assert elapsed_for(many_hosts) < 0.1
+    assert len(limiter.buckets) == 10
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('invalido') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+@respx.mock
+def test_crawl_retries_after_429():
+    route = respx.get('https://example.com/a').mock(side_effect=[
+        httpx.Response(429, headers={'Retry-After': '0.1'}),
+        httpx.Response(200),
+    ])
+    start = time.perf_counter()
+    tree = crawl(['https://example.com/a'], process_response, max_level=1,
+                 rate_limiter=HostRateLimiter())
+    assert time.perf_counter() - start >= 0.1
+    assert route.call_count == 2
+    assert tree['https://example.com/a'] == {"status_code": 200}
+
+
+@respx.mock
+def test_crawl_gives_up_after_max_retries():
+    respx.get('https://example.com/a').mock(return_value=httpx.Response(429, headers={'Retry-After': '0'}))
+    tree = crawl(['https://example.com/a'], process_response, max_level=1,
+                 rate_limiter=HostRateLimiter(max_retries=1))
+    assert tree['https://example.com/a']['status'] == 'rate_limited'
+
+
+@respx.mock
+def test_rate_limit_param_does_not_leak_between_invocations():
+    respx.get('https://example.com').mock(return_value=httpx.Response(200, text='<html></html>'))
+    default = rate_limit.RATE_LIMIT_SECONDS
+    event = {'body': json.dumps({'url': 'https://example.com', 'rate_limit': 5, 'format': 'markdown'})}
+    assert lambda_handler(event, None)['statusCode'] == 200
+    assert rate_limit.RATE_LIMIT_SECONDS == default
@@ -0,0 +1,83 @@
+import base64
+import gzip
+import json
+
+import httpx
+import pytest
+import respx
+
+from src import response_encoding
+from src.response_encoding import compact, compress_response, drop_none, dumps, expand, negotiate
+from src.scrape_lambda import lambda_handler
+
+BASE = 'https://compacto.example'
+HTML = {'Content-Type': 'text/html'}
+
+CRAWL = {
+    'title': 'Início', 'images': [f'{BASE}/logo.png'], 'final_url': f'{BASE}/', 'markdown': None,
+    'links': {
+        f'{BASE}/a': {'title': 'A', 'images': [f'{BASE}/logo.png', 'https://cdn.example/a.jpg'], 'links': {
+            f'{BASE}/b': {'status': 'near_duplicate', 'duplicate_of': f'{BASE}/a'}}},
+        f'{BASE}/c': {'title': 'C', 'images': [], 'links': {}},
+        'mailto:contato@compacto.example': {'status': 'max_level_reached'},
+    },
+}
+
+
+def test_compact_round_trip():
+    data = compact(CRAWL)
+    assert data['compact']['hosts'] == [BASE, 'https://cdn.example', '']
+    assert data['images'] == [0]
+    assert data['links']['1']['images'] == [0, 2]
+    assert data['links']['1']['links']['3']['duplicate_of'] == 1
+    assert expand(json.loads(json.dumps(data))) == CRAWL
+    # max_level 0: links é a lista de URLs da página
+    assert expand(compact({'links': [f'{BASE}/a', f'{BASE}/a']})) == {'links': [f'{BASE}/a', f'{BASE}/a']}
+
+
+def test_drop_none_and_serializers(monkeypatch):
+    assert drop_none({'a': None, 'b': [{'c': None, 'd': 1}], 'e': False}) == {'b': [{'d': 1}], 'e': False}
+    assert json.loads(dumps(CRAWL, 'auto')) == json.loads(dumps(CRAWL, 'json')) == CRAWL
+    monkeypatch.setattr(response_encoding, 'orjson', None)
+    with pytest.raises(ValueError):
+        dumps(CRAWL, 'orjson')
+    assert json.loads(dumps(CRAWL, 'auto')) == CRAWL
+
+
+def test_negotiate():
+    assert negotiate(None) is None
+    assert negotiate('gzip, deflate') == 'gzip'
+    assert negotiate('gzip;q=0.5, br') == ('br' if response_encoding.brotli else 'gzip')
+    assert negotiate('br;q=0, gzip;q=0') is None
+    assert negotiate('identity') is None
+    assert negotiate('*') in ('br', 'gzip')
+
+
+def test_compress_response_skips_small_bodies():
+    small = {'statusCode': 200, 'body': '{}'}
+    assert compress_response(small, 'gzip') is small
+    large = {'statusCode': 200, 'headers': {'Content-Type': 'application/json'}, 'body': 'x' * 5000}
+    response = compress_response(large, 'gzip')
+    assert response['isBase64Encoded'] and response['headers']['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(base64.b64decode(response['body'])).decode() == large['body']
+    assert response['headers']['Content-Type'] == 'application/json'
+
+
+@respx.mock
+def test_lambda_handler_compact_gzip_response():
+    anchors = ''.join(f'<a href="{BASE}/p{i}">{i}</a>' for i in range(40))
+    respx.get(f'{BASE}/').mock(return_value=httpx.Response(
+        200, headers=HTML, text=f'<title>Início</title><img src="/logo.png">{anchors}'))
+    body = {'url': f'{BASE}/', 'format': 'html', 'compact': True, 'drop_none': True, 'cache': False}
+    event = {'headers': {'Accept-Encoding': 'gzip'}, 'body': json.dumps(body)}
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 200
+    assert response['headers']['Content-Encoding'] == 'gzip'
+    data = json.loads(gzip.decompress(base64.b64decode(response['body'])))
+    assert 'metadata' not in data and 'markdown' not in data
+    data = expand(data)
+    assert data['images'] == [f'{BASE}/logo.png']
+    assert data['links'] == [f'{BASE}/p{i}' for i in range(40)]
+
+    plain = lambda_handler({'body': json.dumps(body)}, None)
+    assert 'isBase64Encoded' not in plain and json.loads(plain['body'])['compact']['hosts'] == [BASE]
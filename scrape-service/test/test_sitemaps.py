@@ -0,0 +1,117 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import httpx
+import respx
+
+from src import sitemaps
+from src.scrape_lambda import lambda_handler
+from src.sitemaps import discover_seeds, iter_sitemap, parse_since
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(entries):
+    items = ''.join(f'<url><loc>{loc}</loc>' + (f'<lastmod>{lastmod}</lastmod>' if lastmod else '') + '</url>'
+                    for loc, lastmod in entries)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{items}</urlset>'
+
+
+def index(entries):
+    items = ''.join(f'<sitemap><loc>{loc}</loc><lastmod>{lastmod}</lastmod></sitemap>' for loc, lastmod in entries)
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {NS}>{items}</sitemapindex>'
+
+
+class ChunkedStream(httpx.SyncByteStream):
+    def __init__(self, data, chunk_size=64):
+        self.chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+    def __iter__(self):
+        yield from self.chunks
+
+
+@respx.mock
+def test_iter_sitemap_streams_gzip_in_chunks():
+    base = 'https://gzip.example'
+    data = gzip.compress(urlset([(f'{base}/p/{i}', None) for i in range(500)]).encode())
+    respx.get(f'{base}/sitemap.xml.gz').mock(return_value=httpx.Response(200, stream=ChunkedStream(data)))
+    entries = list(iter_sitemap(httpx.Client(), f'{base}/sitemap.xml.gz'))
+    assert len(entries) == 500
+    assert entries[0] == ('url', f'{base}/p/0', None)
+
+
+@respx.mock
+def test_discover_seeds_index_lastmod_and_robots():
+    base = 'https://mapa.example'
+    robots = respx.get(f'{base}/robots.txt').mock(return_value=httpx.Response(
+        200, text=f'User-agent: *\nDisallow: /privado/\nSitemap: {base}/index.xml\n'))
+    respx.get(f'{base}/index.xml').mock(return_value=httpx.Response(200, text=index([
+        (f'{base}/novos.xml', '2026-05-01'), (f'{base}/antigos.xml', '2020-01-01')])))
+    novos = respx.get(f'{base}/novos.xml').mock(return_value=httpx.Response(200, text=urlset([
+        (f'{base}/a', '2026-05-01T10:00:00Z'), (f'{base}/b', '2021-01-01'),
+        (f'{base}/privado/c', None), (f'{base}/d', None)])))
+    antigos = respx.get(f'{base}/antigos.xml').mock(return_value=httpx.Response(200, text=urlset([])))
+
+    client = httpx.Client()
+    since = parse_since('2026-01-01')
+    seeds, stats = discover_seeds(client, f'{base}/', since=since)
+    assert seeds == [f'{base}/a', f'{base}/d']
+    assert stats == {'sitemaps': 2, 'urls': 2, 'skipped_lastmod': 2, 'disallowed': 1, 'truncated': False}
+    assert antigos.call_count == 0
+
+    # robots.txt e sitemaps ficam em cache no container
+    assert discover_seeds(client, f'{base}/', since=since)[0] == seeds
+    assert robots.call_count == 1 and novos.call_count == 1
+
+    seeds, stats = discover_seeds(client, f'{base}/', max_urls=1)
+    assert seeds == [f'{base}/a'] and stats['truncated']
+
+
+def test_parse_since():
+    assert parse_since('2026-01-01') == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert parse_since(None) is None
+
+
+@respx.mock
+def test_sitemap_seeds_the_crawl():
+    base = 'https://semente.example'
+    html = {'Content-Type': 'text/html'}
+    respx.get(f'{base}/').mock(return_value=httpx.Response(200, headers=html, text='<title>Início</title>'))
+    respx.get(f'{base}/robots.txt').mock(return_value=httpx.Response(404))
+    respx.get(f'{base}/sitemap.xml').mock(return_value=httpx.Response(200, text=urlset([(f'{base}/p1', None)])))
+    page = respx.get(f'{base}/p1').mock(return_value=httpx.Response(200, headers=html, text='<title>P1</title>'))
+
+    body = {'url': f'{base}/', 'format': 'markdown', 'sitemap': True, 'cache': False, 'rate_limit': 0}
+    response = lambda_handler({'body': json.dumps(body)}, None)
+    assert response['statusCode'] == 200
+    data = json.loads(response['body'])
+    assert data['links'][f'{base}/p1']['title'] == 'P1'
+    assert data['sitemap']['urls'] == 1
+    assert page.call_count == 1
+
+    body['sitemap_since'] = 'ontem'
+    assert lambda_handler({'body': json.dumps(body)}, None)['statusCode'] == 400
+    assert sitemaps._robots_cache.get(base) is not None
+
+
+@respx.mock
+def test_sitemap_errors_and_unreachable_robots():
+    base = 'https://instavel.example'
+    client = httpx.Client()
+    # robots.txt inacessível (5xx): tudo bloqueado, e nada fica em cache
+    respx.get(f'{base}/robots.txt').mock(return_value=httpx.Response(503))
+    respx.get(f'{base}/ok.xml').mock(return_value=httpx.Response(200, text=urlset([(f'{base}/a', None)])))
+    respx.get(f'{base}/fora.xml').mock(side_effect=httpx.ConnectTimeout('timeout'))
+    seeds, stats = discover_seeds(client, f'{base}/', sitemaps=[f'{base}/fora.xml', f'{base}/ok.xml'])
+    assert seeds == []
+    assert stats['sitemaps'] == 2 and stats['disallowed'] == 1
+    assert stats['errors'] == [{'sitemap': f'{base}/fora.xml', 'error': 'timeout'}]
+    assert sitemaps._robots_cache.get(base) is None
+
+    # Erro de rede no robots.txt também bloqueia; 4xx libera
+    respx.get(f'{base}/robots.txt').mock(side_effect=httpx.ConnectError('falha'))
+    assert not sitemaps.get_robots(client, f'{base}/').can_fetch('*', f'{base}/a')
+    respx.get(f'{base}/robots.txt').mock(return_value=httpx.Response(404))
+    seeds, stats = discover_seeds(client, f'{base}/', sitemaps=[f'{base}/ok.xml'])
+    assert seeds == [f'{base}/a'] and 'errors' not in stats
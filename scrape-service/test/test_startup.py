@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+
+# Orçamento do import "a frio" do handler (ms); pode ser ajustado por máquina/CI
+COLD_IMPORT_BUDGET_MS = float(os.environ.get('COLD_IMPORT_BUDGET_MS', 600))
+# Bibliotecas que só devem ser carregadas quando usadas
+LAZY_MODULES = ('PyPDF2', 'docx2txt', 'openpyxl', 'jsonpath_ng', 'html2text')
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code, **env):
+    result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_DIR, capture_output=True, text=True,
+                            env={**os.environ, **env}, check=True)
+    return result.stdout
+
+
+def test_heavy_libraries_are_not_imported_at_cold_start():
+    code = (
+        'import sys, json\n'
+        'import src.scrape_lambda\n'
+        f'print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))\n'
+    )
+    assert json.loads(run_python(code)) == []
+
+
+def test_cold_import_within_budget():
+    code = (
+        'import time\n'
+        'started = time.perf_counter()\n'
+        'import src.scrape_lambda\n'
+        'print((time.perf_counter() - started) * 1000)\n'
+    )
+    # Melhor de 3 execuções, para reduzir o ruído da máquina
+    elapsed = min(float(run_python(code)) for _ in range(3))
+    assert elapsed < COLD_IMPORT_BUDGET_MS, f"import levou {elapsed:.0f} ms (orçamento: {COLD_IMPORT_BUDGET_MS:.0f} ms)"
+
+
+def test_startup_profile_report():
+    output = run_python('import src.scrape_lambda', STARTUP_PROFILE='true', STARTUP_PROFILE_TOP='50')
+    report = json.loads(output.strip().splitlines()[-1])['startup']
+    assert report['ready_ms'] > 0
+    modules = {item['module']: item for item in report['imports']}
+    assert 'src.extraction' in modules
+    assert modules['src.extraction']['ms'] >= modules['src.extraction']['self_ms']
@@ -0,0 +1,75 @@
+import json
+
+import httpx
+import respx
+
+from src.scrape_lambda import lambda_handler, scrape, stream_handler
+from src.streaming import NDJSON_CONTENT_TYPE, iter_ndjson
+
+
+def mock_site():
+    respx.get('https://loja.example/').mock(return_value=httpx.Response(
+        200, text='<html><title>Raiz</title><body><a href="/a">A</a><a href="/b.pdf">B</a></body></html>',
+        headers={'Content-Type': 'text/html'}
+    ))
+    respx.get('https://loja.example/a').mock(return_value=httpx.Response(
+        200, text='<html><title>Página A</title><body><p>texto</p></body></html>',
+        headers={'Content-Type': 'text/html'}
+    ))
+    respx.get('https://loja.example/b.pdf').mock(side_effect=httpx.ConnectError('falha'))
+
+
+@respx.mock
+def test_iter_ndjson_one_record_per_page():
+    mock_site()
+    body = {'url': 'https://loja.example/', 'max_level': 1, 'rate_limit': 0}
+    records = [json.loads(line) for line in iter_ndjson(body, scrape)]
+
+    assert records[0] == {"url": "https://loja.example/", "depth": 0, "parent": None, "title": "Raiz",
+                          "content": "<p>A</p>\n<p>B</p>\n", "images": []}
+    children = {r['url']: r for r in records[1:-1]}
+    assert children['https://loja.example/a']['title'] == 'Página A'
+    assert children['https://loja.example/a']['parent'] == 'https://loja.example/'
+    assert children['https://loja.example/a']['depth'] == 1
+    assert 'error' in children['https://loja.example/b.pdf']
+    assert records[-1] == {"type": "summary", "pages": 3}
+
+
+@respx.mock
+def test_lambda_handler_ndjson_output():
+    mock_site()
+    event = {'body': json.dumps({'url': 'https://loja.example/', 'max_level': 1, 'output': 'ndjson'})}
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 200
+    assert response['headers']['Content-Type'] == NDJSON_CONTENT_TYPE
+    lines = response['body'].splitlines()
+    assert len(lines) == 4
+    assert all(json.loads(line)['url'] for line in lines[:-1])
+    assert json.loads(lines[-1])['type'] == 'summary'
+
+
+def test_iter_ndjson_reports_errors():
+    records = [json.loads(line) for line in iter_ndjson({}, scrape)]
+    assert records == [{"url": None, "depth": 0, "parent": None,
+                        "error": "Parâmetro 'url' não informado", "statusCode": 400}]
+
+
+@respx.mock
+def test_stream_handler_writes_lines():
+    mock_site()
+
+    class Stream:
+        def __init__(self):
+            self.chunks = []
+            self.closed = False
+
+        def write(self, data):
+            self.chunks.append(data)
+
+        def close(self):
+            self.closed = True
+
+    stream = Stream()
+    stream_handler({'body': json.dumps({'url': 'https://loja.example/'})}, stream, None)
+    assert stream.closed
+    assert json.loads(stream.chunks[0])['title'] == 'Raiz'
@@ -0,0 +1,92 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from src.crawler import crawl
+from src.scrape_lambda import lambda_handler
+from src.urls import BloomFilter, UrlCanonicalizer, make_seen_set
+
+BASE = 'https://loja.example'
+
+
+def process_response(response, url):
+    child_links = [l for l in response.text.splitlines() if l]
+    return {"title": url, "links": {}}, child_links
+
+
+def test_canonicalize():
+    canonicalizer = UrlCanonicalizer()
+    assert canonicalizer.canonicalize('HTTPS://Loja.Example:443/a?b=2&utm_source=x&a=1#secao') == \
+        'https://loja.example/a?a=1&b=2'
+    assert canonicalizer.canonicalize('http://loja.example:8080') == 'http://loja.example:8080/'
+    assert canonicalizer.canonicalize('https://loja.example/p?gclid=1&fbclid=2') == 'https://loja.example/p'
+    assert canonicalizer.canonicalize('mailto:contato@loja.example') == 'mailto:contato@loja.example'
+
+
+def test_key_equivalences():
+    canonicalizer = UrlCanonicalizer(lowercase_path=True)
+    variants = ['https://loja.example/Produto/', 'http://loja.example/produto', 'https://loja.example/produto#topo']
+    assert len({canonicalizer.key(url) for url in variants}) == 1
+    assert canonicalizer.key('https://loja.example/') == 'https://loja.example/'
+
+    strict = UrlCanonicalizer(tracking_params='', trailing_slash='keep', ignore_scheme=False)
+    assert strict.key('https://loja.example/a/') != strict.key('https://loja.example/a')
+    assert strict.key('http://loja.example/a') != strict.key('https://loja.example/a')
+    assert strict.key('https://loja.example/a?utm_source=x') != strict.key('https://loja.example/a')
+
+    disabled = UrlCanonicalizer.from_params({'url_canonicalization': False})
+    assert disabled.key('https://loja.example/a#b') == 'https://loja.example/a#b'
+    with pytest.raises(ValueError):
+        UrlCanonicalizer.from_params({'url_canonicalization': {'trailing_slash': 'sempre'}})
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    urls = [f'{BASE}/p/{i}' for i in range(2000)]
+    for url in urls:
+        bloom.add(url)
+    assert all(url in bloom for url in urls)
+    false_positives = sum(f'{BASE}/q/{i}' in bloom for i in range(10000))
+    assert false_positives < 300
+    assert len(bloom.bits) < 3000
+    assert isinstance(make_seen_set('set'), set)
+    with pytest.raises(ValueError):
+        make_seen_set('lista')
+
+
+@respx.mock
+@pytest.mark.parametrize('seen_set', ['set', 'bloom'])
+def test_crawl_fetches_each_canonical_url_once(seen_set):
+    root = respx.get(f'{BASE}/').mock(return_value=httpx.Response(200, text=f'{BASE}/a#topo'))
+    page = respx.get(f'{BASE}/a').mock(return_value=httpx.Response(200, text=f'{BASE}/\n{BASE}/a/'))
+    links = [f'{BASE}/a', f'{BASE}/a#secao', f'{BASE}/a?utm_source=news', f'http://loja.example/a/']
+
+    processed = make_seen_set(seen_set)
+    processed.add(f'{BASE}/')
+    tree = crawl(links, process_response, max_level=2, processed_urls=processed, root_url=f'{BASE}/')
+
+    assert list(tree) == [f'{BASE}/a']
+    assert page.call_count == 1
+    assert root.call_count == 0
+    assert tree[f'{BASE}/a']['links'] == {f'{BASE}/': {"status": "max_level_reached"},
+                                          f'{BASE}/a/': {"status": "max_level_reached"}}
+
+
+@respx.mock
+def test_crawl_fetches_and_keys_the_original_url():
+    flagged = respx.get(f'{BASE}/b?z=1&flag').mock(return_value=httpx.Response(200, text=''))
+    links = [f'{BASE}/b?z=1&flag', f'{BASE}/b?flag=&z=1', f'{BASE}/b?z=1&flag#topo']
+    tree = crawl(links, process_response, max_level=1, root_url=f'{BASE}/')
+
+    # A forma canônica só deduplica: a URL buscada e a chave da árvore são as originais
+    assert list(tree) == [f'{BASE}/b?z=1&flag']
+    assert flagged.call_count == 1
+    assert flagged.calls[0].request.url.query == b'z=1&flag'
+
+
+def test_invalid_canonicalization_param():
+    event = {'body': json.dumps({'url': f'{BASE}/', 'url_canonicalization': 'sim'})}
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 400
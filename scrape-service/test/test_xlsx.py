@@ -0,0 +1,141 @@
+import io
+import json
+import tracemalloc
+
+import httpx
+import pytest
+import respx
+from openpyxl import Workbook, load_workbook
+
+from src.scrape_lambda import lambda_handler, process_document
+from src.xlsx import convert_xlsx
+
+BASE = 'https://planilhas.example'
+XLSX_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def make_xlsx(sheets):
+    """sheets: {nome: [linhas]} com o cabeçalho na primeira linha"""
+    workbook = Workbook(write_only=True)
+    for name, rows in sheets.items():
+        sheet = workbook.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def reference_tables(content):
+    """Implementação anterior (linhas materializadas como dicionários), usada na comparação"""
+    wb = load_workbook(io.BytesIO(content), read_only=True)
+    output = []
+    for sheet in wb:
+        rows = sheet.values
+        header = next(rows)
+        for row in rows:
+            output.append(dict(zip(header, row)))
+    html = ['<table border="1"><tr>']
+    if output:
+        html.extend(f'<th>{k}</th>' for k in output[0].keys())
+        html.append('</tr>')
+        for row in output:
+            html.append('<tr>')
+            html.extend(f'<td>{v}</td>' for v in row.values())
+            html.append('</tr>')
+    html.append('</table>')
+    headers = list(output[0].keys())
+    md = ['| ' + ' | '.join(headers) + ' |', '| ' + ' | '.join(['---'] * len(headers)) + ' |']
+    for row in output:
+        md.append('| ' + ' | '.join(str(row[h]) for h in headers) + ' |')
+    return ''.join(html), '\n'.join(md)
+
+
+PRICES = [['codigo', 'produto', 'preco']] + [[i, f'Produto {i}', i * 1.5] for i in range(1, 51)]
+STOCK = [['codigo', 'produto', 'preco'], [99, None, 0.5]]
+WORKBOOK = make_xlsx({'Precos': PRICES, 'Estoque': STOCK})
+
+
+def test_parity_with_previous_conversion():
+    html, markdown = reference_tables(WORKBOOK)
+    assert convert_xlsx(WORKBOOK, 'html')[0] == html
+    assert convert_xlsx(WORKBOOK, 'markdown')[0] == markdown
+    assert process_document(WORKBOOK, XLSX_TYPE, 'html') == html
+
+
+def test_sheet_selection_and_caps():
+    text, stats = convert_xlsx(WORKBOOK, 'csv', sheets=['Estoque'])
+    assert text == 'codigo,produto,preco\n99,,0.5\n'
+    assert stats == {'sheets': ['Estoque'], 'rows': 1, 'truncated': False}
+
+    text, stats = convert_xlsx(WORKBOOK, 'csv', sheets=[0], max_rows=2, max_cols=2)
+    assert text == 'codigo,produto\n1,Produto 1\n2,Produto 2\n'
+    assert stats['truncated']
+
+    with pytest.raises(ValueError):
+        convert_xlsx(WORKBOOK, 'csv', sheets=['Inexistente'])
+
+
+def test_ndjson_output_pads_short_rows():
+    content = make_xlsx({'Estoque': [['codigo', 'produto', 'preco'], [99, 'Estoque']]})
+    text, stats = convert_xlsx(content, 'ndjson', sheets='Estoque')
+    assert [json.loads(line) for line in text.splitlines()] == [{'codigo': 99, 'produto': 'Estoque', 'preco': None}]
+
+
+def test_char_budget_keeps_whole_rows():
+    text, stats = convert_xlsx(WORKBOOK, 'html', max_chars=300)
+    assert stats['truncated']
+    assert text.endswith('</tr></table>')
+    assert len(text) <= 300 + len('</table>')
+    assert 0 < stats['rows'] < 50
+
+
+
+def test_first_row_over_budget_is_truncated():
+    text, stats = convert_xlsx(WORKBOOK, 'markdown', max_chars=20)
+    assert text == '| codigo | produto |'
+    assert stats['truncated'] and stats['rows'] == 0
+
+
+def test_stream_output_is_not_accumulated():
+    stream = io.StringIO()
+    text, stats = convert_xlsx(WORKBOOK, 'ndjson', max_chars=0, stream=stream)
+    assert text is None
+    assert stream.getvalue() == convert_xlsx(WORKBOOK, 'ndjson', max_chars=0)[0]
+    assert stats['rows'] == 51
+
+def test_memory_does_not_grow_with_materialized_rows():
+    content = make_xlsx({'Precos': [['codigo', 'preco']] + [[i, i * 1.5] for i in range(5000)]})
+
+    tracemalloc.start()
+    reference_tables(content)
+    reference_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    convert_xlsx(content, 'html')
+    streaming_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # A maior parte do pico restante é do próprio openpyxl ao abrir o arquivo
+    assert streaming_peak < reference_peak * 0.75
+
+
+@respx.mock
+def test_crawled_spreadsheet_options():
+    page = f'<html><title>Listas</title><body><a href="{BASE}/precos.xlsx">Preços</a></body></html>'
+    respx.get(f'{BASE}/').mock(return_value=httpx.Response(200, headers={'Content-Type': 'text/html'}, text=page))
+    respx.get(f'{BASE}/precos.xlsx').mock(return_value=httpx.Response(
+        200, headers={'Content-Type': XLSX_TYPE}, content=WORKBOOK))
+    event = {'body': json.dumps({'url': f'{BASE}/', 'format': 'markdown', 'max_level': 1, 'rate_limit': 0,
+                                 'cache': False, 'xlsx_format': 'csv', 'xlsx_sheets': ['Estoque']})}
+    response = lambda_handler(event, None)
+    assert response['statusCode'] == 200
+    node = json.loads(response['body'])['links'][f'{BASE}/precos.xlsx']
+    assert node['content'] == 'codigo,produto,preco\n99,,0.5\n'
+    assert node['xlsx']['rows'] == 1
+
+
+def test_invalid_xlsx_format():
+    event = {'body': json.dumps({'url': f'{BASE}/', 'xlsx_format': 'xml'})}
+    assert lambda_handler(event, None)['statusCode'] == 400